@@ -0,0 +1,75 @@
+"""
+Vergleich von insert_pdf pro Schüler mit dem PageRangeExtractor.
+
+Gemessen werden Aufteilen und Speichern (ohne Stempel) für zwei
+Fahnen: eigene Ressourcen pro Seite und ein gemeinsames Ressourcen-
+Dictionary für alle Seiten.
+
+Aufruf:
+    python benchmarks/bench_extract.py --students 500 --scan-dpi 20
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pymupdf
+
+from synthetic import class_creator
+from test_handler.extract import PageRangeExtractor
+
+
+def _insert_pdf_splitter(doc: pymupdf.Document, ranges: list) -> int:
+    """Bisheriges Vorgehen: neues Dokument und insert_pdf pro Schüler."""
+    written = 0
+    for first, last in ranges:
+        new_doc = pymupdf.open()
+        new_doc.insert_pdf(doc, from_page=first - 1, to_page=last - 1)
+        written += len(new_doc.tobytes(no_new_id=True, deflate=True))
+        new_doc.close()
+    return written
+
+
+def _extractor_splitter(doc: pymupdf.Document, ranges: list) -> int:
+    """Seitenauszug mit einmal analysierten Ressourcen."""
+    extractor = PageRangeExtractor(doc)
+    written = 0
+    for first, last in ranges:
+        new_doc = extractor.extract(first, last)
+        written += len(new_doc.tobytes(no_new_id=True, deflate=True))
+        new_doc.close()
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--scan-dpi', dest='scan_dpi', type=int, default=20)
+    args = parser.parse_args()
+
+    ranges = [(2 * i + 1, 2 * i + 2) for i in range(args.students)]
+    with tempfile.TemporaryDirectory() as folder:
+        for layout, shared in (('pro Seite', False), ('gemeinsam', True)):
+            paths = class_creator(Path(folder) / layout, args.students,
+                                  scan_dpi=args.scan_dpi,
+                                  shared_resources=shared)
+            print(f'{args.students} Schüler, Ressourcen {layout}, Fahne '
+                  f'{Path(paths["doc"]).stat().st_size / 2 ** 20:.1f} MB')
+            for label, splitter in (('insert_pdf', _insert_pdf_splitter),
+                                    ('extractor', _extractor_splitter)):
+                with pymupdf.open(paths['doc']) as doc:
+                    start = time.perf_counter()
+                    written = splitter(doc, ranges)
+                    elapsed = time.perf_counter() - start
+                print(f'{label:>12} {elapsed:>8.2f} s '
+                      f'{1000 * elapsed / args.students:>7.2f} ms/Schüler '
+                      f'{written / args.students / 1024:>9.1f} KB/Datei')
+
+
+if __name__ == '__main__':
+    main()
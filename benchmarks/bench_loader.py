@@ -0,0 +1,92 @@
+"""
+Vergleich des bisherigen Ladens der Notentabelle mit dem prüfenden Laden.
+
+Der bisherige Weg liest alle Spalten mit Typinferenz, ersetzt Umlaute
+zeilenweise und bildet die Schlüssel mit einem Counter; der DataHandler
+liest nur die benötigten Spalten mit festen Datentypen, ersetzt Umlaute
+in einem Durchgang und prüft Seitenbereiche und Schlüssel. Beide erstellen
+die Schülerdatensätze.
+
+Aufruf:
+    python benchmarks/bench_loader.py --students 100000 --engine c
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pandas as pd
+
+from bench_records import _table_writer
+from synthetic import SyntheticPaths
+from test_handler.stamper import DataHandler, StudentRecord
+
+
+def _inferring_loader(paths: SyntheticPaths) -> tuple:
+    """Bisheriges Vorgehen: Typinferenz, dropna, translate und Counter."""
+    df = pd.read_csv(paths.data, sep=';', encoding='utf-8').dropna()
+    df = df.rename(columns=lambda x: x.replace('Nachname', 'Name')
+                   if x.startswith('Nach') else x)
+    df['Name'] = df['Name'].str.translate(str.maketrans(DataHandler.UMLAUTE))
+    df = df.set_index('Name')
+
+    names = df.index.tolist()
+    vornamen = df['Vorname'].tolist()
+    firsts = df['First'].astype(int).tolist()
+    counts = Counter(names)
+    keys = [name if counts[name] == 1 else f'{name}_{vorname}'
+            for name, vorname in zip(names, vornamen)]
+    counts = Counter(keys)
+    keys = [key if counts[key] == 1 else f'{key}_{first}'
+            for key, first in zip(keys, firsts)]
+    columns = zip(names, vornamen, firsts, df['Last'].astype(int).tolist(),
+                  df['Total'].tolist(), df['Note'].tolist(),
+                  df['Datum'].astype(str).tolist(),
+                  df['Titel'].astype(str).tolist(), keys)
+
+    return tuple(StudentRecord._make(row) for row in columns)
+
+
+def _validating_loader(paths: SyntheticPaths, engine: str) -> tuple:
+    """Neues Vorgehen mit festen Datentypen und Prüfung."""
+    return DataHandler(paths, engine=engine).records
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--students', type=int, default=100000)
+    parser.add_argument('--engine', default='c',
+                        choices=('c', 'python', 'pyarrow'))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = SyntheticPaths(_table_writer(folder, args.students))
+        size = Path(paths.data).stat().st_size / 2 ** 20
+
+        print(f'{args.students} Schüler, Notentabelle {size:.1f} MB')
+        for label, loader in (
+                ('inferenz', _inferring_loader),
+                (f'prüfend/{args.engine}',
+                 lambda paths: _validating_loader(paths, args.engine))):
+            # Bester von mehreren Läufen, damit der Dateicache warm ist
+            elapsed = min(_timer(loader, paths) for _ in range(args.repeat))
+            print(f'{label:>16} {1000 * elapsed:>9.1f} ms '
+                  f'{1e6 * elapsed / args.students:>8.2f} µs/Schüler')
+
+
+def _timer(loader, paths: SyntheticPaths) -> float:
+    """Misst einen Ladevorgang in Sekunden."""
+    start = time.perf_counter()
+    loader(paths)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+"""
+Vergleich der Reihenfolgen split_first und stamp_first der Engine.
+
+Für jede Klassengröße, jede Anzahl Seiten pro Schüler, jede Scan-Auflösung
+und jeden Renderer läuft dieselbe synthetische Klasse in jeder Reihenfolge
+in einem eigenen Prozess (ein Worker, sofort geschrieben). Gemessen werden
+die Stufen pro Schüler (render, apply, split, save, write) als Minimum
+mehrerer Läufe und der Zuwachs des Speicherbedarfs (RSS) während des
+Laufs. Daneben steht die Schätzung aus ``order_costs``; ``*`` markiert die
+Reihenfolge, die 'auto' wählt.
+
+Mit ``--fit`` werden aus allen Messungen die Koeffizienten der Schätzung
+per kleinster Quadrate bestimmt und so ausgegeben, wie sie in
+``test_handler/engine.py`` stehen:
+
+    ORDER_COSTS     ms pro Schüler je Renderer, pro Seite und pro MB
+                    Seiteninhalt
+    HELD_KB         Speicher, den stamp_first pro Stempel in der Fahne
+                    behält (Zuwachs gegenüber split_first)
+    HELD_SHARE      Anteil des Seiteninhalts, der dort zusätzlich bleibt
+    HELD_MS_PER_MB  Mehrkosten pro Schüler und MB, die stamp_first
+                    gerade hält (Caches und Speicherverwaltung)
+    RELEASE_MS      Kosten einer Freigabe der Fahne im Streaming-Modus:
+                    fest und pro MB der Fahne
+    BASE_MB         Speicherbedarf eines Prozesses mit geladenen Bibliotheken
+
+Mit ``--save`` werden die Messungen gespeichert, mit ``--load`` kommen
+gespeicherte Messungen zu ``--fit`` hinzu; ohne ``--students`` wird dann
+nichts neu gemessen. So stammen die Werte in ``engine.py`` aus einem
+Raster kleiner und mittlerer Klassen und zwei großen Klassen, in denen
+der gehaltene Speicher stamp_first bremst:
+
+    python benchmarks/bench_orders.py --students 50 200 800 --pages 2 8 \\
+        --scan-dpi 0 30 --save grid.json
+    python benchmarks/bench_orders.py --students 2000 3000 --pages 2 \\
+        --renderers native --repeat 2 --save large.json
+    python benchmarks/bench_orders.py --load grid.json large.json --fit
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+RENDERERS = ('raster', 'vector', 'native')
+ORDERS = ('split_first', 'stamp_first')
+STUDENT_STAGES = ('render', 'apply', 'split', 'save', 'write')
+
+
+def _case_runner(folder: str, renderer: str, order: str,
+                 memory_limit: str) -> dict:
+    """
+    Misst einen Lauf im aktuellen Prozess.
+
+    Args:
+        folder: Ordner mit steuerung.csv und fahne.pdf.
+        renderer: Darstellung des Stempels.
+        order: 'split_first' oder 'stamp_first'.
+        memory_limit: Speicherobergrenze in MB oder 'none'.
+
+    Returns:
+        Stufen pro Schüler in ms ('ms'), Speicherbedarf zu Beginn
+        ('base_MB') und Zuwachs während des Laufs ('grown_MB') in MB und
+        Kosten einer Freigabe in ms ('release_ms').
+    """
+    # Importkosten und -speicher gehören nicht zum Lauf
+    import matplotlib.pyplot  # noqa: F401
+    import pandas  # noqa: F401
+    import pymupdf  # noqa: F401
+
+    from test_handler.config import Config
+    from test_handler.engine import PipelineEngine
+    from test_handler.instrumentation import Instrumentation
+    from test_handler.memory import rss_reader
+
+    peak, done = [rss_reader()], threading.Event()
+
+    def sampler():
+        while not done.wait(0.005):
+            peak.append(rss_reader())
+
+    thread = threading.Thread(target=sampler)
+    thread.start()
+    instrumentation = Instrumentation()
+    config = Config(doc=f'{folder}/fahne.pdf', data=f'{folder}/steuerung.csv',
+                    destination_folder=f'{folder}/{order}-{renderer}',
+                    renderer=renderer, order=order, workers=1,
+                    write_concurrency=0,
+                    memory_limit=(None if memory_limit == 'none'
+                                  else float(memory_limit)))
+    PipelineEngine(config, instrumentation).run()
+    done.set()
+    thread.join()
+
+    report = instrumentation.report()
+    stages, counters = report['stages'], report['counters']
+    releases = counters.get('source_releases', 0)
+
+    return {'ms': 1000 * sum(stages[stage]['seconds']
+                             for stage in STUDENT_STAGES if stage in stages)
+            / counters['files'],
+            'base_MB': peak[0] / 2 ** 20,
+            'grown_MB': (max(peak) - peak[0]) / 2 ** 20,
+            'release_ms': (1000 * stages['release']['seconds'] / releases
+                           if releases else None)}
+
+
+def _case_spawner(folder: str, renderer: str, order: str,
+                  memory_limit: str = 'none') -> dict:
+    """
+    Führt einen Lauf in einem frischen Interpreter aus.
+
+    Returns:
+        Kennzahlen des Laufs (siehe ``_case_runner``).
+    """
+    result = subprocess.run([sys.executable, __file__, '--case', folder,
+                             renderer, order, memory_limit],
+                            capture_output=True, text=True, check=True)
+
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def _order_measurer(folder: str, renderer: str, repeat: int) -> dict:
+    """
+    Misst beide Reihenfolgen einer Klasse.
+
+    Returns:
+        Dictionary von Reihenfolge auf die kleinste Zeit pro Schüler
+        ('ms') und den Speicherbedarf des ersten Laufs ('base_MB',
+        'grown_MB').
+    """
+    measured = {}
+    for order in ORDERS:
+        runs = [_case_spawner(folder, renderer, order)
+                for _ in range(repeat)]
+        measured[order] = {'ms': min(run['ms'] for run in runs),
+                           'base_MB': runs[0]['base_MB'],
+                           'grown_MB': runs[0]['grown_MB']}
+
+    return measured
+
+
+def _nonnegative_fitter(rows: list, values: list) -> list:
+    """
+    Löst ein Ausgleichsproblem mit Koeffizienten, die nicht negativ sind.
+
+    Negative Koeffizienten entstehen hier nur durch Messrauschen; der
+    negativste wird auf 0 gesetzt und der Rest neu bestimmt, bis keiner
+    mehr negativ ist.
+
+    Args:
+        rows: Zeilen der Einflussgrößen.
+        values: Gemessene Werte.
+
+    Returns:
+        Koeffizienten in der Reihenfolge der Spalten.
+    """
+    import numpy as np
+
+    rows, values = np.array(rows, dtype=float), np.array(values)
+    solution = np.zeros(rows.shape[1])
+    active = list(range(rows.shape[1]))
+    while active:
+        fitted = np.linalg.lstsq(rows[:, active], values, rcond=None)[0]
+        if fitted.min() >= 0:
+            solution[active] = fitted
+            break
+        del active[int(fitted.argmin())]
+
+    return [float(value) for value in solution]
+
+
+def _coefficient_fitter(cases: list, releases: list) -> dict:
+    """
+    Bestimmt die Koeffizienten der Schätzung aus den Messungen.
+
+    Zuerst wird der Speicher, den stamp_first zusätzlich hält, aus
+    Stempeln pro Renderer und Seiteninhalt erklärt. Danach werden die
+    Zeiten pro Schüler beider Reihenfolgen aus einem festen Anteil je
+    Renderer, Seiten, Seiteninhalt und bei stamp_first dem im Mittel
+    gehaltenen Speicher erklärt. Seiten und Seiteninhalt kosten bei
+    jedem Renderer gleich viel.
+
+    Args:
+        cases: Messungen mit 'students', 'pages', 'proof_mb', 'renderer'
+            und den Ergebnissen beider Reihenfolgen.
+        releases: Größe der Fahne in MB und gemessene Kosten einer
+            Freigabe in ms.
+
+    Returns:
+        Koeffizienten unter den Namen aus ``engine.py``.
+    """
+    import numpy as np
+
+    # Gehaltener Speicher: Stempel pro Renderer und Anteil der Fahne
+    rows, held = [], []
+    for case in cases:
+        row = [case['students'] * (case['renderer'] == renderer) / 1024
+               for renderer in RENDERERS]
+        rows.append(row + [case['proof_mb']])
+        held.append(max(case['stamp_first']['grown_MB']
+                        - case['split_first']['grown_MB'], 0))
+    solution = _nonnegative_fitter(rows, held)
+    fitted = {'HELD_KB': {renderer: round(value, 1)
+                          for renderer, value in zip(RENDERERS, solution)},
+              'HELD_SHARE': round(solution[-1], 3)}
+
+    # Zeit pro Schüler: je Renderer fest, dazu pro Seite und pro MB und
+    # bei stamp_first pro MB, das im Mittel gehalten wird
+    costs = {}
+    for order in ORDERS:
+        rows, times = [], []
+        for case, memory in zip(cases, held):
+            row = [case['renderer'] == renderer for renderer in RENDERERS]
+            row += [case['pages'] / case['students'],
+                    case['proof_mb'] / case['students']]
+            if order == 'stamp_first':
+                row.append(memory / 2)
+            rows.append(row)
+            times.append(case[order]['ms'])
+        solution = _nonnegative_fitter(rows, times)
+        costs[order] = {renderer: round(value, 2)
+                        for renderer, value in zip(RENDERERS, solution)}
+        costs[order]['per_page'] = round(solution[3], 2)
+        costs[order]['per_mb'] = round(solution[4], 1)
+        if order == 'stamp_first':
+            fitted['HELD_MS_PER_MB'] = round(solution[5], 4)
+    fitted['ORDER_COSTS'] = costs
+    fitted['BASE_MB'] = round(float(np.median(
+        [case[order]['base_MB'] for case in cases for order in ORDERS])))
+    if releases:
+        rows = [[1, proof_mb] for proof_mb, _ in releases]
+        solution = _nonnegative_fitter(rows,
+                                       [ms for _, ms in releases])
+        fitted['RELEASE_MS'] = tuple(round(value, 3)
+                                     for value in solution)
+
+    return fitted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--students', type=int, nargs='+')
+    parser.add_argument('--pages', type=int, nargs='+', default=[2, 8])
+    parser.add_argument('--scan-dpi', dest='scan_dpi', type=int, nargs='+',
+                        default=[0])
+    parser.add_argument('--renderers', nargs='+', default=list(RENDERERS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fit', action='store_true',
+                        help='Koeffizienten der Schätzung ausgeben')
+    parser.add_argument('--save', help='Messungen als JSON speichern')
+    parser.add_argument('--load', nargs='+', default=[],
+                        help='gespeicherte Messungen für --fit')
+    parser.add_argument('--case', nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case is not None:
+        print(json.dumps(_case_runner(*args.case)))
+        return
+
+    from synthetic import class_creator
+    from test_handler.engine import order_costs, plan_chooser
+
+    if args.students is None:
+        args.students = [] if args.load else [100]
+    cases, releases = [], []
+    for path in args.load:
+        saved = json.loads(Path(path).read_text(encoding='utf-8'))
+        cases += saved['cases']
+        releases += [tuple(release) for release in saved['releases']]
+    for students in args.students:
+        for pages in args.pages:
+            for scan_dpi in args.scan_dpi:
+                with tempfile.TemporaryDirectory() as folder:
+                    paths = class_creator(folder, students,
+                                          pages_per_student=pages,
+                                          scan_dpi=scan_dpi)
+                    proof_mb = os.path.getsize(paths['doc']) / 2 ** 20
+                    print(f'{students} Schüler, {pages} Seiten pro Schüler, '
+                          f'Fahne {proof_mb:.1f} MB', flush=True)
+                    for renderer in args.renderers:
+                        measured = _order_measurer(folder, renderer,
+                                                   args.repeat)
+                        cases.append({'students': students,
+                                      'pages': students * pages,
+                                      'proof_mb': proof_mb,
+                                      'renderer': renderer, **measured})
+                        estimates = order_costs(students, students * pages,
+                                                proof_mb, renderer)
+                        chosen = plan_chooser(students, students * pages,
+                                              proof_mb, renderer).order
+                        for order in ORDERS:
+                            marker = '*' if order == chosen else ' '
+                            print(f'{renderer:>8} {order:>12}{marker} '
+                                  f'{measured[order]["ms"]:>7.2f} ms/Schüler '
+                                  f'(geschätzt '
+                                  f'{1000 * estimates[order] / students:.2f})'
+                                  f', +{measured[order]["grown_MB"]:.0f} MB',
+                                  flush=True)
+                    # Freigaben nach jedem Schüler kosten unabhängig vom
+                    # Renderer gleich viel
+                    if args.fit or args.save:
+                        releases.append((proof_mb, _case_spawner(
+                            folder, 'native', 'stamp_first',
+                            '1e-6')['release_ms']))
+
+    if args.save:
+        Path(args.save).write_text(json.dumps({'cases': cases,
+                                               'releases': releases}),
+                                   encoding='utf-8')
+    if args.fit:
+        print(json.dumps(_coefficient_fitter(cases, releases), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Skalierung von ParallelPress über die Anzahl Worker.
+
+Aufruf:
+    python benchmarks/bench_parallel.py --students 400 --workers 1 2 4 8 16
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import SyntheticPaths, class_creator
+from test_handler.stamper import DataHandler, FileManager, ParallelPress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        paths = SyntheticPaths(class_creator(folder, args.students))
+        data = DataHandler(paths)
+        
+        print(f'{args.students} Schüler, {os.cpu_count()} CPU-Kerne')
+        print(f'{"Worker":>6} {"Sekunden":>9} {"Schüler/s":>10} {"Speedup":>8}')
+        baseline = None
+        for workers in sorted(set(args.workers)):
+            shutil.rmtree(paths.destination_folder, ignore_errors=True)
+            FileManager(paths, data).folder_creator()
+            
+            start = time.perf_counter()
+            ParallelPress(paths, data, workers=workers).run()
+            elapsed = time.perf_counter() - start
+            
+            baseline = baseline or elapsed
+            print(f'{workers:>6} {elapsed:>9.2f} '
+                  f'{args.students / elapsed:>10.1f} {baseline / elapsed:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
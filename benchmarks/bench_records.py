@@ -0,0 +1,71 @@
+"""
+Vergleich von df.loc-Zugriffen pro Schüler mit den Schülerdatensätzen.
+
+Aufruf:
+    python benchmarks/bench_records.py --students 10000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import SyntheticPaths
+from test_handler.stamper import DataHandler
+
+
+def _table_writer(folder: str, students: int) -> dict:
+    """Schreibt nur die Notentabelle, ohne Korrekturfahne."""
+    rows = ['Nachname;Vorname;Total;Note;First;Last;Datum;Titel']
+    for i in range(students):
+        note = 1 + (i * 7919 % 21) / 4
+        rows.append(f'Schüler{i:05d};Vorname{i % 50};{int(note * 10)};{note};'
+                    f'{2 * i + 1};{2 * i + 2};2024-05-01;Pruefung')
+    data = Path(folder) / 'steuerung.csv'
+    data.write_text('\n'.join(rows) + '\n', encoding='utf-8')
+    
+    return {'data': str(data), 'doc': '', 'destination_folder': folder}
+
+
+def _loc_reader(df) -> list:
+    """Liest die Felder wie früher mit einem df.loc pro Schüler und Spalte."""
+    fields = []
+    for name in df.index:
+        fields.append((df.loc[name, 'Note'], df.loc[name, 'Vorname'],
+                       df.loc[name, 'Total'], df.loc[name, 'Note'],
+                       int(df.loc[name, 'First']), int(df.loc[name, 'Last']),
+                       str(df.loc[name, 'Datum']), str(df.loc[name, 'Titel'])))
+    return fields
+
+
+def _record_reader(data: DataHandler) -> list:
+    """Erstellt die Datensätze und liest dieselben Felder."""
+    records = data._record_creator()
+    return [(r.note, r.vorname, r.total, r.note, r.first, r.last,
+             r.datum, r.titel) for r in records]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--students', type=int, default=10000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        data = DataHandler(SyntheticPaths(_table_writer(folder, args.students)))
+        
+        print(f'{args.students} Schüler')
+        for label, reader, arg in (('df.loc', _loc_reader, data.df),
+                                   ('records', _record_reader, data)):
+            start = time.perf_counter()
+            reader(arg)
+            elapsed = time.perf_counter() - start
+            print(f'{label:>8} {1000 * elapsed:>9.1f} ms '
+                  f'{1e6 * elapsed / args.students:>8.2f} µs/Schüler')
+
+
+if __name__ == '__main__':
+    main()
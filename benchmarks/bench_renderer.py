@@ -0,0 +1,51 @@
+"""
+Vergleich der Stempel-Renderer nach Renderzeit und Dateigröße.
+
+Aufruf:
+    python benchmarks/bench_renderer.py --students 200 --renderers raster vector
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import SyntheticPaths, class_creator
+from test_handler.stamper import DataHandler, FileManager, Stamper
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--renderers', nargs='+', default=list(Stamper.RENDERERS))
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        paths = SyntheticPaths(class_creator(folder, args.students))
+        data = DataHandler(paths)
+        
+        print(f'{args.students} Schüler')
+        print(f'{"Renderer":>8} {"ms/Schüler":>11} {"KB/Datei":>9}')
+        for renderer in args.renderers:
+            paths.destination_folder = str(Path(folder) / renderer)
+            shutil.rmtree(paths.destination_folder, ignore_errors=True)
+            file_manager = FileManager(paths, data)
+            file_manager.folder_creator()
+            
+            start = time.perf_counter()
+            file_manager.stamp_distributor(Stamper(paths, data, renderer))
+            elapsed = time.perf_counter() - start
+            
+            sizes = [path.stat().st_size for path
+                     in Path(paths.destination_folder).rglob('*.pdf')]
+            print(f'{renderer:>8} {1000 * elapsed / args.students:>11.1f} '
+                  f'{sum(sizes) / len(sizes) / 1024:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Laufzeit und Dateigröße der Speicherprofile.
+
+Misst für jedes Profil das Speichern der gestempelten Gesamtfahne
+(``printing_press``) und das Speichern der Schülerdateien auf einer Fahne
+mit eingescannten Seiten.
+
+Aufruf:
+    python benchmarks/bench_save.py --students 200 --scan-dpi 50
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import SyntheticPaths, class_creator
+from test_handler.instrumentation import Instrumentation
+from test_handler.save_profiles import SAVE_PROFILES
+from test_handler.stamper import DataHandler, FileManager, Stamper
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--scan-dpi', dest='scan_dpi', type=int, default=50)
+    parser.add_argument('--renderer', default='raster')
+    parser.add_argument('--profiles', nargs='+', default=list(SAVE_PROFILES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = SyntheticPaths(class_creator(folder, args.students,
+                                             scan_dpi=args.scan_dpi))
+        data = DataHandler(paths)
+        # Die Gesamtfahne liegt fest unter ./data im Arbeitsverzeichnis
+        os.chdir(folder)
+        Path('data').mkdir()
+
+        print(f'{args.students} Schüler, Fahne '
+              f'{Path(paths.doc).stat().st_size / 2 ** 20:.1f} MB')
+        print(f'{"Profil":>9} {"Fahne s":>8} {"Fahne MB":>9} '
+              f'{"Datei ms":>9} {"davon Speichern":>16} {"Datei KB":>9}')
+        for profile in args.profiles:
+            paths.destination_folder = str(Path(folder) / profile)
+            shutil.rmtree(paths.destination_folder, ignore_errors=True)
+
+            # Gesamtfahne stempeln und speichern
+            instrumentation = Instrumentation()
+            stamper = Stamper(paths, data, args.renderer, instrumentation,
+                              save_profile=profile)
+            stamper.printing_press()
+            stamper.doc.close()
+            stamped_size = Path('data/fahne_gestempelt.pdf').stat().st_size
+
+            # Schülerdateien aus der Gesamtfahne speichern
+            file_manager = FileManager(paths, data, instrumentation,
+                                       save_profile=profile)
+            file_manager.folder_creator()
+            start = time.perf_counter()
+            file_manager.file_distributor()
+            elapsed = time.perf_counter() - start
+
+            report = instrumentation.report()
+            stamped_seconds = report['stages']['save_stamped']['seconds']
+            save_seconds = report['stages']['save']['seconds']
+            written = report['counters']['bytes_written']
+            print(f'{profile:>9} {stamped_seconds:>8.2f} '
+                  f'{stamped_size / 2 ** 20:>9.1f} '
+                  f'{1000 * elapsed / args.students:>9.2f} '
+                  f'{1000 * save_seconds / args.students:>16.2f} '
+                  f'{written / args.students / 1024:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Startzeit der Einstiegspunkte mit ``python -X importtime``.
+
+Misst die kumulierte Importzeit der Module bis zur ersten Arbeit
+(Eingabeaufforderung bzw. Argumentauswertung) und prüft eine Obergrenze.
+Der Lauf endet mit Exit-Code 1, wenn die Grenze überschritten wird oder
+eine schwere Abhängigkeit schon beim Import geladen wird.
+
+Aufruf:
+    python benchmarks/bench_startup.py --runs 5 --max-ms 150
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / 'src'
+MODULES = ('test_handler.stamper', 'test_handler.core', 'test_handler.cli')
+HEAVY = ('pandas', 'numpy', 'matplotlib', 'pymupdf', 'PIL')
+
+
+def _import_timer(module: str) -> tuple:
+    """
+    Importiert ein Modul in einem frischen Interpreter.
+    
+    Args:
+        module: Vollständiger Modulname.
+        
+    Returns:
+        Tupel aus kumulierter Importzeit in ms und den dabei geladenen
+        schweren Abhängigkeiten.
+    """
+    code = (f'import sys, {module}; '
+            f'print(*[m for m in {HEAVY!r} if m in sys.modules])')
+    env = {**os.environ, 'PYTHONPATH': str(SRC)}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, env=env, check=True)
+    
+    # Letzte Zeile zum Modul: "import time: self | cumulative | name"
+    cumulative = next(int(line.split('|')[1])
+                      for line in reversed(result.stderr.splitlines())
+                      if line.rstrip().endswith(f'| {module}'))
+    
+    return cumulative / 1000, result.stdout.split()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=150.0,
+                        help='Obergrenze der medianen Importzeit je Modul')
+    args = parser.parse_args()
+    
+    failed = False
+    print(f'{"Modul":<22} {"Median ms":>10} {"Max ms":>8}  Schwere Module')
+    for module in MODULES:
+        runs = [_import_timer(module) for _ in range(args.runs)]
+        times = [elapsed for elapsed, _ in runs]
+        heavy = sorted({name for _, loaded in runs for name in loaded})
+        median = statistics.median(times)
+        print(f'{module:<22} {median:>10.1f} {max(times):>8.1f}  '
+              f'{", ".join(heavy) or "-"}')
+        failed |= median > args.max_ms or bool(heavy)
+    
+    if failed:
+        print(f'Obergrenze von {args.max_ms:.0f} ms überschritten oder schwere '
+              'Abhängigkeit beim Import geladen', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""
+Benchmark-Suite für Stempeln, Aufteilen, Speichern und Gesamtdurchsatz.
+
+Erzeugt offline synthetische Klassen mit 10, 100, 1000 und 10000
+Schülern und misst für jede Größe die Zeiten pro Stufe, den
+Spitzenspeicher und die Größe der Ausgabe. Jeder Fall läuft in einem
+eigenen Prozess, damit Spitzenspeicher und Caches nicht vom vorigen
+Fall abhängen.
+
+Zwei Abläufe werden gemessen:
+    einzeln  FileManager.stamp_distributor (Stempel direkt in jeder Datei)
+    gesamt   Stamper.printing_press und FileManager.file_distributor
+             (gestempelte Gesamtfahne, danach Aufteilen); im selben
+             Durchgang entsteht der Klassenbericht (class_report_ms)
+
+Mit ``--update-baseline`` werden die Ergebnisse als Referenz gespeichert;
+ohne wird mit der Referenz verglichen. Der Lauf endet mit Exit-Code 1,
+wenn eine Kennzahl die Referenz um mehr als die Toleranz überschreitet.
+
+Aufruf:
+    python benchmarks/suite.py --sizes 10 100 1000 --update-baseline
+    python benchmarks/suite.py --sizes 10 100 1000 --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+BASELINE = Path(__file__).resolve().parent / 'baselines.json'
+PIPELINES = ('einzeln', 'gesamt')
+# Stufen pro Schüler in ms; Hintergrund und Gesamtfahne einmal pro Lauf
+STUDENT_STAGES = ('render', 'apply', 'split', 'save', 'write')
+RUN_STAGES = ('csv_read', 'background', 'save_stamped', 'class_report')
+# Absolute Mindestabweichung, damit Rauschen kleiner Werte nicht auffällt
+SLACK = {'ms': 0.5, 's': 0.05, 'MB': 10.0, 'KB': 1.0}
+
+
+def _case_runner(folder: str, pipeline: str, renderer: str) -> dict:
+    """
+    Misst einen Fall im aktuellen Prozess.
+
+    Args:
+        folder: Ordner mit steuerung.csv und fahne.pdf.
+        pipeline: 'einzeln' oder 'gesamt'.
+        renderer: Darstellung des Stempels.
+
+    Returns:
+        Kennzahlen des Falls; Zeiten in ms bzw. s, Speicher in MB,
+        Dateigröße in KB.
+    """
+    import resource
+
+    # Importkosten gehören nicht zu den Stufen
+    import matplotlib.pyplot  # noqa: F401
+    import pandas  # noqa: F401
+    import pymupdf  # noqa: F401
+
+    from synthetic import SyntheticPaths
+    from test_handler.instrumentation import Instrumentation
+    from test_handler.report import ClassReport
+    from test_handler.stamper import DataHandler, FileManager, Stamper
+
+    folder = Path(folder)
+    paths = SyntheticPaths({'data': str(folder / 'steuerung.csv'),
+                            'doc': str(folder / 'fahne.pdf'),
+                            'destination_folder': str(folder / pipeline)})
+    # Die Gesamtfahne liegt fest unter ./data im Arbeitsverzeichnis
+    work = folder / f'{pipeline}-work'
+    (work / 'data').mkdir(parents=True)
+    os.chdir(work)
+
+    instrumentation = Instrumentation()
+    start = time.perf_counter()
+    data = DataHandler(paths, instrumentation)
+    file_manager = FileManager(paths, data, instrumentation)
+    file_manager.folder_creator()
+    stamper = Stamper(paths, data, renderer, instrumentation)
+    if pipeline == 'einzeln':
+        file_manager.stamp_distributor(stamper)
+    else:
+        # Bericht neben der Arbeitskopie, damit 'files' unverändert bleibt
+        stamper.printing_press(ClassReport(data, work,
+                                           instrumentation=instrumentation))
+        stamper.doc.close()
+        file_manager.file_distributor()
+    elapsed = time.perf_counter() - start
+
+    report = instrumentation.report()
+    size = len(data.records)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS meldet Bytes, Linux Kilobytes
+    peak = peak if sys.platform == 'darwin' else peak * 1024
+
+    metrics = {'total_s': elapsed}
+    for stage in STUDENT_STAGES:
+        if stage in report['stages']:
+            metrics[f'{stage}_ms'] = (1000 * report['stages'][stage]['seconds']
+                                      / size)
+    for stage in RUN_STAGES:
+        if stage in report['stages']:
+            metrics[f'{stage}_ms'] = 1000 * report['stages'][stage]['seconds']
+    metrics['peak_rss_MB'] = peak / 2 ** 20
+    metrics['output_KB'] = (report['counters'].get('bytes_written', 0)
+                            / 1024 / size)
+    metrics = {key: round(value, 4) for key, value in metrics.items()}
+    metrics['files'] = len(list(Path(paths.destination_folder).rglob('*.pdf')))
+
+    return metrics
+
+
+def _case_spawner(folder: str, pipeline: str, renderer: str) -> dict:
+    """
+    Führt einen Fall in einem frischen Interpreter aus.
+
+    Returns:
+        Kennzahlen des Falls (siehe ``_case_runner``).
+    """
+    result = subprocess.run([sys.executable, __file__, '--case', folder,
+                             pipeline, renderer],
+                            capture_output=True, text=True, check=True)
+
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def _unit(metric: str) -> str:
+    """Einheit einer Kennzahl aus ihrem Namen, z. B. 'ms' für 'render_ms'."""
+    return metric.rsplit('_', 1)[-1]
+
+
+def _regression_finder(results: dict, baseline: dict,
+                       tolerance: float) -> list:
+    """
+    Vergleicht Ergebnisse mit der Referenz.
+
+    Alle Kennzahlen außer der Anzahl Dateien sind „kleiner ist besser“.
+    Eine Regression liegt vor, wenn der Wert die Referenz relativ um mehr
+    als ``tolerance`` und absolut um mehr als ``SLACK`` überschreitet.
+
+    Args:
+        results: Kennzahlen pro Fall.
+        baseline: Gespeicherte Kennzahlen pro Fall.
+        tolerance: Erlaubte relative Verschlechterung, z. B. 0.25.
+
+    Returns:
+        Liste von Tupeln (Fall, Kennzahl, Referenz, Wert).
+    """
+    regressions = []
+    for case, metrics in results.items():
+        reference = baseline.get(case, {})
+        for metric, value in metrics.items():
+            if metric not in reference:
+                continue
+            old = reference[metric]
+            if metric == 'files':
+                if value != old:
+                    regressions.append((case, metric, old, value))
+                continue
+            if value > old * (1 + tolerance) and \
+                    value - old > SLACK.get(_unit(metric), 0):
+                regressions.append((case, metric, old, value))
+
+    return regressions
+
+
+def _table_printer(results: dict, baseline: dict) -> None:
+    """Gibt die Kennzahlen mit der Änderung gegenüber der Referenz aus."""
+    for case, metrics in results.items():
+        print(case)
+        reference = baseline.get(case, {})
+        for metric, value in metrics.items():
+            change = ''
+            if reference.get(metric):
+                change = f'{100 * (value / reference[metric] - 1):+7.1f} %'
+            print(f'  {metric:<16} {value:>12.{0 if metric == "files" else 3}f} '
+                  f'{change}')
+        size = int(case.rsplit('/', 1)[-1])
+        print(f'  {"Schüler/s":<16} {size / metrics["total_s"]:>12.1f}')
+
+
+def _machine_describer() -> dict:
+    """Beschreibt die Umgebung, in der die Referenz gemessen wurde."""
+    import pymupdf
+
+    return {'platform': platform.platform(), 'python': platform.python_version(),
+            'cpus': os.cpu_count(), 'pymupdf': pymupdf.VersionBind}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10, 100, 1000, 10000])
+    parser.add_argument('--pipelines', nargs='+', choices=PIPELINES,
+                        default=list(PIPELINES))
+    parser.add_argument('--renderer', default='raster')
+    parser.add_argument('--baseline', default=str(BASELINE),
+                        help='JSON-Datei mit den Referenzwerten')
+    parser.add_argument('--update-baseline', dest='update_baseline',
+                        action='store_true',
+                        help='Ergebnisse als neue Referenz speichern')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Erlaubte relative Verschlechterung (Standard '
+                             '0.25 = 25 %%)')
+    parser.add_argument('--output', help='Ergebnisse zusätzlich als JSON')
+    parser.add_argument('--case', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case is not None:
+        print(json.dumps(_case_runner(*args.case)))
+        return 0
+
+    path = Path(args.baseline)
+    stored = json.loads(path.read_text(encoding='utf-8')) if path.exists() \
+        else {'machine': None, 'cases': {}}
+    machine = _machine_describer()
+    if stored['machine'] not in (None, machine) and not args.update_baseline:
+        print(f'Hinweis: Referenz stammt von {stored["machine"]}',
+              file=sys.stderr)
+
+    from synthetic import class_creator
+
+    results = {}
+    for size in sorted(args.sizes):
+        # Eine Klasse pro Größe, außerhalb der gemessenen Prozesse erzeugt
+        with tempfile.TemporaryDirectory() as folder:
+            class_creator(folder, size)
+            for pipeline in args.pipelines:
+                case = f'{pipeline}/{args.renderer}/{size}'
+                print(f'... {case}', file=sys.stderr, flush=True)
+                results[case] = _case_spawner(folder, pipeline, args.renderer)
+
+    _table_printer(results, stored['cases'])
+    if args.output:
+        Path(args.output).write_text(json.dumps(
+            {'machine': machine, 'cases': results}, indent=2), encoding='utf-8')
+
+    if args.update_baseline:
+        stored['machine'] = machine
+        stored['cases'].update(results)
+        path.write_text(json.dumps(stored, indent=2, sort_keys=True) + '\n',
+                        encoding='utf-8')
+        print(f'Referenz gespeichert: {path}', file=sys.stderr)
+        return 0
+
+    regressions = _regression_finder(results, stored['cases'], args.tolerance)
+    for case, metric, old, value in regressions:
+        print(f'REGRESSION {case} {metric}: {old} -> {value}', file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Synthetische Klassen für Benchmarks.
+
+Erzeugt eine Steuerdatei und eine passende Korrekturfahne mit einer
+frei wählbaren Anzahl Schüler, ohne echte Prüfungsdaten zu benötigen.
+"""
+
+import random
+import re
+from pathlib import Path
+
+import numpy as np
+import pymupdf
+
+
+def class_creator(folder: str, students: int, pages_per_student: int = 2,
+                  seed: int = 1, scan_dpi: int = 0,
+                  shared_resources: bool = False) -> dict:
+    """
+    Schreibt steuerung.csv und fahne.pdf für eine synthetische Klasse.
+    
+    Args:
+        folder: Zielordner für die beiden Dateien.
+        students: Anzahl Schüler.
+        pages_per_student: Seiten pro Prüfung.
+        seed: Startwert für reproduzierbare Noten.
+        scan_dpi: Auflösung eines eingebetteten Graustufen-Scans pro
+            Seite (0 = reine Textseiten).
+        shared_resources: Alle Seiten teilen ein Ressourcen-Dictionary
+            mit sämtlichen Scans, wie es manche Zusammenführungsprogramme
+            schreiben.
+        
+    Returns:
+        Dictionary mit den Pfaden 'data', 'doc' und 'destination_folder'.
+    """
+    rng = random.Random(seed)
+    noise = np.random.default_rng(seed)
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    
+    rows = ['Nachname;Vorname;Total;Note;First;Last;Datum;Titel']
+    doc = pymupdf.open()
+    first = 1
+    for i in range(students):
+        # Noten in Viertelschritten zwischen 1 und 6
+        note = round(rng.uniform(1, 6) * 4) / 4
+        last = first + pages_per_student - 1
+        rows.append(f'Schüler{i:05d};Vorname{i};{int(note * 10)};{note};'
+                    f'{first};{last};2024-05-01;Pruefung')
+        for k in range(pages_per_student):
+            page = doc.new_page()
+            if scan_dpi:
+                page.insert_image(page.rect, pixmap=_scan_creator(
+                    noise, page.rect, scan_dpi))
+            page.insert_text((72, 72), f'Schüler{i:05d} Seite {k + 1}')
+            page.insert_text((72, 100), 'Lorem ipsum dolor sit amet. ' * 3)
+        first = last + 1
+    if shared_resources:
+        _resource_merger(doc)
+    
+    paths = {
+        'data': str(folder / 'steuerung.csv'),
+        'doc': str(folder / 'fahne.pdf'),
+        'destination_folder': str(folder / 'output'),
+    }
+    Path(paths['data']).write_text('\n'.join(rows) + '\n', encoding='utf-8')
+    # Ohne Deduplizierung, damit jede Seite eigene Ressourcen hat
+    doc.save(paths['doc'], deflate=True)
+    doc.close()
+    
+    return paths
+
+
+def _resource_merger(doc: pymupdf.Document) -> None:
+    """Legt die Ressourcen aller Seiten in ein gemeinsames Dictionary."""
+    xobjects, fonts = {}, {}
+    for page in doc:
+        for category, target in (('XObject', xobjects), ('Font', fonts)):
+            kind, value = doc.xref_get_key(page.xref, f'Resources/{category}')
+            if kind != 'dict':
+                continue
+            for name, xref in re.findall(r'/([^\s/<>]+)\s*(\d+) 0 R', value):
+                if category == 'XObject':
+                    # Eindeutige Namen pro Seite auch im Inhaltsstrom
+                    new_name = f'Im{page.number}'
+                    for contents in page.get_contents():
+                        stream = doc.xref_stream(contents).replace(
+                            f'/{name} '.encode(), f'/{new_name} '.encode())
+                        doc.update_stream(contents, stream)
+                    name = new_name
+                target[name] = xref
+    
+    shared = doc.get_new_xref()
+    doc.update_object(shared, '<<' + ''.join(
+        f'/{category} <<' + ''.join(f'/{name} {xref} 0 R'
+                                    for name, xref in target.items()) + '>>'
+        for category, target in (('XObject', xobjects), ('Font', fonts))
+        if target) + '>>')
+    for page in doc:
+        doc.xref_set_key(page.xref, 'Resources', f'{shared} 0 R')
+
+
+def _scan_creator(noise: np.random.Generator, rect: pymupdf.Rect,
+                  dpi: int) -> pymupdf.Pixmap:
+    """Erzeugt eine verrauschte Graustufenseite wie bei einem Scan."""
+    width = int(rect.width * dpi / 72)
+    height = int(rect.height * dpi / 72)
+    samples = noise.integers(200, 256, size=width * height, dtype=np.uint8)
+    
+    return pymupdf.Pixmap(pymupdf.csGRAY, width, height, samples.tobytes(), 0)
+
+
+class SyntheticPaths:
+    """Ersetzt Pathfinder ohne Benutzereingaben."""
+    
+    def __init__(self, paths: dict) -> None:
+        self.doc = paths['doc']
+        self.data = paths['data']
+        self.destination_folder = paths['destination_folder']
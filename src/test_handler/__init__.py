@@ -3,3 +3,15 @@ test_handler package.
 """
 
 __version__ = "0.1.0"
+
+from test_handler.config import Config, ConfigError, DataError
+
+__all__ = ['Config', 'ConfigError', 'DataError', 'run', '__version__']
+
+
+def __getattr__(name):
+    # run erst bei Bedarf laden, damit ``python -m test_handler.cli`` sauber startet
+    if name == 'run':
+        from test_handler.cli import run
+        return run
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
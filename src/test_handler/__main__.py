@@ -0,0 +1,9 @@
+"""
+Ermöglicht ``python -m test_handler``.
+"""
+
+import sys
+
+from test_handler.cli import main
+
+sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Verzögertes Laden schwerer Abhängigkeiten.
+
+pandas, matplotlib und PyMuPDF brauchen zusammen über eine Sekunde zum
+Importieren. Ein ``LazyModule`` steht im Modul an Stelle der Bibliothek
+und importiert sie erst beim ersten Attributzugriff, also in der Stufe,
+die sie tatsächlich braucht.
+"""
+
+import importlib
+
+
+class LazyModule:
+    """
+    Platzhalter für ein Modul, das erst bei Bedarf importiert wird.
+
+    Nach dem ersten Zugriff leitet der Platzhalter nur noch an das
+    geladene Modul weiter.
+    """
+
+    def __init__(self, name: str, backend: str = None):
+        """
+        Initialisiert den Platzhalter, ohne das Modul zu importieren.
+
+        Args:
+            name: Vollständiger Modulname, z. B. 'matplotlib.pyplot'.
+            backend: Optionales matplotlib-Backend, das vor dem Import
+                gesetzt wird.
+        """
+        self._name = name
+        self._backend = backend
+        self._module = None
+
+    def _loader(self):
+        """
+        Importiert das Modul beim ersten Zugriff.
+
+        Returns:
+            Das geladene Modul.
+        """
+        if self._module is None:
+            # Backend festlegen, bevor pyplot ein interaktives wählt
+            if self._backend is not None:
+                import matplotlib
+                matplotlib.use(self._backend)
+            self._module = importlib.import_module(self._name)
+
+        return self._module
+
+    def __getattr__(self, attr: str):
+        # Eigene Attribute fehlen nur vor __init__ (z. B. beim Kopieren)
+        if attr in ('_name', '_backend', '_module'):
+            raise AttributeError(attr)
+        return getattr(self._loader(), attr)
+
+    def __repr__(self) -> str:
+        state = 'geladen' if self._module is not None else 'nicht geladen'
+        return f'<LazyModule {self._name!r} ({state})>'
@@ -0,0 +1,262 @@
+"""
+Stapelverarbeitung vieler Klassen und Prüfungen in einem Aufruf.
+
+Ein Manifest listet beliebig viele Aufträge (Notentabelle, Korrekturfahne,
+Zielordner). Die Aufträge werden auf einen Prozesspool verteilt, dessen
+Worker pandas, matplotlib und PyMuPDF nur einmal laden und für alle
+folgenden Aufträge wiederverwenden. Zum Schluss wird eine Zusammenfassung
+mit Laufzeit und Ergebnis jedes Auftrags geschrieben.
+"""
+
+import csv
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from test_handler.config import Config, ConfigError, toml_loader
+
+
+JOB_FIELDS = ('doc', 'data', 'destination_folder')
+
+
+class Manifest:
+    """
+    Liest die Aufträge eines Stapellaufs.
+
+    Unterstützt werden TOML-Dateien mit einer Liste ``[[jobs]]`` und
+    CSV-Dateien (Trennzeichen ``;``) mit den Spalten ``doc``, ``data``
+    und ``destination_folder``. Optional sind ``name`` und ``renderer``.
+    Relative Pfade gelten relativ zum Manifest.
+    """
+
+    def __init__(self, path: str, renderer: str = None, cache: str = None,
+                 cache_size: float = None, incremental: bool = None,
+                 memory_limit: float = None, write_concurrency: int = None,
+                 csv_engine: str = None, save_profile: str = None,
+                 password: str = None, owner_password: str = None,
+                 author: str = None, document_title: str = None,
+                 page_index: bool = None, placement: str = None,
+                 summary_page: str = None, tasks: str = None,
+                 class_report: bool = None, report_format: str = None,
+                 journal: bool = None, order: str = None):
+        """
+        Initialisiert das Manifest und liest alle Aufträge.
+
+        Args:
+            path: Pfad zur Manifestdatei (.toml oder .csv).
+            renderer: Renderer für Aufträge ohne eigene Angabe.
+            cache: Gemeinsamer Stempel-Cache aller Aufträge.
+            cache_size: Höchstgröße des Stempel-Caches in MB.
+            incremental: Nur geänderte Ausgabedateien neu schreiben.
+            memory_limit: Speicherobergrenze pro Prozess in MB.
+            write_concurrency: Schreib-Threads pro Prozess.
+            csv_engine: Parser der Notentabellen.
+            save_profile: Speicherprofil der Ausgabedateien.
+            password: Vorlage für das Passwort jeder Schülerdatei.
+            owner_password: Vorlage für das Besitzerpasswort.
+            author: Vorlage für den Autor in den Metadaten.
+            document_title: Vorlage für den Titel in den Metadaten.
+            page_index: Seitenbereiche aus den Korrekturfahnen erkennen.
+            placement: Platzierung der Stempel.
+            summary_page: Seite des Notenstempels.
+            tasks: Spalten mit Aufgabenpunkten.
+            class_report: Klassenbericht pro Auftrag schreiben.
+            report_format: Format des Exports der Rangliste.
+            journal: Fertige Dateien pro Auftrag im Journal festhalten.
+            order: Reihenfolge von Stempeln und Aufteilen.
+        """
+        self.path = path
+        self.renderer = renderer
+        self.cache = cache
+        self.cache_size = cache_size
+        self.incremental = incremental
+        self.memory_limit = memory_limit
+        self.write_concurrency = write_concurrency
+        self.csv_engine = csv_engine
+        self.save_profile = save_profile
+        self.password = password
+        self.owner_password = owner_password
+        self.author = author
+        self.document_title = document_title
+        self.page_index = page_index
+        self.placement = placement
+        self.summary_page = summary_page
+        self.tasks = tasks
+        self.class_report = class_report
+        self.report_format = report_format
+        self.journal = journal
+        self.order = order
+        self.jobs = self._job_collector()
+
+    def _entry_reader(self) -> list:
+        """
+        Liest die Einträge der Manifestdatei.
+
+        Returns:
+            Liste von Dictionaries, ein Eintrag pro Auftrag.
+        """
+        if Path(self.path).suffix.lower() == '.toml':
+            return toml_loader(self.path).get('jobs', [])
+
+        with open(self.path, newline='', encoding='utf-8') as file:
+            return list(csv.DictReader(file, delimiter=';'))
+
+    def _job_collector(self) -> list:
+        """
+        Prüft die Einträge und erstellt die Auftragskonfigurationen.
+
+        Returns:
+            Liste von Tupeln aus Auftragsname und Config.
+        """
+        base = os.path.dirname(os.path.abspath(self.path))
+        jobs = []
+
+        for number, entry in enumerate(self._entry_reader(), start=1):
+            missing = [key for key in JOB_FIELDS if not entry.get(key)]
+            if missing:
+                raise ConfigError(f'Auftrag {number} in {self.path}: es '
+                                  f'fehlt {", ".join(missing)}')
+
+            # Pfade relativ zum Manifest auflösen
+            paths = {key: os.path.join(base, entry[key]) for key in JOB_FIELDS}
+            config = Config(**paths,
+                            renderer=entry.get('renderer') or self.renderer,
+                            workers=1, cache=self.cache,
+                            cache_size=self.cache_size,
+                            incremental=self.incremental,
+                            memory_limit=self.memory_limit,
+                            write_concurrency=self.write_concurrency,
+                            csv_engine=self.csv_engine,
+                            save_profile=self.save_profile,
+                            password=self.password,
+                            owner_password=self.owner_password,
+                            author=self.author,
+                            document_title=self.document_title,
+                            page_index=self.page_index,
+                            placement=self.placement,
+                            summary_page=self.summary_page,
+                            tasks=self.tasks,
+                            class_report=self.class_report,
+                            report_format=self.report_format,
+                            journal=self.journal, order=self.order)
+            jobs.append((entry.get('name') or f'auftrag-{number}', config))
+
+        return jobs
+
+
+def _batch_initializer() -> None:
+    """
+    Lädt die Bibliotheken einmal pro Worker.
+
+    Importiert das Stempelmodul (pandas, matplotlib mit Agg-Backend,
+    PyMuPDF) und füllt den Schriftcache von matplotlib, damit kein
+    Auftrag diese Kosten trägt.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import font_manager
+
+    import test_handler.stamper  # noqa: F401
+
+    font_manager.findfont(font_manager.FontProperties())
+
+
+def _job_runner(job: tuple) -> dict:
+    """
+    Führt einen Auftrag aus und misst seine Laufzeit.
+
+    Fehler werden nicht weitergereicht, sondern im Ergebnis vermerkt,
+    damit ein fehlerhafter Auftrag den Stapel nicht abbricht.
+
+    Args:
+        job: Tupel aus Auftragsname und Config.
+
+    Returns:
+        Ergebnis mit Name, Pfaden, Status, Anzahl Dateien, Laufzeit in
+        Sekunden und gegebenenfalls der Fehlermeldung.
+    """
+    from test_handler.cli import run
+
+    name, config = job
+    result = {'name': name, **{key: getattr(config, key) for key in JOB_FIELDS},
+              'renderer': config.renderer, 'pid': os.getpid()}
+
+    start = time.perf_counter()
+    try:
+        written = run(config)
+    except Exception as error:
+        result.update(status='error', files=0, error=f'{type(error).__name__}: '
+                                                     f'{error}',
+                      traceback=traceback.format_exc())
+    else:
+        result.update(status='ok', files=len(written), error=None)
+    result['seconds'] = round(time.perf_counter() - start, 4)
+
+    return result
+
+
+class BatchRunner:
+    """
+    Verteilt die Aufträge eines Manifests auf einen Prozesspool.
+
+    Jeder Auftrag läuft vollständig in einem Worker; innerhalb eines
+    Auftrags wird nicht weiter parallelisiert.
+    """
+
+    def __init__(self, manifest: Manifest, workers: int = None):
+        """
+        Initialisiert den Stapellauf.
+
+        Args:
+            manifest: Manifest mit den Aufträgen.
+            workers: Anzahl Prozesse (Standard: Anzahl CPU-Kerne, höchstens
+                Anzahl Aufträge).
+        """
+        self.manifest = manifest
+        workers = workers or os.cpu_count() or 1
+        self.workers = max(1, min(workers, len(manifest.jobs)))
+
+    def run(self) -> dict:
+        """
+        Führt alle Aufträge aus.
+
+        Bei einem Worker wird ohne Prozesspool im aktuellen Prozess
+        gearbeitet.
+
+        Returns:
+            Zusammenfassung mit den Ergebnissen in Reihenfolge des Manifests.
+        """
+        start = time.perf_counter()
+
+        if self.workers == 1:
+            _batch_initializer()
+            results = [_job_runner(job) for job in self.manifest.jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     initializer=_batch_initializer) as pool:
+                results = list(pool.map(_job_runner, self.manifest.jobs))
+
+        return {
+            'manifest': str(self.manifest.path),
+            'workers': self.workers,
+            'jobs': len(results),
+            'failed': sum(result['status'] != 'ok' for result in results),
+            'files': sum(result['files'] for result in results),
+            'seconds': round(time.perf_counter() - start, 4),
+            'results': results,
+        }
+
+    def summary_writer(self, summary: dict, path: str) -> None:
+        """
+        Schreibt die Zusammenfassung als JSON-Datei.
+
+        Args:
+            summary: Rückgabewert von ``run``.
+            path: Zielpfad der Zusammenfassung.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=2, ensure_ascii=False)
@@ -0,0 +1,145 @@
+"""
+Inhaltsadressierter Stempel-Cache auf der Festplatte.
+
+Jeder Eintrag ist ein gerenderter Stempel (eine einseitige PDF-Datei, in
+``core.py`` ein PNG-Bild), dessen Name der SHA-256-Hash aller Eingaben
+ist, die den Stempel bestimmen (Note, Punkte, Vorname,
+Notenverteilung der Klasse, Renderer). Unveränderte Stempel werden über
+Läufe hinweg wiederverwendet; eine Korrektur erzeugt einen neuen
+Schlüssel. Übersteigt der Cache seine Größe, werden die am längsten
+nicht mehr verwendeten Einträge gelöscht.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from test_handler import __version__
+
+# Bei Änderungen am Stempel-Layout erhöhen, damit alte Einträge verfallen
+CACHE_VERSION = 1
+
+
+class StampCache:
+    """
+    Größenbegrenzter LRU-Cache für gerenderte Stempel.
+
+    Der Zeitpunkt der letzten Verwendung ist die Änderungszeit der Datei;
+    ein Treffer setzt sie neu. Mehrere Prozesse dürfen denselben Ordner
+    gleichzeitig verwenden, da Einträge atomar geschrieben werden.
+    """
+
+    SUFFIX = '.pdf'
+
+    def __init__(self, folder: str, max_bytes: int = 256 * 2 ** 20):
+        """
+        Initialisiert den Cache und legt den Ordner bei Bedarf an.
+
+        Args:
+            folder: Ordner des Caches.
+            max_bytes: Höchstgröße aller Einträge in Bytes.
+        """
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entry_collector())
+
+    def __getstate__(self) -> dict:
+        # Worker-Prozesse beginnen mit eigenen Zählern
+        state = self.__dict__.copy()
+        state.update(hits=0, misses=0)
+        return state
+
+    @staticmethod
+    def key_creator(*parts) -> str:
+        """
+        Bildet den Schlüssel eines Eintrags.
+
+        Args:
+            *parts: JSON-fähige Eingaben, die den Stempel bestimmen.
+
+        Returns:
+            SHA-256-Hash als Hex-String.
+        """
+        payload = json.dumps([CACHE_VERSION, __version__, *parts],
+                             sort_keys=True, ensure_ascii=False, default=str)
+
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path_creator(self, key: str) -> Path:
+        """Pfad eines Eintrags; Unterordner nach den ersten zwei Zeichen."""
+        return self.folder / key[:2] / f'{key}{self.SUFFIX}'
+
+    def _entry_collector(self) -> list:
+        """
+        Sammelt alle Einträge des Ordners.
+
+        Returns:
+            Liste von Tupeln aus Pfad, Größe und letzter Verwendung.
+        """
+        entries = []
+        for path in self.folder.glob(f'*/*{self.SUFFIX}'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # von anderem Prozess gelöscht
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+
+        return entries
+
+    def load(self, key: str) -> bytes:
+        """
+        Liest einen Eintrag und markiert ihn als verwendet.
+
+        Args:
+            key: Schlüssel aus ``key_creator``.
+
+        Returns:
+            Inhalt des Eintrags oder ``None`` bei einem Fehlschlag.
+        """
+        path = self._path_creator(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return data
+
+    def store(self, key: str, data: bytes) -> None:
+        """
+        Schreibt einen Eintrag atomar und hält die Größengrenze ein.
+
+        Args:
+            key: Schlüssel aus ``key_creator``.
+            data: Inhalt des Eintrags.
+        """
+        path = self._path_creator(key)
+        path.parent.mkdir(exist_ok=True)
+
+        # Erst vollständig schreiben, dann umbenennen
+        handle, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+        self._size += len(data)
+        if self._size > self.max_bytes:
+            self._evictor()
+
+    def _evictor(self) -> None:
+        """Löscht die am längsten nicht verwendeten Einträge bis zur Grenze."""
+        entries = sorted(self._entry_collector(), key=lambda entry: entry[2])
+        self._size = sum(size for _, size, _ in entries)
+
+        for path, size, _ in entries:
+            if self._size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
@@ -0,0 +1,258 @@
+"""
+Kommandozeile und Programmierschnittstelle für den Stempellauf.
+
+``run(config)`` stempelt und verteilt eine Klasse ohne Benutzereingaben
+und kann im selben Interpreter beliebig oft aufgerufen werden.
+``main(argv)`` ist der Einstiegspunkt des Befehls ``test-handler``; mit
+``--manifest`` verarbeitet er viele Klassen in einem Stapellauf.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from test_handler import __version__
+from test_handler.config import Config, ConfigError, DataError
+from test_handler.instrumentation import Instrumentation
+
+
+def run(config: Config, instrumentation: Instrumentation = None) -> list:
+    """
+    Stempelt und verteilt alle Schüler einer Klasse.
+
+    Die schweren Abhängigkeiten (pandas, matplotlib, PyMuPDF) werden erst
+    beim ersten Aufruf importiert; weitere Aufrufe im selben Prozess
+    zahlen keine Importkosten mehr.
+
+    Args:
+        config: Konfiguration mit Pfaden, Renderer und Anzahl Worker.
+        instrumentation: Optionale ``Instrumentation`` für Zeiten, Zähler
+            und Profile des Laufs.
+
+    Returns:
+        Pfade der geschriebenen Dateien in Reihenfolge der Notentabelle.
+    """
+    from test_handler.engine import PipelineEngine
+
+    return PipelineEngine(config, instrumentation).run()
+
+
+def _parser_creator() -> argparse.ArgumentParser:
+    """Erstellt den Argumentparser des Befehls ``test-handler``."""
+    parser = argparse.ArgumentParser(
+        prog='test-handler',
+        description='Stempelt Korrekturfahnen mit der Note jedes Schülers '
+                    'und legt sie in einem Ordner pro Schüler ab.',
+        epilog='Nicht angegebene Werte stammen aus den Umgebungsvariablen '
+               'TEST_HANDLER_<NAME>, der TOML-Datei oder den Standardwerten.')
+    parser.add_argument('--doc', help='Pfad zur Korrekturfahne (PDF)')
+    parser.add_argument('--data', help='Pfad zur Notentabelle (CSV)')
+    parser.add_argument('--destination-folder', dest='destination_folder',
+                        help='Zielordner der gestempelten Dateien')
+    parser.add_argument('--renderer',
+                        help="Stempeldarstellung: 'raster', 'vector' oder "
+                             "'native'")
+    parser.add_argument('--workers', type=int,
+                        help='Anzahl Prozesse (0: alle CPU-Kerne)')
+    parser.add_argument('--cache',
+                        help='Ordner des Stempel-Caches; unveränderte '
+                             'Stempel werden wiederverwendet')
+    parser.add_argument('--cache-size', dest='cache_size', type=float,
+                        help='Höchstgröße des Stempel-Caches in MB '
+                             '(Standard: 256)')
+    parser.add_argument('--incremental', action='store_true', default=None,
+                        help='Nur Dateien neu schreiben, deren Seiten, '
+                             'Notenzeile oder Klassenstatistik sich seit '
+                             'dem letzten Lauf geändert haben')
+    parser.add_argument('--memory-limit', dest='memory_limit', type=float,
+                        help='Streaming-Modus: Speicherobergrenze pro '
+                             'Prozess in MB für sehr große Korrekturfahnen')
+    parser.add_argument('--write-concurrency', dest='write_concurrency',
+                        type=int,
+                        help='Schreib-Threads pro Prozess, z. B. für '
+                             'Netzlaufwerke (Standard: 1, 0: ohne '
+                             'Hintergrund-Schreiber)')
+    parser.add_argument('--csv-engine', dest='csv_engine',
+                        help="Parser der Notentabelle: 'c' (Standard), "
+                             "'python' oder 'pyarrow'")
+    parser.add_argument('--save-profile', dest='save_profile',
+                        help="Kompression der Ausgabedateien: 'fast', "
+                             "'balanced' (Standard) oder 'archive'")
+    parser.add_argument('--password',
+                        help="Passwort jeder Schülerdatei als Vorlage mit "
+                             "Spalten der Notentabelle, z. B. "
+                             "'{Geburtsdatum}' (AES-256)")
+    parser.add_argument('--owner-password', dest='owner_password',
+                        help='Besitzerpasswort der Schülerdateien (Standard: '
+                             'gleich dem Passwort)')
+    parser.add_argument('--author',
+                        help='Autor in den Metadaten der Schülerdateien')
+    parser.add_argument('--document-title', dest='document_title',
+                        help="Titel in den Metadaten als Vorlage "
+                             "(Standard mit Passwort oder Autor: '{Titel}')")
+    parser.add_argument('--page-index', dest='page_index',
+                        action='store_true', default=None,
+                        help='Seitenbereiche aus Namen und Trennblättern der '
+                             'Korrekturfahne erkennen; ergänzt fehlende '
+                             'First/Last-Spalten und prüft vorhandene')
+    parser.add_argument('--placement',
+                        help="Platzierung der Stempel: 'fixed' (Standard) "
+                             "oder 'auto' (freie Stellen der Seite)")
+    parser.add_argument('--summary-page', dest='summary_page',
+                        help="Seite des Notenstempels: 'first' (Standard) "
+                             "oder 'last'")
+    parser.add_argument('--tasks',
+                        help="Spalten mit Aufgabenpunkten, je ein Stempel "
+                             "auf der Seite der Aufgabe, z. B. 'A1,A2,A3@2'")
+    parser.add_argument('--class-report', dest='class_report',
+                        action='store_true', default=None,
+                        help='Klassenbericht class_report.pdf mit '
+                             'Verteilung, Rangliste und Kennzahlen im '
+                             'Zielordner schreiben')
+    parser.add_argument('--report-format', dest='report_format',
+                        help="Export der Rangliste: 'csv' (Standard) oder "
+                             "'parquet'")
+    parser.add_argument('--journal', action='store_true', default=None,
+                        help='Fertige Dateien laufend im Zielordner '
+                             'festhalten; ein abgebrochener Lauf setzt beim '
+                             'nächsten Start dort fort')
+    parser.add_argument('--order',
+                        help="Reihenfolge: 'split_first' (erst aufteilen), "
+                             "'stamp_first' (erst stempeln) oder 'auto' "
+                             "(Standard, geschätzt günstigere)")
+    parser.add_argument('--config', help='TOML-Datei mit Einstellungen')
+    parser.add_argument('--manifest',
+                        help='Stapellauf: TOML- oder CSV-Datei mit vielen '
+                             'Aufträgen (doc, data, destination_folder)')
+    parser.add_argument('--summary',
+                        help='JSON-Zusammenfassung des Stapellaufs '
+                             '(Standard: <manifest>.summary.json)')
+    parser.add_argument('--report',
+                        help='JSON-Bericht mit Zeiten pro Stufe und Schüler '
+                             'sowie Zählern')
+    parser.add_argument('--profile', action='store_true',
+                        help='cProfile-Auszug in den Bericht aufnehmen')
+    parser.add_argument('--trace-memory', dest='trace_memory',
+                        action='store_true',
+                        help='Spitzenspeicher (tracemalloc) in den Bericht '
+                             'aufnehmen')
+    parser.add_argument('--quiet', action='store_true',
+                        help='Keine Ausgabe der geschriebenen Dateien')
+    parser.add_argument('--version', action='version',
+                        version=f'%(prog)s {__version__}')
+
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """
+    Einstiegspunkt des Befehls ``test-handler``.
+
+    Args:
+        argv: Argumente ohne Programmnamen (Standard: ``sys.argv[1:]``).
+
+    Returns:
+        Exit-Code (0 bei Erfolg, 2 bei ungültiger Konfiguration oder
+        Notentabelle).
+    """
+    parser = _parser_creator()
+    args = parser.parse_args(argv)
+    if (args.profile or args.trace_memory) and args.report is None:
+        parser.error('--profile und --trace-memory benötigen --report')
+
+    try:
+        config = Config.load(file=args.config, doc=args.doc, data=args.data,
+                             destination_folder=args.destination_folder,
+                             renderer=args.renderer, workers=args.workers,
+                             cache=args.cache, cache_size=args.cache_size,
+                             incremental=args.incremental,
+                             memory_limit=args.memory_limit,
+                             write_concurrency=args.write_concurrency,
+                             csv_engine=args.csv_engine,
+                             save_profile=args.save_profile,
+                             password=args.password,
+                             owner_password=args.owner_password,
+                             author=args.author,
+                             document_title=args.document_title,
+                             page_index=args.page_index,
+                             placement=args.placement,
+                             summary_page=args.summary_page,
+                             tasks=args.tasks,
+                             class_report=args.class_report,
+                             report_format=args.report_format,
+                             journal=args.journal, order=args.order)
+        if args.manifest is not None:
+            return _batch_main(args, config)
+        instrumentation = Instrumentation(profile=args.profile,
+                                          memory=args.trace_memory)
+        instrumentation.start()
+        try:
+            written = run(config, instrumentation)
+        finally:
+            instrumentation.stop()
+    except (ConfigError, DataError, FileNotFoundError) as error:
+        print(f'test-handler: Fehler: {error}', file=sys.stderr)
+        return 2
+
+    if args.report is not None:
+        instrumentation.report_writer(args.report)
+
+    if not args.quiet:
+        for path in written:
+            print(path)
+        print(f'{len(written)} Dateien in {Path(config.destination_folder)}',
+              file=sys.stderr)
+
+    return 0
+
+
+def _batch_main(args: argparse.Namespace, config: Config) -> int:
+    """
+    Führt einen Stapellauf aus und schreibt die Zusammenfassung.
+
+    Args:
+        args: Geparste Argumente mit ``manifest`` und ``summary``.
+        config: Konfiguration für Renderer und Anzahl Worker.
+
+    Returns:
+        Exit-Code (0 wenn alle Aufträge gelungen sind, sonst 1).
+    """
+    from test_handler.batch import BatchRunner, Manifest
+
+    manifest = Manifest(args.manifest, renderer=config.renderer,
+                        cache=config.cache, cache_size=config.cache_size,
+                        incremental=config.incremental,
+                        memory_limit=config.memory_limit,
+                        write_concurrency=config.write_concurrency,
+                        csv_engine=config.csv_engine,
+                        save_profile=config.save_profile,
+                        password=config.password,
+                        owner_password=config.owner_password,
+                        author=config.author,
+                        document_title=config.document_title,
+                        page_index=config.page_index,
+                        placement=config.placement,
+                        summary_page=config.summary_page,
+                        tasks=config.tasks,
+                        class_report=config.class_report,
+                        report_format=config.report_format,
+                        journal=config.journal, order=config.order)
+    runner = BatchRunner(manifest, workers=config.workers or None)
+    summary = runner.run()
+
+    summary_path = args.summary or str(Path(args.manifest).with_suffix(
+        '.summary.json'))
+    runner.summary_writer(summary, summary_path)
+
+    if not args.quiet:
+        for result in summary['results']:
+            print(f"{result['name']}: {result['status']}, "
+                  f"{result['files']} Dateien, {result['seconds']:.2f} s")
+        print(f"{summary['jobs']} Aufträge, {summary['failed']} fehlgeschlagen, "
+              f"Zusammenfassung in {summary_path}", file=sys.stderr)
+
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,362 @@
+"""
+Konfiguration für nicht-interaktive Läufe.
+
+Die Pfade zur Notentabelle, zur Korrekturfahne und zum Zielordner sowie
+Renderer, Anzahl Worker und Schreib-Threads, Cache, inkrementeller Modus,
+Speicherobergrenze, CSV-Parser, Speicherprofil, Seitenindex, Layout der
+Stempel sowie Passwörter und Metadaten der Schülerdateien können aus Kommandozeilenargumenten,
+Umgebungsvariablen oder einer TOML-Datei stammen. Spätere Quellen
+überschreiben frühere: Standardwerte < TOML-Datei < Umgebung < Argumente.
+"""
+
+import os
+
+from test_handler.layout import StampLayout
+from test_handler.save_profiles import SAVE_PROFILES
+
+
+class ConfigError(ValueError):
+    """Ungültige oder unvollständige Konfiguration."""
+
+
+class DataError(ValueError):
+    """Ungültige Notentabelle, z. B. überlappende Seitenbereiche."""
+
+
+def toml_loader(path: str) -> dict:
+    """
+    Liest eine TOML-Datei.
+
+    Der Parser wird erst hier importiert, damit Läufe ohne TOML-Datei
+    ihn nicht laden.
+
+    Args:
+        path: Pfad zur TOML-Datei.
+
+    Returns:
+        Inhalt der Datei als Dictionary.
+    """
+    try:
+        import tomllib
+    except ModuleNotFoundError:  # Python < 3.11
+        try:
+            import tomli as tomllib
+        except ModuleNotFoundError:
+            raise ConfigError('Zum Lesen von TOML-Dateien wird unter '
+                              'Python < 3.11 das Paket tomli benötigt.') from None
+
+    with open(path, 'rb') as file:
+        return tomllib.load(file)
+
+
+class Config:
+    """
+    Einstellungen eines Laufs.
+
+    Ein Config-Objekt kann überall dort verwendet werden, wo ein
+    Pathfinder erwartet wird: Es besitzt dieselben Attribute ``doc``,
+    ``data`` und ``destination_folder``, fragt aber nie nach.
+    """
+
+    DEFAULTS = {
+        'doc': './data/fahne.pdf',
+        'data': './data/steuerung.csv',
+        'destination_folder': './data/output/',
+        'renderer': 'raster',
+        'workers': 1,
+        'cache': None,
+        'cache_size': 256,
+        'incremental': False,
+        'memory_limit': None,
+        'write_concurrency': 1,
+        'csv_engine': 'c',
+        'save_profile': 'balanced',
+        'password': None,
+        'owner_password': None,
+        'author': None,
+        'document_title': None,
+        'page_index': False,
+        'placement': 'fixed',
+        'summary_page': 'first',
+        'tasks': None,
+        'class_report': False,
+        'report_format': 'csv',
+        'journal': False,
+        'order': 'auto',
+    }
+    # Werden in der Darstellung der Konfiguration nicht gezeigt
+    SECRETS = ('password', 'owner_password')
+    CSV_ENGINES = ('c', 'python', 'pyarrow')
+    REPORT_FORMATS = ('csv', 'parquet')
+    ORDERS = ('auto', 'split_first', 'stamp_first')
+    TRUE_VALUES = ('1', 'true', 'yes', 'on', 'ja')
+    FALSE_VALUES = ('0', 'false', 'no', 'off', 'nein', '')
+    ENV_PREFIX = 'TEST_HANDLER_'
+    ENV_FILE = 'TEST_HANDLER_CONFIG'
+
+    def __init__(self, doc: str = None, data: str = None,
+                 destination_folder: str = None, renderer: str = None,
+                 workers: int = None, cache: str = None,
+                 cache_size: int = None, incremental: bool = None,
+                 memory_limit: float = None, write_concurrency: int = None,
+                 csv_engine: str = None, save_profile: str = None,
+                 password: str = None, owner_password: str = None,
+                 author: str = None, document_title: str = None,
+                 page_index: bool = None, placement: str = None,
+                 summary_page: str = None, tasks: str = None,
+                 class_report: bool = None, report_format: str = None,
+                 journal: bool = None, order: str = None):
+        """
+        Initialisiert die Konfiguration; fehlende Werte werden ergänzt.
+
+        Args:
+            doc: Pfad zur Korrekturfahne.
+            data: Pfad zur CSV-Notentabelle.
+            destination_folder: Zielordner für die gestempelten Dateien.
+            renderer: Darstellung des Stempels ('raster', 'vector' oder
+                'native').
+            workers: Anzahl Prozesse; 0 verwendet alle CPU-Kerne.
+            cache: Optionaler Ordner des Stempel-Caches.
+            cache_size: Höchstgröße des Stempel-Caches in MB.
+            incremental: Nur Ausgabedateien mit geänderten Eingaben neu
+                schreiben.
+            memory_limit: Optionale Speicherobergrenze pro Prozess in MB;
+                schaltet den Streaming-Modus ein.
+            write_concurrency: Anzahl Threads pro Worker, die fertige
+                Dateien im Hintergrund schreiben; 0 schreibt sofort.
+            csv_engine: Parser für die Notentabelle ('c', 'python' oder
+                'pyarrow'; letzterer benötigt das Paket pyarrow).
+            save_profile: Kompression der Ausgabedateien ('fast',
+                'balanced' oder 'archive').
+            password: Vorlage für das Passwort jeder Schülerdatei mit
+                Spalten der Notentabelle, z. B. '{Geburtsdatum}';
+                schaltet die AES-256-Verschlüsselung ein.
+            owner_password: Vorlage für das Besitzerpasswort (Standard:
+                gleich dem Passwort).
+            author: Vorlage für den Autor in den Metadaten.
+            document_title: Vorlage für den Titel in den Metadaten
+                (Standard: '{Titel}').
+            page_index: Seitenbereiche aus der Korrekturfahne erkennen
+                und mit ``First``/``Last`` abgleichen bzw. diese ergänzen.
+            placement: Platzierung der Stempel ('fixed' oder 'auto' für
+                freie Stellen der Seite).
+            summary_page: Seite des Notenstempels ('first' oder 'last').
+            tasks: Spalten mit Aufgabenpunkten für Stempel auf den
+                einzelnen Seiten, z. B. 'A1,A2,A3@2'.
+            class_report: Klassenbericht ``class_report.pdf`` samt Export
+                der Rangliste im Zielordner schreiben.
+            report_format: Format des Exports ('csv' oder 'parquet';
+                letzteres benötigt pyarrow oder fastparquet).
+            journal: Jede fertige Schülerdatei in einem Journal im
+                Zielordner festhalten; ein abgebrochener Lauf setzt beim
+                nächsten Start dort fort.
+            order: Reihenfolge von Stempeln und Aufteilen ('split_first',
+                'stamp_first' oder 'auto' für die geschätzt günstigere;
+                Standard 'auto').
+        """
+        values = {'doc': doc, 'data': data,
+                  'destination_folder': destination_folder,
+                  'renderer': renderer, 'workers': workers,
+                  'cache': cache, 'cache_size': cache_size,
+                  'incremental': incremental, 'memory_limit': memory_limit,
+                  'write_concurrency': write_concurrency,
+                  'csv_engine': csv_engine, 'save_profile': save_profile,
+                  'password': password, 'owner_password': owner_password,
+                  'author': author, 'document_title': document_title,
+                  'page_index': page_index, 'placement': placement,
+                  'summary_page': summary_page, 'tasks': tasks,
+                  'class_report': class_report,
+                  'report_format': report_format, 'journal': journal,
+                  'order': order}
+        for key, value in values.items():
+            if value is None:
+                value = self.DEFAULTS[key]
+            setattr(self, key, value)
+
+        self.workers = self._workers_checker(self.workers)
+        self.write_concurrency = self._workers_checker(
+            self.write_concurrency, 'Anzahl Schreib-Threads')
+        try:
+            self.cache_size = float(self.cache_size)
+        except (TypeError, ValueError):
+            raise ConfigError('Ungültige Cache-Größe: '
+                              f'{self.cache_size!r}') from None
+        self.incremental = self._flag_checker('incremental', self.incremental)
+        self.page_index = self._flag_checker('page_index', self.page_index)
+        self.class_report = self._flag_checker('class_report',
+                                               self.class_report)
+        self.journal = self._flag_checker('journal', self.journal)
+        if self.memory_limit is not None:
+            self.memory_limit = self._memory_limit_checker(self.memory_limit)
+        if self.csv_engine not in self.CSV_ENGINES:
+            raise ConfigError(f'Unbekannter CSV-Parser: {self.csv_engine!r}')
+        if self.order not in self.ORDERS:
+            raise ConfigError(f'Unbekannte Reihenfolge: {self.order!r}')
+        if self.report_format not in self.REPORT_FORMATS:
+            raise ConfigError('Unbekanntes Exportformat: '
+                              f'{self.report_format!r}')
+        if self.save_profile not in SAVE_PROFILES:
+            raise ConfigError('Unbekanntes Speicherprofil: '
+                              f'{self.save_profile!r}')
+        try:
+            StampLayout.from_config(self).validate()
+        except ValueError as error:
+            raise ConfigError(str(error)) from None
+
+    def __repr__(self) -> str:
+        fields = ', '.join(
+            f'{key}=***' if key in self.SECRETS and getattr(self, key)
+            else f'{key}={getattr(self, key)!r}'
+            for key in self.DEFAULTS)
+        return f'Config({fields})'
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Config):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def as_dict(self) -> dict:
+        """Gibt alle Einstellungen als Dictionary zurück."""
+        return {key: getattr(self, key) for key in self.DEFAULTS}
+
+    def _workers_checker(self, workers, label: str = 'Anzahl Worker') -> int:
+        """
+        Prüft die Anzahl Worker bzw. Threads.
+
+        Args:
+            workers: Anzahl als Zahl oder Text.
+            label: Bezeichnung für die Fehlermeldung.
+
+        Returns:
+            Nicht-negative Anzahl (0 bedeutet bei Workern alle CPU-Kerne).
+        """
+        try:
+            workers = int(workers)
+        except (TypeError, ValueError):
+            raise ConfigError(f'Ungültige {label}: {workers!r}') from None
+        if workers < 0:
+            raise ConfigError(f'Ungültige {label}: {workers!r}')
+
+        return workers
+
+    def _memory_limit_checker(self, memory_limit) -> float:
+        """
+        Prüft die Speicherobergrenze.
+
+        Args:
+            memory_limit: Obergrenze in MB als Zahl oder Text.
+
+        Returns:
+            Obergrenze in MB.
+        """
+        try:
+            value = float(memory_limit)
+        except (TypeError, ValueError):
+            value = None
+        if value is None or value <= 0:
+            raise ConfigError('Ungültige Speicherobergrenze: '
+                              f'{memory_limit!r}')
+
+        return value
+
+    def _flag_checker(self, name: str, value) -> bool:
+        """
+        Prüft einen Schalter.
+
+        Args:
+            name: Name der Einstellung für die Fehlermeldung.
+            value: Wahrheitswert oder Text aus der Umgebung, z. B. '1'
+                oder 'false'.
+
+        Returns:
+            Wahrheitswert des Schalters.
+        """
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in self.TRUE_VALUES:
+            return True
+        if text in self.FALSE_VALUES:
+            return False
+
+        raise ConfigError(f'Ungültiger Wert für {name}: {value!r}')
+
+    @classmethod
+    def from_toml(cls, path: str) -> dict:
+        """
+        Liest Einstellungen aus einer TOML-Datei.
+
+        Die Werte dürfen auf oberster Ebene oder in einer Tabelle
+        ``[test_handler]`` stehen. Relative Pfade gelten relativ zur
+        TOML-Datei.
+
+        Args:
+            path: Pfad zur TOML-Datei.
+
+        Returns:
+            Dictionary mit den gefundenen Einstellungen.
+        """
+        content = toml_loader(path)
+        content = content.get('test_handler', content)
+
+        unknown = set(content) - set(cls.DEFAULTS)
+        if unknown:
+            raise ConfigError(f'Unbekannte Einstellungen in {path}: '
+                              f'{", ".join(sorted(unknown))}')
+
+        # Pfade relativ zur Konfigurationsdatei auflösen
+        base = os.path.dirname(os.path.abspath(path))
+        for key in ('doc', 'data', 'destination_folder', 'cache'):
+            if key in content:
+                content[key] = os.path.join(base, content[key])
+
+        return content
+
+    @classmethod
+    def from_env(cls, environ: dict = None) -> dict:
+        """
+        Liest Einstellungen aus Umgebungsvariablen.
+
+        Beispiel: ``TEST_HANDLER_DOC``, ``TEST_HANDLER_DESTINATION_FOLDER``.
+
+        Args:
+            environ: Umgebung (Standard: ``os.environ``).
+
+        Returns:
+            Dictionary mit den gesetzten Einstellungen.
+        """
+        if environ is None:
+            environ = os.environ
+
+        return {key: environ[cls.ENV_PREFIX + key.upper()]
+                for key in cls.DEFAULTS
+                if environ.get(cls.ENV_PREFIX + key.upper())}
+
+    @classmethod
+    def load(cls, file: str = None, environ: dict = None,
+             **overrides) -> 'Config':
+        """
+        Führt alle Quellen zu einer Konfiguration zusammen.
+
+        Args:
+            file: Optionale TOML-Datei (Standard: ``TEST_HANDLER_CONFIG``).
+            environ: Umgebung (Standard: ``os.environ``).
+            **overrides: Explizite Werte, z. B. aus Argumenten; ``None``
+                wird ignoriert.
+
+        Returns:
+            Vollständige Konfiguration.
+        """
+        if environ is None:
+            environ = os.environ
+        if file is None:
+            file = environ.get(cls.ENV_FILE) or None
+
+        values = {}
+        if file is not None:
+            values.update(cls.from_toml(file))
+        values.update(cls.from_env(environ))
+        values.update({key: value for key, value in overrides.items()
+                       if value is not None})
+
+        return cls(**values)
@@ -1,26 +1,51 @@
 # core.py
-import pandas as pd
-import matplotlib.pyplot as plt
+import io
 import os
-import time
-import pymupdf  # PyMuPDF
-from PIL import Image
+import sys
+
+from test_handler._lazy import LazyModule
+from test_handler.cache import StampCache
+from test_handler.config import Config
+from test_handler.engine import PipelineEngine
+from test_handler.extract import PageRangeExtractor
+from test_handler.layout import free_region_finder, occupancy_analyzer
+from test_handler.stamper import DataHandler, StudentRecord
+from test_handler.stats import horizontal_options
+
+# Schwere Abhängigkeiten erst bei Bedarf laden, matplotlib immer mit Agg
+plt = LazyModule('matplotlib.pyplot', backend='Agg')
+pymupdf = LazyModule('pymupdf')  # PyMuPDF
+Image = LazyModule('PIL.Image')
 
 class Importer:
-    def __init__(self) -> None:
-        self.path_steuerdatei = self._path_dialog_steuerdatei()
-        self.path_fahne = self._path_dialog_fahne()
-        self.path_to_save = self._path_to_save_dialog()
+    def __init__(self, path_steuerdatei: str = None, path_fahne: str = None,
+                 path_to_save: str = None, path_cache: str = None) -> None:
+        # Nur fehlende Pfade abfragen
+        self.path_steuerdatei = (path_steuerdatei if path_steuerdatei is not None
+                                 else self._path_dialog_steuerdatei())
+        self.path_fahne = (path_fahne if path_fahne is not None
+                           else self._path_dialog_fahne())
+        self.path_to_save = (path_to_save if path_to_save is not None
+                             else self._path_to_save_dialog())
         self.path_tmp = os.path.join(self.path_to_save, 'tmp')
         self.path_output = os.path.join(self.path_to_save, 'output')
+        # Stempel bleiben im Speicher; unveränderte kommen aus dem Cache
+        self.cache = StampCache(path_cache if path_cache is not None
+                                else os.path.join(self.path_to_save, 'cache'))
 
         os.makedirs(self.path_tmp, exist_ok=True)
         os.makedirs(self.path_output, exist_ok=True)
 
-        self.df = pd.read_csv(self.path_steuerdatei, 
-                              sep=';',
-                              encoding='utf-8')
-        self.df = self._df_cleaner()
+        # Notendaten wie in der Pipeline laden: ein Datensatz pro Schüler
+        # mit eindeutigem Schlüssel, auch bei gleichen Nachnamen
+        self.config = Config(data=self.path_steuerdatei, doc=self.path_fahne,
+                             destination_folder=self.path_output,
+                             cache=str(self.cache.folder))
+        self.data = DataHandler(self.config)
+        self.df = self.data.df
+        self.records = self.data.records
+        # Notenstatistik einmal für alle Stempel
+        self.statistics = self.data.statistics
         self.doc = pymupdf.open(self.path_fahne)
         
         
@@ -49,55 +74,40 @@ class Importer:
 
         return path_input  # ✓ KORRIGIERT
 
-    def _df_cleaner(self):
-        df = self.df
-        df = df.dropna()
-        df = df.rename(columns=lambda x: x.replace('Nachname', 'Name') if x.startswith('Nach') else x)
-
-        umlaute_map = str.maketrans({
-            'ä': 'ae', 'ö': 'oe', 'ü': 'ue',
-            'Ä': 'Ae', 'Ö': 'Oe', 'Ü': 'Ue',
-            })
-        
-        df['Name'] = df['Name'].str.translate(umlaute_map)
-
-        df = df.set_index('Name')
-
-        return df
-
     def main(self):
         return self.df
 
 
 class StampCreator:
-    def __init__(self, name: str, importer: Importer) -> None:
-        self.name = name
-        self.df   = importer.df
-        self.path_tmp = importer.path_tmp
+    def __init__(self, student: StudentRecord, importer: Importer) -> None:
+        self.student = student
+        self.statistics = importer.statistics
+        self.cache = importer.cache
+
+    def boxplot(self) -> bytes:
+        # Unveränderte Stempel nicht neu zeichnen
+        key = self.cache.key_creator('core-stamp',
+                                     self.statistics.fingerprint(),
+                                     self.student.note, self.student.total,
+                                     self.student.vorname)
+        stamp = self.cache.load(key)
+        if stamp is not None:
+            return stamp
 
-    def boxplot(self):
         # Create a figure and axis
         fig, ax = plt.subplots()
 
-        q1 = self.df['Note'].quantile(0.25)
-        q3 = self.df['Note'].quantile(0.75)
-
-        if q1 > 4:
-            box_color = 'green' 
-        elif q3 < 4:
-            box_color = 'red'
-        else:
-            box_color = 'orange'
+        box_color = self.statistics.box_color()
 
-        # Create a boxplot for the desired column
-        bplot = ax.boxplot(self.df['Note'], 
-                   vert=False, 
-                   patch_artist=True)
+        # Create a boxplot from the precomputed class statistics
+        bplot = ax.bxp([self.statistics.boxplot_stats()], 
+                   patch_artist=True, 
+                   **horizontal_options(ax))
         bplot['boxes'][0].set_facecolor(box_color)
         bplot['boxes'][0].set_alpha(0.6)
 
-        val_total = self.df.loc[self.name, 'Total']  # ✓ KORRIGIERT
-        val_note  = self.df.loc[self.name, 'Note']   # ✓ KORRIGIERT
+        val_total = self.student.total
+        val_note  = self.student.note
 
         cell_text = [
             ['Punkte', f"{val_total}"],
@@ -116,10 +126,8 @@ class StampCreator:
         table.scale(1, 2)
         table.set_fontsize(12)
 
-        individuelle_note = self.df.loc[self.name, 'Note']  # ✓ KORRIGIERT
-    
         ax.scatter(
-            x=individuelle_note, 
+            x=val_note, 
             y=1,
             color='blue',
             marker='o',
@@ -129,44 +137,41 @@ class StampCreator:
 
         ax.set_yticks([])
         ax.set_xlabel('Note')
-        ax.set_title(f'Individuelle Note von {self.df.loc[self.name, "Vorname"]} und Notenverteilung')  # ✓ KORRIGIERT
+        ax.set_title(f'Individuelle Note von {self.student.vorname} und Notenverteilung')
 
-        stamp_path = os.path.join(self.path_tmp, 'stamp.png')        
-        fig.savefig(stamp_path)
-        
-        # ✓ WICHTIG: Figur schließen, damit die Datei freigegeben wird
+        # PNG im Speicher statt tmp/stamp.png schreiben und wieder lesen
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png')
         plt.close(fig)
+        stamp = buffer.getvalue()
+        self.cache.store(key, stamp)
 
-        return fig
-
-    def stamp_remover(self) -> None:
-        stamp_path = os.path.join(self.path_tmp, 'stamp.png')
-        os.remove(stamp_path)
+        return stamp
 
 
 class Stamper:
-    def __init__(self, name, importer: Importer):
-        self.name = name
-        self.df   = importer.df
+    def __init__(self, student: StudentRecord, importer: Importer,
+                 stamp: bytes):
+        self.student = student
+        self.stamp = stamp
         self.path_tmp = importer.path_tmp
         self.path_output = importer.path_output
         self.doc = importer.doc
 
         self.file_path = self._file_path_creator()
 
-        # ✓ Bildgröße mit context manager auslesen (schließt automatisch)
-        stamp_path = os.path.join(self.path_tmp, 'stamp.png')
-        with Image.open(stamp_path) as img:
+        # Bildgröße aus dem Kopf des PNG
+        with Image.open(io.BytesIO(stamp)) as img:
             self.stamp_width, self.stamp_height = img.size
 
         # ✓ ENTFERNT: _page_extractor() - wird nicht mehr benötigt
         
     def _file_path_creator(self):
-        clean_title = str(self.df.loc[self.name, 'Titel']).strip()  # ✓ KORRIGIERT
-        clean_date  = str(self.df.loc[self.name, 'Datum']).strip()  # ✓ KORRIGIERT
-        file_name   = f'{clean_date}_{self.name}_{clean_title}.pdf'
+        clean_title = str(self.student.titel).strip()
+        clean_date  = str(self.student.datum).strip()
+        file_name   = f'{clean_date}_{self.student.key}_{clean_title}.pdf'
 
-        path = os.path.join(self.path_tmp, self.name, file_name)
+        path = os.path.join(self.path_tmp, self.student.key, file_name)
 
         return path
     
@@ -174,6 +179,8 @@ class Stamper:
         """
         Stempelt die Seite und speichert sie im tmp/<Name>/ Ordner
         (überschreibt die Original-Datei ohne Suffix)
+        position: Linke obere Ecke in Punkten oder 'auto' für die
+                  nächstgelegene freie Stelle der ersten Seite
         max_width: Maximale Breite des Stempels auf dem PDF in Punkten
         """
         # Berechne Höhe basierend auf dem Seitenverhältnis
@@ -183,11 +190,6 @@ class Stamper:
         
         print(f"Original-Stempel: {self.stamp_width} x {self.stamp_height} px")
         print(f"Auf PDF: {stamp_width:.1f} x {stamp_height:.1f} Punkte")
-              
-        x, y = position
-        img_rect = pymupdf.Rect(x, y, x + stamp_width, y + stamp_height)
-        
-        stamp_path = os.path.join(self.path_tmp, 'stamp.png')
         
         # Output-Pfad ist gleich Input-Pfad (im tmp/<Name>/ Ordner)
         output_path = self.file_path
@@ -199,7 +201,14 @@ class Stamper:
         
         # ✓ Dokument EINMALIG öffnen, stempeln, temporär speichern und schließen
         doc = pymupdf.open(self.file_path)
-        doc[0].insert_image(img_rect, filename=stamp_path)
+        page = doc[0]
+        if position == 'auto':
+            position, _ = free_region_finder(
+                occupancy_analyzer(page), stamp_width, stamp_height,
+                (400, 100), (page.rect.width, page.rect.height))
+        x, y = position
+        img_rect = pymupdf.Rect(x, y, x + stamp_width, y + stamp_height)
+        page.insert_image(img_rect, stream=self.stamp)
         doc.save(temp_path)
         doc.close()
         
@@ -212,65 +221,43 @@ class Stamper:
 
 class Resampler:
     def __init__(self, importer: Importer):
-        self.df = importer.df
+        self.records = importer.records
         self.path_tmp = importer.path_tmp
         self.doc = importer.doc
 
     def folder_creator(self) -> None:
-        for name in self.df.index:
-            path = os.path.join(self.path_tmp, name)
+        # Ein Ordner pro Schlüssel; gleiche Nachnamen teilen keinen Ordner
+        for student in self.records:
+            path = os.path.join(self.path_tmp, student.key)
             os.makedirs(path, exist_ok=True)
 
     def spliter(self) -> None:
-        for name in self.df.index:
-            start_page = int(self.df.loc[name, 'First'] - 1)
-            end_page = int(self.df.loc[name, 'Last'] - 1)
+        # Ressourcen der Fahne einmal analysieren statt pro Schüler kopieren
+        extractor = PageRangeExtractor(self.doc)
+        for student in self.records:
+            new_doc = extractor.extract(student.first, student.last)
             
-            new_doc = pymupdf.open()
-            new_doc.insert_pdf(self.doc, from_page=start_page, to_page=end_page)
+            clean_title = str(student.titel).strip()
+            clean_date = str(student.datum).strip()
+            file_name = f'{clean_date}_{student.key}_{clean_title}.pdf'
             
-            clean_title = str(self.df.loc[name, 'Titel']).strip()
-            clean_date = str(self.df.loc[name, 'Datum']).strip()
-            file_name = f'{clean_date}_{name}_{clean_title}.pdf'
-            
-            save_path = os.path.join(self.path_tmp, name, file_name)
+            save_path = os.path.join(self.path_tmp, student.key, file_name)
             new_doc.save(save_path)
             new_doc.close()
 
 
 if __name__ == '__main__':
-    # Importer erstellen
+    # Pfade abfragen, Notendaten laden und prüfen
     importer = Importer()
     print(importer.df.head())
-    
-    # Resampler mit Importer-Instanz
-    sampler = Resampler(importer)
-    sampler.folder_creator()
-    sampler.spliter()
-    
-    # Über alle Schüler iterieren
-    for name in importer.df.index:
-        print(f"\nVerarbeite {name}...")
-        
-        # StampCreator mit Importer-Instanz
-        stamp = StampCreator(name, importer)
-        stamp.boxplot()
-        
-        # Stamper mit Importer-Instanz
-        stamp_pad = Stamper(name, importer)
-        stamp_pad.stamp_and_save()
-        
-        # ✓ Kleine Pause für Windows
-        time.sleep(0.1)
-        
-        # ✓ Aufräumen (wieder aktiviert)
-        stamp.stamp_remover()
-        
-        print(f"✓ {name} fertig!")
-    
-    # Dokument schließen
     importer.doc.close()
     
-    print("\n=== Alle Schüler verarbeitet ===")
-    input('Enter drücken, um die Anzeige zu beenden.')
-
+    # Stempeln, Aufteilen und Schreiben übernimmt dieselbe Engine wie die
+    # Kommandozeile; die Dateien landen in output/<Schlüssel>/
+    written = PipelineEngine(importer.config).run()
+    for path in written:
+        print(f"✓ {path}")
+    
+    print(f"\n=== {len(written)} Schüler verarbeitet ===")
+    if sys.stdin.isatty():
+        input('Enter drücken, um die Anzeige zu beenden.')
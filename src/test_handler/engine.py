@@ -0,0 +1,544 @@
+"""
+Stufen-Engine für Stempeln, Aufteilen und Schreiben.
+
+Ein Lauf besteht aus sechs Stufen:
+
+    load     Notentabelle und Seitenbereiche laden und prüfen
+    stats    Klassenstatistik und Klassenbericht
+    render   Stempel rendern oder aus dem Cache holen
+    compose  Stempel auf die Seiten des Zieldokuments legen
+    split    Seiten eines Schülers in ein eigenes Dokument übernehmen
+    write    Schülerdatei speichern und schreiben
+
+``load`` und ``stats`` laufen einmal pro Lauf. Die Stufen pro Schüler
+sind austauschbare Klassen (``STUDENT_STAGES``); ``ParallelPress``
+führt sie seriell oder in einem Prozesspool in der Reihenfolge des
+Plans aus:
+
+    split_first  split, render, compose, write: in jeder Schülerdatei
+                 stempeln
+    stamp_first  render, compose, split, write: in der geöffneten Fahne
+                 stempeln, dann die gestempelten Seiten übernehmen
+
+Der Renderer der Konfiguration bestimmt, wie 'render' den Stempel
+darstellt. In der Engine bleiben alle Zwischenstände im Speicher;
+``Stamper.printing_press`` und ``FileManager.file_distributor`` führen
+dieselben Stufen mit der gestempelten Fahne als Zwischenstand auf der
+Festplatte aus, ``FileManager.stamp_distributor`` die Stufen von
+'split_first'. Die interaktive Oberfläche in ``core.py`` übergibt den
+Lauf ebenfalls an die Engine.
+
+Mit der Reihenfolge 'auto' (Standard) schätzt ``order_costs`` die Kosten
+beider Reihenfolgen aus Schülerzahl, Seiten pro Schüler, Größe der
+Fahne, Renderer, Anzahl Prozesse und Speicherobergrenze und
+``plan_chooser`` wählt die günstigere. split_first zahlt für jeden
+Schüler ein eigenes Dokument, stamp_first den Speicher, den die Fahne
+mit jedem Stempel zusätzlich hält: kleine Klassen stempeln günstiger in
+der Fahne, große Klassen und Fahnen mit viel Seiteninhalt pro Schüler in
+den Schülerdateien.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import NamedTuple
+
+from test_handler._lazy import LazyModule
+from test_handler.config import Config, ConfigError
+from test_handler.instrumentation import Instrumentation
+
+pymupdf = LazyModule('pymupdf')
+
+# Koeffizienten der Schätzung für 'auto', bestimmt mit
+#
+#     python benchmarks/bench_orders.py --students 50 200 800 --pages 2 8 \
+#         --scan-dpi 0 30 --save grid.json
+#     python benchmarks/bench_orders.py --students 2000 3000 --pages 2 \
+#         --renderers native --repeat 2 --save large.json
+#     python benchmarks/bench_orders.py --load grid.json large.json --fit
+#
+# an synthetischen Klassen mit einem Worker (siehe dort).
+#
+# Kosten aller Stufen pro Schüler (render, apply, split, save, write) in
+# ms: fester Anteil je Renderer, dazu pro Seite und pro MB Seiteninhalt.
+# Der feste Anteil von split_first enthält das Öffnen und Speichern einer
+# eigenen Schülerdatei; Seiten kosten in beiden Reihenfolgen weniger, als
+# die Messungen auflösen.
+ORDER_COSTS = {
+    'split_first': {'raster': 39.56, 'vector': 29.97, 'native': 11.56,
+                    'per_page': 0.0, 'per_mb': 0.0},
+    'stamp_first': {'raster': 38.59, 'vector': 25.73, 'native': 8.83,
+                    'per_page': 0.0, 'per_mb': 1.1},
+}
+# Speicher, den stamp_first pro Stempel bis zum Ende in der Fahne hält, in
+# KB, und Anteil des Seiteninhalts, der dort zusätzlich bleibt
+HELD_KB = {'raster': 261.2, 'vector': 131.9, 'native': 346.3}
+HELD_SHARE = 0.011
+# Mehrkosten von stamp_first pro Schüler und MB, das die Fahne gerade
+# zusätzlich hält
+HELD_MS_PER_MB = 0.0242
+# Freigabe der Fahne im Streaming-Modus in ms: fest und pro MB Fahne
+RELEASE_MS = (2.34, 0.004)
+# Speicherbedarf eines Prozesses mit geladenen Bibliotheken in MB
+BASE_MB = 128
+# Obergrenze des gehaltenen Speichers ohne eingestellte Speicherobergrenze
+STAMP_MEMORY_MB = 512
+
+
+class PipelinePlan(NamedTuple):
+    """Gewählte Reihenfolge und Ausführung eines Laufs."""
+
+    order: str = 'split_first'
+    renderer: str = 'raster'
+    workers: int = 1
+    write_concurrency: int = 1
+
+    def stages(self) -> tuple:
+        """Alle Stufen des Laufs in ihrer Reihenfolge."""
+        return ('load', 'stats', *STAGE_ORDERS[self.order])
+
+
+class StudentWork:
+    """
+    Zwischenstand eines Schülers zwischen den Stufen.
+
+    Zu Beginn ist das Zieldokument die Korrekturfahne selbst; 'split'
+    ersetzt es durch das neue Dokument des Schülers.
+    """
+
+    __slots__ = ('student', 'source', 'doc', 'page', 'stamp', 'path')
+
+    def __init__(self, student, source):
+        """
+        Initialisiert den Zwischenstand eines Schülers.
+
+        Args:
+            student: Datensatz (StudentRecord) des Schülers.
+            source: Seitenauszug (PageRangeExtractor) der Fahne.
+        """
+        self.student = student
+        self.source = source
+        self.doc = source.doc
+        # Erste Seite des Schülers im Zieldokument (0-basiert)
+        self.page = student.first - 1
+        self.stamp = None
+        self.path = None
+
+
+class Stage:
+    """
+    Basis der Stufen pro Schüler.
+
+    Eine Stufe wird einmal pro Prozess mit dessen Stamper und
+    FileManager erstellt und dann für jeden Schüler mit seinem
+    ``StudentWork`` aufgerufen.
+    """
+
+    name = None
+
+    def __init__(self, stamper=None, file_manager=None):
+        """
+        Initialisiert die Stufe.
+
+        Args:
+            stamper: Stamper mit geöffneter Korrekturfahne.
+            file_manager: FileManager für Ausgabepfade und Schreiben.
+        """
+        self.stamper = stamper
+        self.file_manager = file_manager
+
+    def __call__(self, work: StudentWork) -> None:
+        raise NotImplementedError
+
+
+class RenderStage(Stage):
+    """Rendert den Stempel des Schülers oder holt ihn aus dem Cache."""
+
+    name = 'render'
+
+    def __call__(self, work: StudentWork) -> None:
+        work.stamp = self.stamper._stamp_loader(work.student)
+
+
+class ComposeStage(Stage):
+    """
+    Legt den Stempel auf die Seiten des Zieldokuments.
+
+    In der Fahne werden die Seiten vorher für den Auszug vorbereitet,
+    damit die Stempel davon unberührt bleiben wie in einer Schülerdatei.
+    """
+
+    name = 'compose'
+
+    def __call__(self, work: StudentWork) -> None:
+        student = work.student
+        if work.doc is work.source.doc:
+            work.source.preparer(student.first, student.last)
+        self.stamper._stamp_applier(student, work.stamp, work.doc, work.page)
+
+
+class SplitStage(Stage):
+    """Übernimmt die Seiten des Schülers in ein neues Dokument."""
+
+    name = 'split'
+
+    def __call__(self, work: StudentWork) -> None:
+        work.doc = self.file_manager._page_extractor(work.source,
+                                                     work.student)
+        work.page = 0
+
+
+class WriteStage(Stage):
+    """Speichert die Datei des Schülers und schließt sein Dokument."""
+
+    name = 'write'
+
+    def __call__(self, work: StudentWork) -> None:
+        work.path = self.file_manager._doc_writer(work.doc, work.student)
+        work.doc = None
+
+
+STUDENT_STAGES = {stage.name: stage for stage in (RenderStage, ComposeStage,
+                                                  SplitStage, WriteStage)}
+# Stufen pro Schüler je Reihenfolge
+STAGE_ORDERS = {
+    'split_first': ('split', 'render', 'compose', 'write'),
+    'stamp_first': ('render', 'compose', 'split', 'write'),
+}
+
+
+def stage_creator(names: tuple, stamper=None, file_manager=None,
+                  stages: dict = None) -> tuple:
+    """
+    Erstellt die Stufen pro Schüler eines Prozesses.
+
+    Args:
+        names: Namen der Stufen in ihrer Reihenfolge.
+        stamper: Stamper mit geöffneter Korrekturfahne.
+        file_manager: FileManager für Ausgabepfade und Schreiben.
+        stages: Optionale Stufen, die die Standardstufen gleichen Namens
+            ersetzen.
+
+    Returns:
+        Tupel der aufrufbaren Stufen.
+    """
+    classes = dict(STUDENT_STAGES)
+    for name, stage in (stages or {}).items():
+        if name not in classes:
+            raise ConfigError(f'Unbekannte Stufe: {name!r}')
+        classes[name] = stage
+
+    return tuple(classes[name](stamper, file_manager) for name in names)
+
+
+def student_runner(stages: tuple, student, source) -> StudentWork:
+    """
+    Führt die Stufen für einen Schüler aus.
+
+    Args:
+        stages: Stufen aus ``stage_creator``.
+        student: Datensatz des Schülers.
+        source: Seitenauszug der Fahne.
+
+    Returns:
+        Zwischenstand nach der letzten Stufe; nach 'write' mit dem Pfad
+        der geschriebenen Datei.
+    """
+    work = StudentWork(student, source)
+    for stage in stages:
+        stage(work)
+
+    return work
+
+
+def held_memory(students: int, proof_mb: float, renderer: str,
+                workers: int = 1) -> float:
+    """
+    Schätzt den Speicher, den stamp_first in einem Prozess bis zum Ende
+    zusätzlich in der Fahne hält.
+
+    Args:
+        students: Anzahl Schüler.
+        proof_mb: Inhalt ihrer Seiten in MB.
+        renderer: Darstellung des Stempels.
+        workers: Anzahl Prozesse.
+
+    Returns:
+        Gehaltener Speicher pro Prozess in MB.
+    """
+    return (-(-students // workers) * HELD_KB[renderer] / 1024
+            + proof_mb / workers * HELD_SHARE)
+
+
+def order_costs(students: int, pages: int, proof_mb: float, renderer: str,
+                workers: int = 1, memory_limit: float = None) -> dict:
+    """
+    Schätzt die Kosten der Stufen pro Schüler beider Reihenfolgen.
+
+    stamp_first wird mit dem Speicher, den die Fahne im Mittel hält,
+    langsamer. Mit Speicherobergrenze hält sie höchstens den Platz über
+    ``BASE_MB``; jede Freigabe der Fahne kostet ``RELEASE_MS``. Liegt die
+    Obergrenze darunter, geben beide Reihenfolgen die Fahne nach jedem
+    Schüler frei.
+
+    Args:
+        students: Anzahl Schüler.
+        pages: Seiten aller Schüler zusammen.
+        proof_mb: Inhalt dieser Seiten in MB.
+        renderer: Darstellung des Stempels.
+        workers: Anzahl Prozesse.
+        memory_limit: Optionale Speicherobergrenze pro Prozess in MB.
+
+    Returns:
+        Dictionary von Reihenfolge auf geschätzte Sekunden.
+    """
+    held = held_memory(students, proof_mb, renderer, workers)
+    releases = {'split_first': 0, 'stamp_first': 0}
+    if memory_limit is not None:
+        headroom = max(memory_limit - BASE_MB, 0)
+        if headroom == 0:
+            releases = dict.fromkeys(releases, students)
+        else:
+            releases['stamp_first'] = int(held // headroom) * workers
+        held = min(held, headroom)
+    release_ms = RELEASE_MS[0] + proof_mb * RELEASE_MS[1]
+
+    costs = {}
+    for order, model in ORDER_COSTS.items():
+        ms = (students * model[renderer] + pages * model['per_page']
+              + proof_mb * model['per_mb'] + releases[order] * release_ms)
+        if order == 'stamp_first':
+            ms += students * HELD_MS_PER_MB * held / 2
+        costs[order] = ms / 1000
+
+    return costs
+
+
+def plan_chooser(students: int, pages: int, proof_mb: float,
+                 renderer: str = 'raster', workers: int = 1,
+                 write_concurrency: int = 1, order: str = 'auto',
+                 memory_limit: float = None) -> PipelinePlan:
+    """
+    Wählt die Reihenfolge eines Laufs.
+
+    Bei 'auto' gewinnt die günstigere Schätzung aus ``order_costs``, bei
+    Gleichstand ``split_first``. Ohne Speicherobergrenze scheidet
+    ``stamp_first`` aus, wenn ein Prozess mehr als ``STAMP_MEMORY_MB``
+    in seiner Fahne halten würde; mit Obergrenze gibt der Streaming-Modus
+    diesen Speicher mit der Fahne frei.
+
+    Args:
+        students: Anzahl Schüler.
+        pages: Seiten aller Schüler zusammen.
+        proof_mb: Inhalt dieser Seiten in MB.
+        renderer: Darstellung des Stempels.
+        workers: Anzahl Prozesse.
+        write_concurrency: Anzahl Schreib-Threads pro Prozess.
+        order: 'auto', 'split_first' oder 'stamp_first'.
+        memory_limit: Optionale Speicherobergrenze pro Prozess in MB.
+
+    Returns:
+        Plan des Laufs.
+    """
+    if order == 'auto':
+        costs = order_costs(students, pages, proof_mb, renderer, workers,
+                            memory_limit)
+        if (memory_limit is None and held_memory(
+                students, proof_mb, renderer, workers) > STAMP_MEMORY_MB):
+            costs.pop('stamp_first')
+        order = min(costs, key=lambda key: (costs[key],
+                                            key != 'split_first'))
+
+    return PipelinePlan(order, renderer, workers, write_concurrency)
+
+
+class PipelineEngine:
+    """
+    Führt die Stufen eines Laufs aus.
+
+    Die Engine führt 'load' und 'stats' einmal aus, wählt den Plan und
+    übergibt die Stufen pro Schüler an ``ParallelPress``, das sie
+    seriell oder in einem Prozesspool ausführt.
+    """
+
+    def __init__(self, config: Config,
+                 instrumentation: Instrumentation = None,
+                 stages: dict = None):
+        """
+        Initialisiert die Engine.
+
+        Args:
+            config: Konfiguration des Laufs.
+            instrumentation: Optionale Messung aller Stufen.
+            stages: Optionale Stufen pro Schüler, die die Standardstufen
+                gleichen Namens ersetzen (siehe ``STUDENT_STAGES``); mit
+                mehreren Workern müssen sie sich importieren lassen.
+        """
+        # Unbekannte Stufen vor dem Laden melden
+        stage_creator((), stages=stages)
+        self.config = config
+        self.instrumentation = instrumentation
+        self.stages = stages
+        self.plan = None
+        self.protection = None
+        self.layout = None
+
+    def plan_creator(self, data) -> PipelinePlan:
+        """
+        Wählt den Plan für die geladenen Notendaten.
+
+        Args:
+            data: DataHandler mit den Seitenbereichen der Schüler.
+
+        Returns:
+            Plan des Laufs.
+        """
+        config = self.config
+        workers = config.workers or os.cpu_count() or 1
+        records = data.records
+        pages = sum(student.last - student.first + 1 for student in records)
+        with pymupdf.open(config.doc) as doc:
+            proof_pages = doc.page_count or 1
+        proof_mb = (os.path.getsize(config.doc) / 2 ** 20
+                    * pages / proof_pages)
+
+        return plan_chooser(len(records), pages, proof_mb,
+                            renderer=config.renderer, workers=workers,
+                            write_concurrency=config.write_concurrency,
+                            order=config.order,
+                            memory_limit=config.memory_limit)
+
+    def data_loader(self):
+        """
+        Stufe 'load': lädt und prüft Notendaten und Seitenbereiche.
+
+        Passwörter, Metadaten und Aufgabenstempel werden dabei aus der
+        Konfiguration übernommen, weil sie weitere Spalten benötigen.
+
+        Returns:
+            DataHandler mit Schülerdatensätzen und Klassenstatistik.
+        """
+        from test_handler.indexer import ProofIndex
+        from test_handler.layout import StampLayout
+        from test_handler.protection import Protection
+        from test_handler.stamper import DataHandler, Stamper
+
+        config = self.config
+        instrumentation = self.instrumentation
+
+        # Prüfe den Renderer vor dem Start der Worker
+        if config.renderer not in Stamper.RENDERERS:
+            raise ConfigError(f'Unbekannter Renderer: {config.renderer!r}')
+
+        self.protection = Protection.from_config(config)
+        self.layout = StampLayout.from_config(config)
+        columns = self.layout.columns()
+        if self.protection is not None:
+            columns += self.protection.columns()
+
+        # Seitenbereiche aus der Fahne; bei unveränderter Fahne aus dem
+        # Index
+        page_index = None
+        if config.page_index:
+            page_index = ProofIndex(config.doc, workers=config.workers,
+                                    instrumentation=instrumentation)
+
+        # Notendaten und Statistik laden und prüfen, bevor ein Stempel
+        # gerendert wird
+        return DataHandler(config, instrumentation, engine=config.csv_engine,
+                           columns=columns, page_index=page_index)
+
+    def report_creator(self, data):
+        """
+        Stufe 'stats': bereitet den Klassenbericht vor.
+
+        Die Klassenstatistik selbst berechnet der DataHandler einmal
+        beim Laden; der Bericht übernimmt sie und prüft das Exportformat,
+        bevor ein Stempel gerendert wird.
+
+        Args:
+            data: DataHandler aus ``data_loader``.
+
+        Returns:
+            ClassReport oder ``None`` ohne Klassenbericht.
+        """
+        from test_handler.report import ClassReport
+
+        config = self.config
+        if not config.class_report:
+            return None
+
+        return ClassReport(data, config.destination_folder,
+                           export_format=config.report_format,
+                           save_profile=config.save_profile,
+                           instrumentation=self.instrumentation)
+
+    def run(self) -> list:
+        """
+        Stempelt und verteilt alle Schüler einer Klasse.
+
+        Returns:
+            Pfade der geschriebenen Dateien in Reihenfolge der
+            Notentabelle.
+        """
+        from test_handler.cache import StampCache
+        from test_handler.journal import RunJournal
+        from test_handler.layout import LayoutIndex
+        from test_handler.memory import MemoryCeiling
+        from test_handler.stamper import FileManager, ParallelPress
+
+        config = self.config
+        instrumentation = self.instrumentation
+
+        data = self.data_loader()
+        report = self.report_creator(data)
+        self.plan = self.plan_creator(data)
+        layout = self.layout
+
+        # Erstelle individuelle Ordner (prüft auch alle Passwörter)
+        FileManager(config, data,
+                    protection=self.protection).folder_creator()
+
+        # Unveränderte Stempel aus dem Cache übernehmen
+        cache = None
+        if config.cache is not None:
+            cache = StampCache(config.cache,
+                               max_bytes=int(config.cache_size * 2 ** 20))
+
+        # Freie Stellen aller Stempelseiten einmal für alle Worker bestimmen
+        layout_index = None
+        if layout.placement == 'auto':
+            pages = layout.pages(data.records, layout.task_labels(data.df))
+            layout_index = LayoutIndex(config.doc, pages,
+                                       workers=config.workers,
+                                       instrumentation=instrumentation)
+
+        # Fertige Dateien eines abgebrochenen Laufs übernehmen; eine
+        # andere Reihenfolge ergibt andere Dateien
+        journal = None
+        if config.journal:
+            journal = RunJournal(config.destination_folder,
+                                 RunJournal.fingerprint_creator(
+                                     config, self.plan.order))
+
+        # Streaming-Modus: Fahne freigeben, sobald die Obergrenze erreicht
+        # ist
+        ceiling = None
+        if config.memory_limit is not None:
+            ceiling = MemoryCeiling(int(config.memory_limit * 2 ** 20))
+
+        # Stufen pro Schüler; ParallelPress räumt auch bei einem Worker
+        # auf
+        press = ParallelPress(config, data, workers=self.plan.workers,
+                              renderer=config.renderer,
+                              instrumentation=instrumentation, cache=cache,
+                              incremental=config.incremental,
+                              ceiling=ceiling,
+                              write_concurrency=config.write_concurrency,
+                              save_profile=config.save_profile,
+                              protection=self.protection, layout=layout,
+                              layout_index=layout_index, report=report,
+                              journal=journal, order=self.plan.order,
+                              stages=self.stages)
+
+        return press.run()
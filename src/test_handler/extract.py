@@ -0,0 +1,294 @@
+"""
+Auszug von Seitenbereichen aus der Korrekturfahne.
+
+``insert_pdf`` übernimmt zu jeder Seite ihr vollständiges Ressourcen-
+Dictionary. Viele Scan- und Zusammenführungsprogramme legen für alle
+Seiten ein gemeinsames Dictionary mit sämtlichen Bildern und Schriften
+der Fahne an, sodass jede Ausgabedatei alle Scans der Klasse enthält;
+andere betten dasselbe Logo oder dieselbe Schrift auf jeder Seite neu
+ein. Der ``PageRangeExtractor`` untersucht jede Seite der Fahne einmal,
+gibt ihr ein eigenes Ressourcen-Dictionary mit nur den tatsächlich
+verwendeten Bildern und Schriften und verweist gleiche Objekte auf ein
+einziges Exemplar. Die Änderungen bleiben im Speicher, die Fahne auf
+der Festplatte wird nie verändert. Bereits komprimierte Ströme werden
+unverändert übernommen.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+
+from test_handler._lazy import LazyModule
+
+pymupdf = LazyModule('pymupdf')
+
+# Indirekte Verweise und Einträge eines Ressourcen-Unterdictionarys
+_REFERENCE = re.compile(r'(\d+) 0 R')
+_ENTRY = re.compile(r'/([^\s/<>\[\]()]+)\s*(\d+) 0 R')
+
+# Verwendung von Ressourcen in Inhaltsströmen
+_USAGE = {
+    'XObject': re.compile(rb'/([^\s/<>\[\]()]+)\s+Do\b'),
+    'Font': re.compile(rb'/([^\s/<>\[\]()]+)\s+[-+.\d]+\s+Tf\b'),
+}
+
+
+class PageRangeExtractor:
+    """
+    Schreibt Seitenbereiche der Korrekturfahne in neue Dokumente.
+
+    Jede Seite wird beim ersten Auszug vorbereitet. Gemeinsame
+    Ressourcen-Dictionaries und die Hashes gemeinsamer Objekte werden
+    dabei nur einmal berechnet.
+    """
+
+    CATEGORIES = tuple(_USAGE)
+
+    def __init__(self, doc: pymupdf.Document):
+        """
+        Initialisiert den Auszug, ohne die Fahne schon zu lesen.
+
+        Args:
+            doc: Geöffnete Korrekturfahne.
+        """
+        self.doc = doc
+        self._prepared = set()
+        # Zwischenergebnisse der Analyse pro Objektnummer
+        self._entries = {}
+        self._shapes = {}
+        self._keys = {}
+        # Erstes Objekt der Fahne pro Inhaltshash
+        self._canonical = {}
+
+    def extract(self, first: int, last: int) -> pymupdf.Document:
+        """
+        Schreibt einen Seitenbereich in ein neues Dokument.
+
+        Args:
+            first: Erste Seite (1-basiert).
+            last: Letzte Seite (1-basiert).
+
+        Returns:
+            Neues Dokument mit den Seiten des Bereichs; der Aufrufer
+            schließt es.
+        """
+        self.preparer(first, last)
+        new_doc = pymupdf.open()
+        new_doc.insert_pdf(self.doc, from_page=first - 1, to_page=last - 1)
+
+        return new_doc
+
+    def preparer(self, first: int, last: int) -> None:
+        """
+        Bereitet einen Seitenbereich für den Auszug vor.
+
+        Wird ein Bereich vor dem Stempeln in der Fahne vorbereitet,
+        bleiben die Stempel selbst von der Beschränkung der Ressourcen
+        unberührt, wie bei einem Stempel im fertigen Auszug.
+
+        Args:
+            first: Erste Seite (1-basiert).
+            last: Letzte Seite (1-basiert).
+        """
+        numbers = [number for number in range(first - 1, last)
+                   if number not in self._prepared]
+        if numbers:
+            self._range_preparer(numbers)
+            self._prepared.update(numbers)
+
+    def _key_creator(self, xref: int, visiting: tuple = ()) -> str:
+        """
+        Bildet einen Inhaltshash eines Objekts samt aller Verweise.
+
+        Verweise werden durch den Hash des referenzierten Objekts
+        ersetzt, damit zwei getrennt eingebettete, aber gleiche Schriften
+        oder Bilder denselben Hash erhalten.
+
+        Args:
+            xref: Objektnummer.
+            visiting: Objekte auf dem aktuellen Pfad (gegen Zyklen).
+
+        Returns:
+            SHA-256-Hash als Hex-String.
+        """
+        if xref in self._keys:
+            return self._keys[xref]
+        if xref in visiting:
+            return f'xref:{xref}'
+
+        visiting = visiting + (xref,)
+        text = _REFERENCE.sub(
+            lambda match: self._key_creator(int(match.group(1)), visiting),
+            self.doc.xref_object(xref, compressed=True))
+        digest = hashlib.sha256(text.encode('utf-8'))
+        if self.doc.xref_is_stream(xref):
+            digest.update(self.doc.xref_stream_raw(xref))
+
+        self._keys[xref] = digest.hexdigest()
+        return self._keys[xref]
+
+    def _shape_creator(self, xref: int) -> str:
+        """
+        Beschreibt ein Objekt ohne seine Verweise und Stromdaten.
+
+        Nur Objekte mit gleicher Beschreibung (Typ, Größe, Länge des
+        Stroms …) können gleich sein; erst für sie wird der teurere
+        Inhaltshash gebildet.
+        """
+        if xref not in self._shapes:
+            self._shapes[xref] = _REFERENCE.sub(
+                'R', self.doc.xref_object(xref, compressed=True))
+
+        return self._shapes[xref]
+
+    def _entry_collector(self, page_xref: int, resources: str,
+                         category: str) -> dict:
+        """
+        Liest ein Ressourcen-Unterdictionary einer Seite.
+
+        Gemeinsame Ressourcen-Dictionaries werden nur einmal gelesen.
+
+        Args:
+            page_xref: Objektnummer der Seite.
+            resources: Verweis auf das Ressourcen-Dictionary der Seite
+                oder ``None``, wenn es direkt in der Seite steht.
+            category: 'XObject' oder 'Font'.
+
+        Returns:
+            Dictionary von Ressourcenname auf Objektnummer oder ``None``,
+            wenn das Unterdictionary fehlt oder direkte Objekte enthält.
+        """
+        memo = (resources, category)
+        if resources is not None and memo in self._entries:
+            return self._entries[memo]
+
+        kind, value = self.doc.xref_get_key(page_xref, f'Resources/{category}')
+        if kind == 'xref':
+            value = self.doc.xref_object(int(value.split()[0]), compressed=True)
+        entries = None
+        if kind in ('xref', 'dict'):
+            entries = {name: int(xref) for name, xref in _ENTRY.findall(value)}
+            # Jeder Eintrag hat genau einen Namen; mehr Schrägstriche
+            # bedeuten direkte Objekte, die unverändert bleiben
+            if value.count('/') != len(entries):
+                entries = None
+
+        if resources is not None:
+            self._entries[memo] = entries
+        return entries
+
+    def _inheriting_form_finder(self, xrefs: list) -> bool:
+        """Prüft, ob ein Formular die Ressourcen der Seite mitbenutzt."""
+        for xref in xrefs:
+            if ('/Form' in self._shape_creator(xref)
+                    and self.doc.xref_get_key(xref, 'Resources')[0] == 'null'):
+                return True
+
+        return False
+
+    def _usage_collector(self, number: int) -> tuple:
+        """
+        Ermittelt die verwendeten Bilder und Schriften einer Seite.
+
+        Ist die Verwendung nicht eindeutig erkennbar, gelten alle
+        Einträge der Kategorie als verwendet.
+
+        Args:
+            number: Seitennummer (0-basiert).
+
+        Returns:
+            Tupel aus Objektnummer der Seite, Verweis auf ihr Ressourcen-
+            Dictionary (``None`` wenn direkt) und einem Dictionary von
+            Kategorie auf alle und verwendete Einträge; ``None`` bei
+            geerbten Ressourcen.
+        """
+        page_xref = self.doc.page_xref(number)
+        kind, value = self.doc.xref_get_key(page_xref, 'Resources')
+        if kind not in ('xref', 'dict'):  # geerbte Ressourcen
+            return None
+        resources = value if kind == 'xref' else None
+
+        content = self.doc[number].read_contents()
+        usage = {}
+        for category in self.CATEGORIES:
+            entries = self._entry_collector(page_xref, resources, category)
+            if not entries:
+                continue
+            names = {name.decode('latin-1')
+                     for name in _USAGE[category].findall(content)}
+            if not names <= set(entries):
+                names = set(entries)
+            usage[category] = (entries, {name: entries[name] for name in names})
+
+        # Formulare ohne eigene Ressourcen verwenden die der Seite
+        if 'XObject' in usage and self._inheriting_form_finder(
+                usage['XObject'][1].values()):
+            usage = {category: (entries, dict(entries))
+                     for category, (entries, _) in usage.items()}
+
+        return page_xref, resources, usage
+
+    def _range_preparer(self, numbers: list) -> None:
+        """
+        Beschränkt die Ressourcen der Seiten eines Bereichs.
+
+        Jede Seite behält nur die verwendeten Bilder und Schriften.
+        Gleiche Objekte innerhalb des Bereichs werden auf das erste
+        gleiche Objekt der Fahne umgelenkt, damit die Ausgabedatei nur
+        ein Exemplar enthält.
+
+        Args:
+            numbers: Seitennummern (0-basiert), die noch nicht vorbereitet
+                wurden.
+        """
+        pages = [page for page in map(self._usage_collector, numbers)
+                 if page is not None]
+
+        # Inhaltshash nur für Objekte mit gleicher Beschreibung
+        shapes = {}
+        for _, _, usage in pages:
+            for _, used in usage.values():
+                for xref in used.values():
+                    shapes.setdefault(self._shape_creator(xref), set()).add(xref)
+        canonical = {}
+        for xrefs in shapes.values():
+            if len(xrefs) > 1:
+                for xref in sorted(xrefs):
+                    canonical[xref] = self._canonical.setdefault(
+                        self._key_creator(xref), xref)
+
+        for page_xref, resources, usage in pages:
+            subdicts = {}
+            for category, (entries, used) in usage.items():
+                kept = {name: canonical.get(xref, xref)
+                        for name, xref in used.items()}
+                if kept != entries:
+                    subdicts[category] = '<<' + ''.join(
+                        f'/{name} {xref} 0 R'
+                        for name, xref in sorted(kept.items())) + '>>'
+            if subdicts:
+                self._resource_writer(page_xref, resources, subdicts)
+
+    def _resource_writer(self, page_xref: int, resources: str,
+                         subdicts: dict) -> None:
+        """
+        Setzt die beschränkten Unterdictionaries einer Seite.
+
+        Args:
+            page_xref: Objektnummer der Seite.
+            resources: Verweis auf das Ressourcen-Dictionary oder ``None``.
+            subdicts: Neue Unterdictionaries als PDF-Text pro Kategorie.
+        """
+        if resources is not None:
+            # Gemeinsames Dictionary nicht verändern, sondern kopieren
+            target = self.doc.get_new_xref()
+            self.doc.update_object(target, self.doc.xref_object(
+                int(resources.split()[0]), compressed=True))
+            self.doc.xref_set_key(page_xref, 'Resources', f'{target} 0 R')
+            prefix = ''
+        else:
+            target, prefix = page_xref, 'Resources/'
+
+        for category, text in subdicts.items():
+            self.doc.xref_set_key(target, prefix + category, text)
@@ -0,0 +1,157 @@
+"""
+Inkrementelle Läufe: nur geänderte Ausgabedateien neu schreiben.
+
+Für jede Ausgabedatei wird ein Fingerabdruck ihrer Eingaben festgehalten:
+Inhalt der Seiten des Schülers in der Korrekturfahne, seine Zeile der
+Notentabelle, Renderer und Notenverteilung der Klasse. Ein erneuter Lauf
+überspringt Dateien, deren Fingerabdruck gleich geblieben ist und die
+seit dem letzten Lauf nicht verändert wurden. Ändert sich die
+Klassenstatistik, ändern sich alle Fingerabdrücke und alle Dateien werden
+neu geschrieben.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from test_handler._lazy import LazyModule
+from test_handler.cache import StampCache
+
+pymupdf = LazyModule('pymupdf')
+
+
+def page_range_hasher(doc: pymupdf.Document, first: int, last: int) -> str:
+    """
+    Bildet einen Hash über den Inhalt eines Seitenbereichs.
+
+    Berücksichtigt werden Seitengröße und Drehung, die Inhaltsströme
+    sowie die Rohdaten der verwendeten Bilder und die Schriftobjekte,
+    nicht aber die Objektnummern im Dokument.
+
+    Args:
+        doc: Korrekturfahne.
+        first: Erste Seite (1-basiert).
+        last: Letzte Seite (1-basiert).
+
+    Returns:
+        SHA-256-Hash als Hex-String.
+    """
+    digest = hashlib.sha256()
+
+    for number in range(first - 1, last):
+        page = doc[number]
+        digest.update(f'{tuple(page.rect)}:{page.rotation}'.encode())
+        digest.update(page.read_contents())
+        for image in page.get_images(full=True):
+            digest.update(doc.xref_stream_raw(image[0]))
+        for font in page.get_fonts(full=True):
+            digest.update(doc.xref_object(font[0], compressed=True).encode())
+
+    return digest.hexdigest()
+
+
+class OutputManifest:
+    """
+    Fingerabdrücke der Ausgabedateien eines Zielordners.
+
+    Das Manifest liegt als JSON-Datei im Zielordner und wird am Ende
+    eines Laufs atomar ersetzt.
+    """
+
+    FILE_NAME = '.test_handler_outputs.json'
+
+    def __init__(self, folder: str):
+        """
+        Initialisiert das Manifest und liest einen vorhandenen Stand.
+
+        Args:
+            folder: Zielordner der Ausgabedateien.
+        """
+        self.folder = Path(folder)
+        self.path = self.folder / self.FILE_NAME
+        try:
+            self.entries = json.loads(self.path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def fingerprint_creator(page_hash: str, row: tuple,
+                            class_fingerprint: list) -> str:
+        """
+        Bildet den Fingerabdruck einer Ausgabedatei.
+
+        Args:
+            page_hash: Hash des Seitenbereichs aus ``page_range_hasher``.
+            row: Datensatz des Schülers.
+            class_fingerprint: Notenverteilung, Vornamen und Renderer.
+
+        Returns:
+            SHA-256-Hash als Hex-String (inkl. Stempelversion).
+        """
+        return StampCache.key_creator('output', page_hash, list(row),
+                                      class_fingerprint)
+
+    def _relative_path(self, path: Path) -> str:
+        """Pfad relativ zum Zielordner als Schlüssel des Manifests."""
+        return Path(path).relative_to(self.folder).as_posix()
+
+    def is_current(self, path: Path, fingerprint: str) -> bool:
+        """
+        Prüft, ob eine Ausgabedatei übersprungen werden kann.
+
+        Args:
+            path: Pfad der Ausgabedatei.
+            fingerprint: Aktueller Fingerabdruck ihrer Eingaben.
+
+        Returns:
+            True, wenn Fingerabdruck, Größe und Änderungszeit mit dem
+            letzten Lauf übereinstimmen.
+        """
+        entry = self.entries.get(self._relative_path(path))
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return False
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+
+        return (stat.st_size, stat.st_mtime_ns) == (entry['size'],
+                                                    entry['mtime_ns'])
+
+    def update(self, path: Path, fingerprint: str) -> None:
+        """
+        Hält den Fingerabdruck einer frisch geschriebenen Datei fest.
+
+        Args:
+            path: Pfad der Ausgabedatei.
+            fingerprint: Fingerabdruck ihrer Eingaben.
+        """
+        stat = os.stat(path)
+        self.entries[self._relative_path(path)] = {
+            'fingerprint': fingerprint,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+        }
+
+    def save(self, keep: set = None) -> None:
+        """
+        Schreibt das Manifest atomar.
+
+        Args:
+            keep: Optionale Menge der Pfade, die im Manifest bleiben;
+                Einträge entfernter Schüler werden verworfen.
+        """
+        if keep is not None:
+            keep = {self._relative_path(path) for path in keep}
+            self.entries = {path: entry for path, entry in self.entries.items()
+                            if path in keep}
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            json.dump(self.entries, file, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
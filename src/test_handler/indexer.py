@@ -0,0 +1,280 @@
+"""
+Seitenindex der Korrekturfahne: welche Seiten gehören zu welchem Schüler.
+
+Statt sich auf die von Hand gepflegten Spalten ``First``/``Last`` zu
+verlassen, liest ``ProofIndex`` die Fahne einmal, parallel in
+Seitenblöcken, und hält pro Seite die normalisierten Wörter der
+Textebene sowie Trennblätter (leere Seiten oder Seiten mit dem Wort
+„Trennblatt“) fest. Der Index liegt als JSON-Datei neben der Fahne und
+wird nur neu erstellt, wenn sich der SHA-256-Hash der PDF-Datei ändert.
+
+Die Zuordnung zu den Zeilen der Notentabelle geschieht bei jedem Lauf
+aus dem gespeicherten Index: Eine Seite, auf der der Nachname (und
+möglichst der Vorname) eines Schülers steht, beginnt dessen Bereich;
+Trennblätter beenden ihn. Bereiche ohne erkannten Namen werden den
+übrigen Schülern in Tabellenreihenfolge zugeordnet, wenn ihre Anzahl
+genau passt.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+from test_handler._lazy import LazyModule
+from test_handler.instrumentation import Instrumentation
+from test_handler.writer import atomic_writer
+
+pymupdf = LazyModule('pymupdf')
+
+UMLAUTE = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+SEPARATOR_WORDS = frozenset({'trennblatt', 'trennseite'})
+
+
+def word_normalizer(text: str) -> list:
+    """
+    Zerlegt Text in normalisierte Wörter.
+
+    Args:
+        text: Text der Seite oder ein Name.
+
+    Returns:
+        Wörter in Kleinbuchstaben mit ersetzten Umlauten.
+    """
+    return re.findall(r'\w+', text.lower().translate(UMLAUTE))
+
+
+def _blank_checker(page: pymupdf.Page, threshold: float = 0.005) -> bool:
+    """
+    Prüft, ob eine Seite ohne Text leer ist.
+
+    Seiten ohne Bilder und Zeichnungen sind leer; eingescannte Seiten
+    werden grob gerastert und gelten als leer, wenn fast kein Pixel
+    dunkel ist.
+
+    Args:
+        page: Seite ohne Textebene.
+        threshold: Höchstanteil dunkler Pixel.
+
+    Returns:
+        True für leere Seiten.
+    """
+    if not page.get_images() and not page.get_drawings():
+        return True
+    pixmap = page.get_pixmap(dpi=12, colorspace=pymupdf.csGRAY)
+    samples = pixmap.samples
+    dark = sum(1 for value in samples if value < 128)
+
+    return dark <= threshold * len(samples)
+
+
+def _page_scanner(path: str, numbers: list) -> list:
+    """
+    Liest einen Block von Seiten der Korrekturfahne.
+
+    Args:
+        path: Pfad der Korrekturfahne.
+        numbers: Seitennummern des Blocks (0-basiert).
+
+    Returns:
+        Pro Seite ein Dictionary mit den Wörtern ('words', sortiert und
+        ohne Wiederholung) und ob sie ein Trennblatt ist ('separator').
+    """
+    pages = []
+    with pymupdf.open(path) as doc:
+        for number in numbers:
+            page = doc[number]
+            words = sorted(set(word_normalizer(page.get_text())))
+            separator = (not SEPARATOR_WORDS.isdisjoint(words)
+                         or (not words and _blank_checker(page)))
+            pages.append({'words': words, 'separator': separator})
+
+    return pages
+
+
+def page_chunk_mapper(function, path: str, numbers: list,
+                      workers: int = 1) -> list:
+    """
+    Wendet eine Seitenfunktion blockweise auf Seiten einer PDF-Datei an.
+
+    Bei mehreren Workern laufen die Blöcke in einem Prozesspool; jeder
+    Worker öffnet die Datei selbst.
+
+    Args:
+        function: Funktion ``(path, numbers) -> list`` auf Modulebene.
+        path: Pfad der PDF-Datei.
+        numbers: Seitennummern (0-basiert).
+        workers: Anzahl Prozesse.
+
+    Returns:
+        Aneinandergehängte Ergebnisse in Reihenfolge von ``numbers``.
+    """
+    numbers = list(numbers)
+    if workers == 1 or len(numbers) < 2:
+        return function(path, numbers)
+
+    # Mehrere Blöcke pro Worker gleichen unterschiedlich teure Seiten aus
+    from concurrent.futures import ProcessPoolExecutor
+
+    size = -(-len(numbers) // min(len(numbers), workers * 4))
+    chunks = [numbers[i:i + size] for i in range(0, len(numbers), size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(function, [path] * len(chunks), chunks)
+        return [entry for result in results for entry in result]
+
+
+def file_hasher(path: str, chunk_size: int = 2 ** 20) -> str:
+    """
+    Bildet den SHA-256-Hash einer Datei blockweise.
+
+    Args:
+        path: Pfad der Datei.
+        chunk_size: Größe der gelesenen Blöcke in Bytes.
+
+    Returns:
+        Hash als Hex-String.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class ProofIndex:
+    """
+    Zwischengespeicherter Seitenindex einer Korrekturfahne.
+
+    Der Index liegt unter ``<fahne>.pdf.index.json``. Ist der Ordner der
+    Fahne nicht beschreibbar, wird ohne Zwischenspeicher gearbeitet.
+    """
+
+    # Bei Änderungen der Seitenerkennung erhöhen
+    VERSION = 1
+
+    def __init__(self, doc: str, workers: int = 1,
+                 instrumentation: Instrumentation = None):
+        """
+        Lädt den Index oder liest die Fahne, wenn sie sich geändert hat.
+
+        Args:
+            doc: Pfad zur Korrekturfahne.
+            workers: Anzahl Prozesse für das Lesen (0: alle CPU-Kerne).
+            instrumentation: Optionale Messung von Hash und Lesen.
+        """
+        self.doc = str(doc)
+        self.path = Path(self.doc + '.index.json')
+        self.workers = workers or os.cpu_count() or 1
+        instrumentation = instrumentation or Instrumentation()
+
+        with instrumentation.timer('index_hash'):
+            self.digest = file_hasher(self.doc)
+        self.pages = self._index_loader()
+        if self.pages is None:
+            with instrumentation.timer('index_scan'):
+                self.pages = self._proof_scanner()
+            instrumentation.counter('index_pages', len(self.pages))
+            self._index_saver()
+
+    def _index_loader(self) -> list:
+        """
+        Liest den gespeicherten Index, wenn er zur Fahne passt.
+
+        Returns:
+            Seiteneinträge oder None, wenn neu gelesen werden muss.
+        """
+        try:
+            content = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if (content.get('version') != self.VERSION
+                or content.get('sha256') != self.digest):
+            return None
+
+        return content.get('pages')
+
+    def _index_saver(self) -> None:
+        """Speichert den Index atomar neben der Fahne."""
+        content = {'version': self.VERSION, 'sha256': self.digest,
+                   'pages': self.pages}
+        try:
+            atomic_writer(self.path, json.dumps(content).encode('utf-8'))
+        except OSError:
+            pass  # schreibgeschützter Ordner: Index beim nächsten Mal neu
+
+    def _proof_scanner(self) -> list:
+        """
+        Liest alle Seiten, bei mehreren Workern parallel in Blöcken.
+
+        Returns:
+            Seiteneinträge in Seitenreihenfolge.
+        """
+        with pymupdf.open(self.doc) as doc:
+            page_count = len(doc)
+
+        return page_chunk_mapper(_page_scanner, self.doc, range(page_count),
+                                 self.workers)
+
+    def range_finder(self, students: list) -> list:
+        """
+        Ordnet den Schülern ihre Seitenbereiche zu.
+
+        Eine Seite beginnt den Bereich des Schülers, dessen Nachname darauf
+        steht und von dessen Namen die meisten Wörter vorkommen; folgt
+        sein Name auf weiteren Seiten, gehören diese dazu. Bei gleichen
+        Namen wird in Tabellenreihenfolge zugeordnet.
+
+        Args:
+            students: Tupel aus Nachname und Vorname in Reihenfolge der
+                Notentabelle.
+
+        Returns:
+            Pro Schüler ein Tupel aus erster und letzter Seite (1-basiert)
+            oder None, wenn kein Bereich gefunden wurde.
+        """
+        names = [(set(word_normalizer(name)),
+                  set(word_normalizer(f'{name} {vorname}')))
+                 for name, vorname in students]
+        groups = []  # [Schüler oder None, erste, letzte]
+        current = None
+
+        for number, page in enumerate(self.pages, start=1):
+            if page['separator']:
+                current = None
+                continue
+            words = set(page['words'])
+            scores = [len(full & words) if surname and surname <= words else 0
+                      for surname, full in names]
+            best = max(scores, default=0)
+            matches = [row for row, score in enumerate(scores)
+                       if best and score == best]
+
+            if current is not None and (current[0] in matches or not matches):
+                current[2] = number
+                continue
+            started = {group[0] for group in groups}
+            row = next((row for row in matches if row not in started), None)
+            if row is None and current is not None and current[0] is None:
+                # Namenlose Fortsetzung eines namenlosen Bereichs
+                current[2] = number
+                continue
+            current = [row, number, number]
+            groups.append(current)
+
+        ranges = [None] * len(students)
+        for row, first, last in groups:
+            if row is not None:
+                ranges[row] = (first, last)
+        # Namenlose Bereiche (z. B. nur Trennblätter) der Reihe nach
+        anonymous = [(first, last) for row, first, last in groups
+                     if row is None]
+        missing = [row for row, found in enumerate(ranges) if found is None]
+        if anonymous and len(anonymous) == len(missing):
+            for row, found in zip(missing, anonymous):
+                ranges[row] = found
+
+        return ranges
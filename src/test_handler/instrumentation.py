@@ -0,0 +1,209 @@
+"""
+Messung von Laufzeiten, Zählern und optionalen Profilen eines Laufs.
+
+Jede Stufe (DataHandler, Stamper, FileManager) misst ihre Schritte mit
+``Instrumentation.timer``; schülerspezifische Schritte zusätzlich pro
+Schüler. Zähler halten Seiten, Dateien und geschriebene Bytes fest. Auf
+Wunsch laufen cProfile und tracemalloc mit. ``report`` liefert alles als
+JSON-fähiges Dictionary.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class Instrumentation:
+    """
+    Sammelt Stufen- und Schülerzeiten, Zähler und optionale Profile.
+
+    Ohne Profiling kostet ein Timer nur zwei ``perf_counter``-Aufrufe und
+    kann deshalb immer aktiv sein.
+    """
+
+    def __init__(self, profile: bool = False, memory: bool = False,
+                 top: int = 25):
+        """
+        Initialisiert die Messung.
+
+        Args:
+            profile: cProfile für den aktuellen Prozess mitlaufen lassen.
+            memory: Speicherbedarf mit tracemalloc verfolgen.
+            top: Anzahl Funktionen im Profilauszug des Berichts.
+        """
+        self.profile = profile
+        self.memory = memory
+        self.top = top
+        self.stages = {}
+        self.students = {}
+        self.counters = {}
+        self._profiler = None
+        self._started = None
+        self._wall = 0.0
+        self._memory_peak = None
+
+    @contextmanager
+    def timer(self, stage: str, student: str = None):
+        """
+        Misst die Dauer eines Schritts.
+
+        Args:
+            stage: Name der Stufe, z. B. 'render' oder 'save'.
+            student: Optionaler Schlüssel des Schülers für Einzelzeiten.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._time_recorder(stage, time.perf_counter() - start, student)
+
+    def _time_recorder(self, stage: str, seconds: float,
+                       student: str = None) -> None:
+        """
+        Addiert eine gemessene Dauer zur Stufe und zum Schüler.
+
+        Args:
+            stage: Name der Stufe.
+            seconds: Gemessene Dauer in Sekunden.
+            student: Optionaler Schlüssel des Schülers.
+        """
+        entry = self.stages.setdefault(stage, {'calls': 0, 'seconds': 0.0,
+                                               'max_seconds': 0.0})
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+
+        if student is not None:
+            times = self.students.setdefault(student, {})
+            times[stage] = times.get(stage, 0.0) + seconds
+
+    def counter(self, name: str, value: int = 1) -> None:
+        """
+        Erhöht einen Zähler.
+
+        Args:
+            name: Name des Zählers, z. B. 'pages' oder 'bytes_written'.
+            value: Betrag der Erhöhung.
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def start(self) -> None:
+        """Startet Gesamtzeit und, falls gewünscht, cProfile und tracemalloc."""
+        if self.memory:
+            import tracemalloc
+            tracemalloc.start()
+        if self.profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._started = time.perf_counter()
+
+    def stop(self) -> None:
+        """Beendet Gesamtzeit, Profiling und Speicherverfolgung."""
+        if self._started is not None:
+            self._wall += time.perf_counter() - self._started
+            self._started = None
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self.memory:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                self._memory_peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+    def merge(self, report: dict) -> None:
+        """
+        Übernimmt Zeiten und Zähler eines anderen Berichts.
+
+        Damit werden die Messungen der Worker-Prozesse zusammengeführt.
+
+        Args:
+            report: Bericht aus ``report`` bzw. ``drain``.
+        """
+        for stage, entry in report['stages'].items():
+            own = self.stages.setdefault(stage, {'calls': 0, 'seconds': 0.0,
+                                                 'max_seconds': 0.0})
+            own['calls'] += entry['calls']
+            own['seconds'] += entry['seconds']
+            own['max_seconds'] = max(own['max_seconds'], entry['max_seconds'])
+        for student, times in report['students'].items():
+            own = self.students.setdefault(student, {})
+            for stage, seconds in times.items():
+                own[stage] = own.get(stage, 0.0) + seconds
+        for name, value in report['counters'].items():
+            self.counter(name, value)
+
+    def drain(self) -> dict:
+        """
+        Gibt Zeiten und Zähler zurück und setzt sie zurück.
+
+        Returns:
+            Bericht der seit dem letzten Aufruf gesammelten Messungen.
+        """
+        report = {'stages': self.stages, 'students': self.students,
+                  'counters': self.counters}
+        self.stages, self.students, self.counters = {}, {}, {}
+
+        return report
+
+    def _profile_collector(self) -> list:
+        """
+        Fasst das cProfile-Ergebnis zusammen.
+
+        Returns:
+            Die ``top`` Funktionen nach kumulierter Zeit.
+        """
+        import pstats
+
+        stats = pstats.Stats(self._profiler)
+        rows = []
+        for (filename, line, function), (_, calls, own, cumulative, _) in \
+                stats.stats.items():
+            rows.append({'function': f'{filename}:{line}({function})',
+                         'calls': calls, 'seconds': round(own, 6),
+                         'cumulative_seconds': round(cumulative, 6)})
+        rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+
+        return rows[:self.top]
+
+    def report(self) -> dict:
+        """
+        Erstellt den maschinenlesbaren Bericht.
+
+        Returns:
+            Dictionary mit Gesamtzeit, Stufen, Zählern, Schülerzeiten und
+            gegebenenfalls Profil und Spitzenspeicher.
+        """
+        wall = self._wall
+        if self._started is not None:
+            wall += time.perf_counter() - self._started
+
+        report = {
+            'wall_seconds': round(wall, 6),
+            'stages': {stage: {'calls': entry['calls'],
+                               'seconds': round(entry['seconds'], 6),
+                               'max_seconds': round(entry['max_seconds'], 6)}
+                       for stage, entry in self.stages.items()},
+            'counters': dict(self.counters),
+            'students': {student: {stage: round(seconds, 6)
+                                   for stage, seconds in times.items()}
+                         for student, times in self.students.items()},
+        }
+        if self._profiler is not None:
+            report['profile'] = self._profile_collector()
+        if self._memory_peak is not None:
+            report['memory_peak_bytes'] = self._memory_peak
+
+        return report
+
+    def report_writer(self, path: str) -> None:
+        """
+        Schreibt den Bericht als JSON-Datei.
+
+        Args:
+            path: Zielpfad des Berichts.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, indent=2, ensure_ascii=False)
@@ -0,0 +1,209 @@
+"""
+Journal eines Laufs: abgebrochene Läufe dort fortsetzen, wo sie endeten.
+
+Jede fertig geschriebene Schülerdatei wird sofort in einer Journaldatei
+im Zielordner festgehalten: erst wird die Datei selbst auf den Datenträger
+gezwungen, dann eine Zeile mit Pfad, Größe und Änderungszeit angehängt
+und ebenfalls synchronisiert. Bricht der Lauf ab (Absturz, Ruhezustand,
+getrenntes Netzlaufwerk), überspringt der nächste Lauf mit denselben
+Eingaben alle Dateien aus dem Journal, die seither unverändert sind.
+Eine beim Abbruch halb geschriebene letzte Zeile wird ignoriert.
+
+Jeder Prozess schreibt in eine eigene Journaldatei, damit auch auf
+Netzlaufwerken ohne atomares Anhängen keine Zeilen vermischt werden.
+Nach einem vollständigen Lauf werden die Journaldateien gelöscht.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+
+from test_handler.cache import StampCache
+
+# Einstellungen, die den Inhalt der Schülerdateien bestimmen
+OUTPUT_SETTINGS = ('renderer', 'save_profile', 'password', 'owner_password',
+                   'author', 'document_title', 'page_index', 'placement',
+                   'summary_page', 'tasks')
+
+
+class RunJournal:
+    """
+    Write-ahead-Journal der fertigen Ausgabedateien eines Zielordners.
+
+    Das Journal gilt nur für einen Lauf mit denselben Eingaben: Der erste
+    Eintrag jeder Journaldatei ist der Fingerabdruck des Laufs. Passt er
+    nicht, wird die Datei verworfen und neu begonnen.
+    """
+
+    PREFIX = '.test_handler_journal'
+
+    def __init__(self, folder: str, fingerprint: str):
+        """
+        Initialisiert das Journal und liest die Einträge früherer Läufe.
+
+        Args:
+            folder: Zielordner der Ausgabedateien.
+            fingerprint: Fingerabdruck des Laufs aus
+                ``fingerprint_creator``.
+        """
+        self.folder = Path(folder)
+        self.fingerprint = fingerprint
+        self.entries = self._entry_reader()
+        self._file = None
+        self._pid = None
+        self._lock = None
+
+    @staticmethod
+    def fingerprint_creator(config, order: str = 'split_first') -> str:
+        """
+        Bildet den Fingerabdruck eines Laufs.
+
+        Berücksichtigt werden Größe und Änderungszeit von Korrekturfahne
+        und Notentabelle sowie alle Einstellungen, die den Inhalt der
+        Ausgabedateien bestimmen; Anzahl Worker oder Schreib-Threads
+        dürfen sich zwischen Abbruch und Fortsetzung ändern.
+
+        Args:
+            config: Konfiguration des Laufs.
+            order: Gewählte Reihenfolge von Stempeln und Aufteilen.
+
+        Returns:
+            SHA-256-Hash als Hex-String.
+        """
+        inputs = []
+        for path in (config.doc, config.data):
+            stat = os.stat(path)
+            inputs.append([os.path.abspath(path), stat.st_size,
+                           stat.st_mtime_ns])
+        settings = [getattr(config, key) for key in OUTPUT_SETTINGS]
+        if order != 'split_first':
+            settings.append(order)
+
+        return StampCache.key_creator('journal', inputs, settings)
+
+    def _journal_paths(self) -> list:
+        """Journaldateien aller Prozesse im Zielordner."""
+        return sorted(self.folder.glob(f'{self.PREFIX}-*.jsonl'))
+
+    def _entry_reader(self) -> dict:
+        """
+        Liest die Journaldateien früherer Läufe.
+
+        Dateien eines anderen Laufs werden gelöscht.
+
+        Returns:
+            Dictionary von relativem Pfad auf Größe und Änderungszeit.
+        """
+        entries = {}
+        for path in self._journal_paths():
+            try:
+                lines = path.read_text(encoding='utf-8').splitlines()
+            except OSError:
+                continue
+            if not lines or lines[0] != json.dumps(
+                    {'fingerprint': self.fingerprint}):
+                path.unlink(missing_ok=True)
+                continue
+            for line in lines[1:]:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # beim Abbruch halb geschriebene Zeile
+                entries[entry['path']] = (entry['size'], entry['mtime_ns'])
+
+        return entries
+
+    def __getstate__(self) -> dict:
+        # Jeder Worker öffnet seine eigene Journaldatei
+        state = self.__dict__.copy()
+        state.update(_file=None, _pid=None, _lock=None)
+        return state
+
+    def _relative_path(self, path: Path) -> str:
+        """Pfad relativ zum Zielordner als Schlüssel des Journals."""
+        return Path(path).resolve().relative_to(
+            self.folder.resolve()).as_posix()
+
+    def is_done(self, path: Path) -> bool:
+        """
+        Prüft, ob eine Ausgabedatei aus einem früheren Lauf fertig ist.
+
+        Args:
+            path: Pfad der Ausgabedatei.
+
+        Returns:
+            True, wenn das Journal sie enthält und Größe und
+            Änderungszeit unverändert sind.
+        """
+        entry = self.entries.get(self._relative_path(path))
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+
+        return (stat.st_size, stat.st_mtime_ns) == entry
+
+    def record(self, path: Path, student: str = None) -> None:
+        """
+        Hält eine fertig geschriebene Ausgabedatei fest.
+
+        Kann aus mehreren Schreib-Threads gleichzeitig aufgerufen werden.
+
+        Args:
+            path: Pfad der Ausgabedatei (bereits unter dem endgültigen
+                Namen).
+            student: Schlüssel des Schülers.
+        """
+        # Erst die Datei, dann der Eintrag: das Journal eilt nie voraus
+        with open(path, 'r+b') as file:
+            os.fsync(file.fileno())
+        stat = os.stat(path)
+        line = json.dumps({'path': self._relative_path(path),
+                           'student': student, 'size': stat.st_size,
+                           'mtime_ns': stat.st_mtime_ns})
+
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+            self._file = None
+        with self._lock:
+            if self._file is None:
+                self._file = self._journal_opener()
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _journal_opener(self):
+        """Öffnet die Journaldatei dieses Prozesses und schreibt den Kopf."""
+        self.folder.mkdir(parents=True, exist_ok=True)
+        path = self.folder / f'{self.PREFIX}-{os.getpid()}.jsonl'
+        torn = False
+        if path.exists() and path.stat().st_size:
+            with open(path, 'rb') as file:
+                file.seek(-1, os.SEEK_END)
+                torn = file.read(1) != b'\n'
+        file = open(path, 'a', encoding='utf-8')
+        if file.tell() == 0:
+            file.write(json.dumps({'fingerprint': self.fingerprint}) + '\n')
+        elif torn:
+            file.write('\n')  # halbe Zeile eines abgebrochenen Laufs
+
+        return file
+
+    def close(self) -> None:
+        """Schließt die Journaldatei dieses Prozesses."""
+        if self._file is not None and self._pid == os.getpid():
+            self._file.close()
+        self._file = None
+
+    def finish(self) -> None:
+        """Beendet einen vollständigen Lauf und löscht alle Journaldateien."""
+        self.close()
+        for path in self._journal_paths():
+            path.unlink(missing_ok=True)
+        self.entries = {}
@@ -0,0 +1,444 @@
+"""
+Platzierung der Stempel auf den Seiten eines Schülers.
+
+``StampLayout`` legt fest, welche Seiten eines Schülers Stempel erhalten:
+den Notenstempel (erste oder letzte Seite) und optional die Punkte
+einzelner Aufgaben aus Spalten der Notentabelle, z. B. ``'A1,A2,A3@2'``
+(Aufgabe n ohne Angabe auf Seite n des Schülers).
+
+Mit ``placement='auto'`` werden freie Stellen gesucht. ``LayoutIndex``
+zerlegt dazu jede betroffene Seite der Korrekturfahne einmal in ein
+Raster belegter Zellen (Textblöcke, Zeichnungen und bei Scans dunkle
+Pixel) und speichert es neben der Fahne; die Suche selbst ist eine
+vektorisierte Summe über Rechteckfenster.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+from test_handler._lazy import LazyModule
+from test_handler.indexer import file_hasher, page_chunk_mapper
+from test_handler.instrumentation import Instrumentation
+from test_handler.writer import atomic_writer
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+pymupdf = LazyModule('pymupdf')
+
+# Kantenlänge einer Rasterzelle in PDF-Punkten
+CELL = 12
+# Abstand der Stempel zum Seitenrand in PDF-Punkten
+MARGIN = 18
+
+
+def occupancy_analyzer(page: pymupdf.Page, cell: int = CELL) -> np.ndarray:
+    """
+    Bestimmt die belegten Rasterzellen einer Seite.
+
+    Belegt sind Zellen unter Textblöcken und Zeichnungen; große Rahmen
+    belegen nur ihre Kanten. Enthält die Seite Bilder (Scans), wird sie
+    grob gerastert und jede Zelle mit dunklen Pixeln gilt als belegt.
+
+    Args:
+        page: Seite der Korrekturfahne.
+        cell: Kantenlänge einer Zelle in Punkten.
+
+    Returns:
+        Boolesches Raster (Zeilen von oben nach unten).
+    """
+    rect = page.rect
+    rows = int(np.ceil(rect.height / cell))
+    cols = int(np.ceil(rect.width / cell))
+    grid = np.zeros((rows, cols), dtype=bool)
+
+    def mark(box) -> None:
+        x0, y0 = max(0, int(box[0] // cell)), max(0, int(box[1] // cell))
+        x1, y1 = int(np.ceil(box[2] / cell)), int(np.ceil(box[3] / cell))
+        grid[y0:y1, x0:x1] = True
+
+    for block in page.get_text('blocks'):
+        mark(block[:4])
+    page_area = rect.width * rect.height
+    for drawing in page.get_drawings():
+        box = drawing['rect']
+        if box.width * box.height > 0.25 * page_area:
+            # Rahmen: nur die Kanten belegen
+            for edge in ((box.x0, box.y0, box.x1, box.y0 + 1),
+                         (box.x0, box.y1 - 1, box.x1, box.y1),
+                         (box.x0, box.y0, box.x0 + 1, box.y1),
+                         (box.x1 - 1, box.y0, box.x1, box.y1)):
+                mark(edge)
+        else:
+            mark(tuple(box))
+
+    if page.get_images():
+        # Vier Pixel pro Zellkante
+        pixmap = page.get_pixmap(dpi=int(72 * 4 / cell),
+                                 colorspace=pymupdf.csGRAY)
+        pixels = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(
+            pixmap.height, pixmap.width)
+        dark = pixels < 160
+        height = min(rows * 4, dark.shape[0])
+        width = min(cols * 4, dark.shape[1])
+        ink = np.zeros((rows * 4, cols * 4), dtype=bool)
+        ink[:height, :width] = dark[:height, :width]
+        grid |= ink.reshape(rows, 4, cols, 4).sum(axis=(1, 3)) > 1
+
+    return grid
+
+
+def free_region_finder(grid: np.ndarray, width: float, height: float,
+                       preferred: tuple, page_size: tuple,
+                       cell: int = CELL) -> tuple:
+    """
+    Sucht die freie Stelle für ein Rechteck, die der Wunschposition am
+    nächsten liegt.
+
+    Ist keine Stelle ganz frei, wird die mit den wenigsten belegten
+    Zellen gewählt.
+
+    Args:
+        grid: Raster belegter Zellen aus ``occupancy_analyzer``.
+        width: Breite des Rechtecks in Punkten.
+        height: Höhe des Rechtecks in Punkten.
+        preferred: Wunschposition der linken oberen Ecke in Punkten.
+        page_size: Breite und Höhe der Seite in Punkten.
+        cell: Kantenlänge einer Zelle in Punkten.
+
+    Returns:
+        Tupel aus linker oberer Ecke (x, y) in Punkten und Anzahl
+        überdeckter belegter Zellen.
+    """
+    rows, cols = grid.shape
+    need_rows = int(np.ceil(height / cell))
+    need_cols = int(np.ceil(width / cell))
+    # Erlaubte Positionen: ganz auf der Seite, mit Randabstand
+    margin = int(np.ceil(MARGIN / cell))
+    last_row = min(rows - need_rows,
+                   int((page_size[1] - MARGIN - height) // cell))
+    last_col = min(cols - need_cols,
+                   int((page_size[0] - MARGIN - width) // cell))
+    if last_row < margin or last_col < margin:
+        return preferred, 0
+
+    # Summe belegter Zellen für jedes Fenster über eine Summentabelle
+    table = np.zeros((rows + 1, cols + 1), dtype=np.int32)
+    table[1:, 1:] = grid.cumsum(axis=0).cumsum(axis=1)
+    windows = (table[need_rows:, need_cols:]
+               - table[:-need_rows, need_cols:]
+               - table[need_rows:, :-need_cols]
+               + table[:-need_rows, :-need_cols])
+    windows = windows[margin:last_row + 1, margin:last_col + 1]
+
+    y, x = np.mgrid[margin:last_row + 1, margin:last_col + 1] * cell
+    distance = np.hypot(x - preferred[0], y - preferred[1])
+    # Zuerst möglichst wenig Überdeckung, dann möglichst nah
+    order = np.lexsort((distance.ravel(), windows.ravel()))
+    best = order[0]
+
+    return ((float(x.ravel()[best]), float(y.ravel()[best])),
+            int(windows.ravel()[best]))
+
+
+def _page_analyzer(path: str, numbers: list) -> list:
+    """
+    Zerlegt einen Block von Seiten in Raster belegter Zellen.
+
+    Args:
+        path: Pfad der Korrekturfahne.
+        numbers: Seitennummern des Blocks (0-basiert).
+
+    Returns:
+        Pro Seite ein Tupel aus Rastergröße und gepackten Bits als Hex.
+    """
+    analyses = []
+    with pymupdf.open(path) as doc:
+        for number in numbers:
+            grid = occupancy_analyzer(doc[number])
+            analyses.append((list(grid.shape),
+                             np.packbits(grid).tobytes().hex()))
+
+    return analyses
+
+
+class LayoutIndex:
+    """
+    Zwischengespeicherte Raster belegter Zellen der Korrekturfahne.
+
+    Das Raster liegt unter ``<fahne>.pdf.layout.json`` und gilt, solange
+    der SHA-256-Hash der Fahne gleich bleibt. Neu analysiert werden nur
+    Seiten, die noch fehlen.
+    """
+
+    # Bei Änderungen der Analyse erhöhen
+    VERSION = 1
+
+    def __init__(self, doc: str, pages: list, workers: int = 1,
+                 instrumentation: Instrumentation = None):
+        """
+        Lädt die Raster und analysiert fehlende Seiten.
+
+        Args:
+            doc: Pfad zur Korrekturfahne.
+            pages: Seitennummern (0-basiert), die Stempel erhalten.
+            workers: Anzahl Prozesse für die Analyse (0: alle CPU-Kerne).
+            instrumentation: Optionale Messung von Hash und Analyse.
+        """
+        doc = str(doc)
+        path = Path(doc + '.layout.json')
+        instrumentation = instrumentation or Instrumentation()
+
+        with instrumentation.timer('layout_hash'):
+            digest = file_hasher(doc)
+        self.pages = self._index_loader(path, digest)
+        missing = sorted(set(pages) - set(self.pages))
+        if missing:
+            with instrumentation.timer('layout_analysis'):
+                analyses = page_chunk_mapper(_page_analyzer, doc, missing,
+                                             workers or os.cpu_count() or 1)
+            self.pages.update(zip(missing, analyses))
+            instrumentation.counter('layout_pages', len(missing))
+            self._index_saver(path, digest)
+
+    def _index_loader(self, path: Path, digest: str) -> dict:
+        """Liest gespeicherte Raster, wenn sie zur Fahne passen."""
+        try:
+            content = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        if (content.get('version') != self.VERSION
+                or content.get('sha256') != digest
+                or content.get('cell') != CELL):
+            return {}
+
+        return {int(number): tuple(entry)
+                for number, entry in content['pages'].items()}
+
+    def _index_saver(self, path: Path, digest: str) -> None:
+        """Speichert die Raster atomar neben der Fahne."""
+        content = {'version': self.VERSION, 'sha256': digest, 'cell': CELL,
+                   'pages': {str(number): list(entry)
+                             for number, entry in sorted(self.pages.items())}}
+        try:
+            atomic_writer(path, json.dumps(content).encode('utf-8'))
+        except OSError:
+            pass  # schreibgeschützter Ordner: Analyse beim nächsten Mal neu
+
+    def grid(self, number: int) -> np.ndarray:
+        """
+        Raster einer Seite als beschreibbare Kopie.
+
+        Args:
+            number: Seitennummer in der Korrekturfahne (0-basiert).
+
+        Returns:
+            Boolesches Raster belegter Zellen.
+        """
+        shape, bits = self.pages[number]
+        size = shape[0] * shape[1]
+        packed = np.frombuffer(bytes.fromhex(bits), dtype=np.uint8)
+        grid = np.unpackbits(packed, count=size)
+
+        return grid.astype(bool).reshape(shape)
+
+
+class StampLayout(NamedTuple):
+    """
+    Welche Seiten eines Schülers welche Stempel erhalten.
+
+    ``tasks`` enthält Paare aus Spalte und Seite des Schülers (1-basiert,
+    None für die Position der Aufgabe in der Liste).
+    """
+
+    placement: str = 'fixed'
+    summary_page: str = 'first'
+    tasks: tuple = ()
+
+    PLACEMENTS = ('fixed', 'auto')
+    SUMMARY_PAGES = ('first', 'last')
+
+    @classmethod
+    def from_config(cls, config) -> 'StampLayout':
+        """
+        Erstellt das Layout aus einer Konfiguration.
+
+        Args:
+            config: Config mit ``placement``, ``summary_page`` und ``tasks``.
+
+        Returns:
+            Geprüftes Layout.
+        """
+        return cls(config.placement, config.summary_page,
+                   cls.task_parser(config.tasks))
+
+    @staticmethod
+    def task_parser(tasks) -> tuple:
+        """
+        Liest die Aufgabenspalten.
+
+        Args:
+            tasks: Text wie ``'A1,A2,A3@2'``, Liste solcher Einträge oder
+                None.
+
+        Returns:
+            Tupel aus Paaren von Spalte und Seite (oder None).
+        """
+        if not tasks:
+            return ()
+        if isinstance(tasks, str):
+            tasks = tasks.split(',')
+
+        parsed = []
+        for task in tasks:
+            match = re.fullmatch(r'\s*([^@]+?)\s*(?:@\s*(\d+)\s*)?', str(task))
+            if match is None or (match.group(2) and int(match.group(2)) < 1):
+                raise ValueError(f'Ungültige Aufgabe: {task!r}')
+            page = int(match.group(2)) if match.group(2) else None
+            parsed.append((match.group(1), page))
+
+        return tuple(parsed)
+
+    def validate(self) -> None:
+        """Prüft Platzierung und Seite des Notenstempels."""
+        if self.placement not in self.PLACEMENTS:
+            raise ValueError(f'Unbekannte Platzierung: {self.placement!r}')
+        if self.summary_page not in self.SUMMARY_PAGES:
+            raise ValueError('Unbekannte Seite des Notenstempels: '
+                             f'{self.summary_page!r}')
+
+    def columns(self) -> tuple:
+        """Spalten der Notentabelle mit Aufgabenpunkten."""
+        return tuple(column for column, _ in self.tasks)
+
+    def summary_offset(self, student) -> int:
+        """
+        Seite des Notenstempels relativ zur ersten Seite des Schülers.
+
+        Args:
+            student: Datensatz des Schülers.
+
+        Returns:
+            0 für die erste, ``last - first`` für die letzte Seite.
+        """
+        if self.summary_page == 'last':
+            return student.last - student.first
+
+        return 0
+
+    def task_labels(self, df: pd.DataFrame) -> dict:
+        """
+        Beschriftungen der Aufgabenstempel aller Schüler.
+
+        Aufgaben ohne Seitenangabe stehen auf der Seite ihrer Position;
+        hat ein Schüler weniger Seiten, auf seiner letzten Seite. Leere
+        Zellen ergeben keinen Stempel.
+
+        Args:
+            df: Notendaten mit Schüler-Schlüssel als Index, ``First``,
+                ``Last`` und den Aufgabenspalten.
+
+        Returns:
+            Dictionary von Schlüssel auf Liste von Paaren aus Seite
+            relativ zur ersten Seite (0-basiert) und Text.
+        """
+        if not self.tasks:
+            return {}
+        page_counts = (df['Last'] - df['First'] + 1).tolist()
+        values = {column: df[column].tolist() for column, _ in self.tasks}
+        labels = {}
+
+        for position, key in enumerate(df.index.tolist()):
+            entries = []
+            for number, (column, page) in enumerate(self.tasks, start=1):
+                value = values[column][position]
+                if pd.isna(value) or str(value).strip() == '':
+                    continue
+                offset = min(page or number, page_counts[position]) - 1
+                entries.append((offset, f'{column}: {value}'))
+            labels[key] = entries
+
+        return labels
+
+    def pages(self, records: tuple, labels: dict) -> list:
+        """
+        Seiten der Korrekturfahne, die Stempel erhalten.
+
+        Args:
+            records: Schülerdatensätze.
+            labels: Aufgabenbeschriftungen aus ``task_labels``.
+
+        Returns:
+            Sortierte Seitennummern (0-basiert).
+        """
+        pages = set()
+        for student in records:
+            pages.add(student.first - 1 + self.summary_offset(student))
+            pages.update(student.first - 1 + offset
+                         for offset, _ in labels.get(student.key, ()))
+
+        return sorted(pages)
+
+
+class StampPlacer:
+    """
+    Platziert die Stempel eines Schülers nacheinander ohne Überlappung.
+
+    Ohne Raster (feste Platzierung) steht jeder Stempel an seiner
+    Wunschposition und rückt nur unter bereits platzierte Stempel
+    derselben Seite. Mit Raster wird die nächstgelegene freie Stelle
+    gesucht; platzierte Stempel gelten danach als belegt.
+    """
+
+    def __init__(self, grid_loader=None):
+        """
+        Initialisiert die Platzierung eines Schülers.
+
+        Args:
+            grid_loader: Optionale Funktion, die zu einer Seite des
+                Schülers (0-basiert) das Raster belegter Zellen liefert.
+        """
+        self.grid_loader = grid_loader
+        self.overlaps = 0
+        self._grids = {}
+        self._placed = {}
+
+    def place(self, offset: int, size: tuple, preferred: tuple,
+              page_size: tuple) -> tuple:
+        """
+        Bestimmt die Position eines Stempels.
+
+        Args:
+            offset: Seite des Schülers (0-basiert).
+            size: Breite und Höhe des Stempels in Punkten.
+            preferred: Wunschposition der linken oberen Ecke.
+            page_size: Breite und Höhe der Seite in Punkten.
+
+        Returns:
+            Linke obere Ecke (x, y) in Punkten.
+        """
+        width, height = size
+        placed = self._placed.setdefault(offset, [])
+
+        if self.grid_loader is None:
+            x, y = preferred
+            for x0, y0, x1, y1 in sorted(placed, key=lambda box: box[1]):
+                if x < x1 and x0 < x + width and y < y1 and y0 < y + height:
+                    y = y1 + 2
+        else:
+            if offset not in self._grids:
+                self._grids[offset] = self.grid_loader(offset)
+            grid = self._grids[offset]
+            (x, y), overlap = free_region_finder(grid, width, height,
+                                                 preferred, page_size)
+            self.overlaps += overlap > 0
+            grid[int(y // CELL):int(np.ceil((y + height) / CELL)),
+                 int(x // CELL):int(np.ceil((x + width) / CELL))] = True
+
+        placed.append((x, y, x + width, y + height))
+
+        return x, y
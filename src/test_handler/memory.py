@@ -0,0 +1,74 @@
+"""
+Speicherobergrenze für Läufe mit sehr großen Korrekturfahnen.
+
+PyMuPDF behält Objekte und Ressourcen einer geöffneten Korrekturfahne,
+sobald eine Seite einmal gelesen wurde, und füllt zusätzlich seinen
+globalen Ressourcen-Speicher. Bei gescannten Fahnen von mehreren GB
+wächst der Prozess dadurch mit jeder verarbeiteten Seite. Im
+Streaming-Modus prüft der Worker nach jeder geschriebenen Datei den
+Speicherbedarf und gibt die Fahne frei, sobald die Obergrenze
+überschritten ist.
+"""
+
+import os
+import sys
+
+
+def rss_reader() -> int:
+    """
+    Liest den aktuellen Speicherbedarf (RSS) des Prozesses.
+
+    Unter Linux stammt der Wert aus ``/proc/self/statm``. Andernorts
+    wird der bisherige Höchstwert verwendet; er überschätzt den
+    aktuellen Bedarf und löst die Freigabe daher eher zu oft aus.
+
+    Returns:
+        Speicherbedarf in Bytes oder ``None``, wenn er nicht ermittelt
+        werden kann.
+    """
+    try:
+        with open('/proc/self/statm', encoding='ascii') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ModuleNotFoundError:  # Windows
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS meldet Bytes, Linux und BSD Kilobytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryCeiling:
+    """
+    Obergrenze für den Speicherbedarf eines Worker-Prozesses.
+
+    Ist der Bedarf nicht ermittelbar, gilt die Grenze immer als
+    überschritten; die Fahne wird dann nach jedem Schüler freigegeben.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialisiert die Obergrenze.
+
+        Args:
+            max_bytes: Höchster Speicherbedarf eines Prozesses in Bytes.
+        """
+        self.max_bytes = max_bytes
+
+    def __repr__(self) -> str:
+        return f'MemoryCeiling({self.max_bytes / 2 ** 20:.0f} MB)'
+
+    def exceeded(self) -> bool:
+        """
+        Prüft, ob der Prozess die Obergrenze überschritten hat.
+
+        Returns:
+            True, wenn Speicher freigegeben werden soll.
+        """
+        rss = rss_reader()
+
+        return rss is None or rss > self.max_bytes
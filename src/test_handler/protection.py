@@ -0,0 +1,155 @@
+"""
+Verschlüsselung und Metadaten der Schülerdateien.
+
+Passwort, Titel, Betreff und Autor jeder Ausgabedatei entstehen aus
+Vorlagen mit Platzhaltern für die Spalten der Notentabelle, z. B.
+``'{Geburtsdatum}'`` oder ``'{Kennung:.6}'`` (die ersten sechs Zeichen).
+Sie werden in derselben ``tobytes``-Operation angewendet, die die Datei
+erzeugt; ein zweiter Lese- und Schreibdurchgang über alle Ausgaben
+entfällt.
+"""
+
+from __future__ import annotations
+
+import string
+from typing import NamedTuple
+
+from test_handler._lazy import LazyModule
+from test_handler.config import DataError
+
+pd = LazyModule('pandas')
+pymupdf = LazyModule('pymupdf')
+
+
+class Protection(NamedTuple):
+    """
+    Vorlagen für Passwörter und Metadaten der Schülerdateien.
+
+    Ohne Benutzer- und Besitzerpasswort werden nur die Metadaten gesetzt.
+    Verschlüsselt wird mit AES-256; das Besitzerpasswort (z. B. der
+    Lehrperson) ist ohne eigene Angabe gleich dem Benutzerpasswort.
+    Da AES zufällige Initialisierungsvektoren verwendet, sind
+    verschlüsselte Dateien nicht mehr byte-identisch zwischen Läufen.
+    """
+
+    password: str = None
+    owner_password: str = None
+    author: str = None
+    title: str = '{Titel}'
+    subject: str = '{Vorname} {Name}'
+
+    @classmethod
+    def from_config(cls, config) -> 'Protection':
+        """
+        Erstellt die Vorlagen aus einer Konfiguration.
+
+        Args:
+            config: Config mit ``password``, ``owner_password``,
+                ``author`` und ``document_title``.
+
+        Returns:
+            Protection oder None, wenn nichts davon gesetzt ist.
+        """
+        values = {'password': config.password,
+                  'owner_password': config.owner_password,
+                  'author': config.author}
+        if config.document_title is not None:
+            values['title'] = config.document_title
+        if not any(value is not None for value in values.values()):
+            return None
+
+        return cls(**values)
+
+    def _templates(self) -> dict:
+        """Alle gesetzten Vorlagen nach Verwendungszweck."""
+        templates = {'user_pw': self.password,
+                     'owner_pw': self.owner_password,
+                     'author': self.author, 'title': self.title,
+                     'subject': self.subject}
+
+        return {name: template for name, template in templates.items()
+                if template is not None}
+
+    def columns(self) -> tuple:
+        """
+        Spalten der Notentabelle, die in den Vorlagen vorkommen.
+
+        Returns:
+            Spaltennamen in Reihenfolge des ersten Auftretens, ohne den
+            Schüler-Schlüssel ``Schluessel``.
+        """
+        columns = []
+        for template in self._templates().values():
+            for field in self._placeholders(template):
+                if field != 'Schluessel' and field not in columns:
+                    columns.append(field)
+
+        return tuple(columns)
+
+    def student_options(self, df: pd.DataFrame) -> dict:
+        """
+        Füllt die Vorlagen für alle Schüler in einem Durchgang aus.
+
+        Args:
+            df: Bereinigte Notendaten mit dem Schüler-Schlüssel als Index
+                und allen Spalten aus ``columns``.
+
+        Returns:
+            Dictionary von Schlüssel auf ein Tupel aus Metadaten (für
+            ``set_metadata``) und zusätzlichen Optionen für ``tobytes``.
+        """
+        templates = self._templates()
+        columns = {column: df[column].tolist() for column in df.columns}
+        # Die Nachnamenspalte heißt nach dem Laden immer 'Name'
+        columns.setdefault('Nachname', columns.get('Name'))
+        options = {}
+
+        for position, key in enumerate(df.index.tolist()):
+            fields = {column: values[position]
+                      for column, values in columns.items()}
+            fields['Schluessel'] = key
+            filled = {}
+            for name, template in templates.items():
+                try:
+                    value = template.format_map(fields)
+                except KeyError as error:
+                    raise DataError(f'Unbekannte Spalte {error} in der '
+                                    f'Vorlage {template!r}') from None
+                if name in ('user_pw', 'owner_pw') and (
+                        not value or any(pd.isna(fields.get(column))
+                                         for column in
+                                         self._placeholders(template))):
+                    raise DataError(f'Kein Passwort für {key} '
+                                    f'(Vorlage {template!r})')
+                filled[name] = value
+            options[key] = self._option_creator(filled)
+
+        return options
+
+    @staticmethod
+    def _placeholders(template: str) -> list:
+        """Platzhalter einer Vorlage."""
+        return [field for _, field, _, _ in string.Formatter().parse(template)
+                if field]
+
+    @staticmethod
+    def _option_creator(filled: dict) -> tuple:
+        """
+        Teilt ausgefüllte Vorlagen in Metadaten und Speicheroptionen.
+
+        Args:
+            filled: Ausgefüllte Vorlagen nach Verwendungszweck.
+
+        Returns:
+            Tupel aus Metadaten und Optionen für ``tobytes``.
+        """
+        metadata = {name: filled[name]
+                    for name in ('author', 'title', 'subject') if name in filled}
+        options = {}
+        if 'user_pw' in filled or 'owner_pw' in filled:
+            user_pw = filled.get('user_pw', '')
+            options = {'encryption': pymupdf.PDF_ENCRYPT_AES_256,
+                       'user_pw': user_pw,
+                       'owner_pw': filled.get('owner_pw', user_pw)}
+
+        return metadata, options
@@ -0,0 +1,303 @@
+"""
+Klassenbericht: Übersicht aller Noten einer Prüfung in einer PDF-Datei.
+
+Der Bericht entsteht im selben Lauf aus denselben Daten im Speicher wie
+die Stempel: ``DataHandler.df`` liefert die Rangliste, ``ClassStatistics``
+Kennzahlen, Notenverteilung und Perzentilränge. Als Verteilungsgrafik
+dient der bereits gerenderte Klassenhintergrund des Stampers; er wird
+als Vorlage eingebettet statt erneut mit matplotlib gezeichnet. Die
+Rangliste wird zusätzlich als CSV oder Parquet exportiert.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import io
+from pathlib import Path
+
+from test_handler._lazy import LazyModule
+from test_handler.config import ConfigError
+from test_handler.instrumentation import Instrumentation
+from test_handler.save_profiles import SAVE_PROFILES
+from test_handler.writer import atomic_writer
+
+pymupdf = LazyModule('pymupdf')
+
+REPORT_NAME = 'class_report'
+
+
+def parquet_engine_finder() -> str:
+    """
+    Sucht eine installierte Parquet-Bibliothek für pandas.
+
+    Returns:
+        'pyarrow' oder 'fastparquet', sonst None.
+    """
+    for engine in ('pyarrow', 'fastparquet'):
+        if importlib.util.find_spec(engine) is not None:
+            return engine
+
+    return None
+
+
+class ClassReport:
+    """
+    Schreibt ``class_report.pdf`` und den Export der Rangliste.
+
+    Die erste Seite zeigt Kennzahlen, Verteilungsgrafik und Anzahl pro
+    Notenstufe; die Rangliste folgt und läuft bei großen Klassen über
+    weitere Seiten. Jede Spalte einer Seite wird mit einem einzigen
+    Textaufruf gesetzt.
+    """
+
+    PAGE_SIZE = (595, 842)  # A4 hoch
+    MARGIN = 50
+    FONT_SIZE = 9
+    ROW_HEIGHT = 12
+    # Spalten der Rangliste mit linker Kante in Punkten
+    TABLE = (('Rang', 50), ('Name', 90), ('Vorname', 220), ('Total', 340),
+             ('Note', 400), ('Perzentil', 460))
+    EXPORT_COLUMNS = ('Rang', 'Name', 'Vorname', 'Total', 'Note',
+                      'Perzentil', 'Datum', 'Titel')
+    GRAPHIC_WIDTH = 250
+    BAR_WIDTH = 200
+
+    def __init__(self, data, folder: str, export_format: str = 'csv',
+                 save_profile: str = 'balanced',
+                 instrumentation: Instrumentation = None):
+        """
+        Initialisiert den Bericht und prüft das Exportformat.
+
+        Args:
+            data: DataHandler mit ``df`` und ``statistics``.
+            folder: Zielordner für Bericht und Export.
+            export_format: Format der Rangliste ('csv' oder 'parquet';
+                letzteres benötigt pyarrow oder fastparquet).
+            save_profile: Speicherprofil des Berichts wie bei den
+                Schülerdateien.
+            instrumentation: Optionale Messung der Stufe 'class_report'.
+
+        Raises:
+            ConfigError: Unbekanntes Format oder fehlende
+                Parquet-Bibliothek.
+        """
+        if export_format not in ('csv', 'parquet'):
+            raise ConfigError(f'Unbekanntes Exportformat: {export_format!r}')
+        self.engine = None
+        if export_format == 'parquet':
+            self.engine = parquet_engine_finder()
+            if self.engine is None:
+                raise ConfigError('Der Parquet-Export benötigt das Paket '
+                                  'pyarrow oder fastparquet')
+        self.data = data
+        self.folder = Path(folder)
+        self.export_format = export_format
+        self.save_profile = SAVE_PROFILES[save_profile]['output']
+        self.instrumentation = instrumentation or Instrumentation()
+        self.written = None
+
+    def ranking(self):
+        """
+        Erstellt die Rangliste der Klasse.
+
+        Returns:
+            DataFrame nach Note (beste zuerst) und Name sortiert, mit
+            Rang und Perzentilrang aus der Klassenstatistik.
+        """
+        df = self.data.df.assign(
+            Perzentil=self.data.statistics.percentile_ranks.round(1))
+        df = df.sort_values(['Note', 'Name', 'Vorname'],
+                            ascending=[False, True, True], kind='stable')
+        df.insert(0, 'Rang', df['Note'].rank(method='min', ascending=False)
+                  .astype(int))
+
+        return df
+
+    def writer(self, frame: dict = None) -> list:
+        """
+        Schreibt Bericht und Export in den Zielordner.
+
+        Args:
+            frame: Optionaler Hintergrund aus ``Stamper._frame_loader``;
+                ohne ihn enthält der Bericht nur die Notenstufen.
+
+        Returns:
+            Pfade der geschriebenen Dateien (leer ohne Schüler).
+        """
+        self.written = []
+        if self.data.statistics is None:
+            return self.written
+
+        with self.instrumentation.timer('class_report'):
+            ranking = self.ranking()
+            self.folder.mkdir(parents=True, exist_ok=True)
+
+            path = self.folder / f'{REPORT_NAME}.pdf'
+            atomic_writer(path, self._pdf_creator(ranking, frame))
+            self.written.append(path)
+
+            path = self.folder / f'{REPORT_NAME}.{self.export_format}'
+            atomic_writer(path, self._export_creator(ranking))
+            self.written.append(path)
+
+        return self.written
+
+    def _export_creator(self, ranking) -> bytes:
+        """
+        Exportiert die Rangliste.
+
+        Args:
+            ranking: Rangliste aus ``ranking``.
+
+        Returns:
+            Inhalt der CSV- (Trennzeichen ``;`` wie die Notentabelle)
+            bzw. Parquet-Datei.
+        """
+        table = ranking[list(self.EXPORT_COLUMNS)]
+        if self.export_format == 'csv':
+            return table.to_csv(sep=';', index=False).encode('utf-8')
+
+        buffer = io.BytesIO()
+        table.to_parquet(buffer, engine=self.engine, index=False)
+
+        return buffer.getvalue()
+
+    def _pdf_creator(self, ranking, frame: dict = None) -> bytes:
+        """
+        Setzt den Bericht.
+
+        Args:
+            ranking: Rangliste aus ``ranking``.
+            frame: Optionaler Hintergrund des Stampers.
+
+        Returns:
+            PDF-Inhalt.
+        """
+        doc = pymupdf.open()
+        try:
+            page = doc.new_page(width=self.PAGE_SIZE[0],
+                                height=self.PAGE_SIZE[1])
+            y = self._overview_writer(page, ranking, frame)
+            self._table_writer(doc, page, ranking, y)
+            return doc.tobytes(**self.save_profile.options())
+        finally:
+            doc.close()
+
+    def _overview_writer(self, page: pymupdf.Page, ranking,
+                         frame: dict = None) -> float:
+        """
+        Setzt Titel, Kennzahlen, Verteilungsgrafik und Notenstufen.
+
+        Args:
+            page: Erste Seite des Berichts.
+            ranking: Rangliste aus ``ranking``.
+            frame: Optionaler Hintergrund des Stampers.
+
+        Returns:
+            Y-Koordinate unter der Übersicht.
+        """
+        stats = self.data.statistics
+        titles = ', '.join(dict.fromkeys(ranking['Titel'].astype(str)))
+        dates = ', '.join(dict.fromkeys(ranking['Datum'].astype(str)))
+        page.insert_text((self.MARGIN, 60), f'Klassenbericht {titles}',
+                         fontsize=16)
+        page.insert_text((self.MARGIN, 78), f'{dates}, {stats.count} Schüler',
+                         fontsize=self.FONT_SIZE + 1)
+        y = 95
+
+        # Verteilungsgrafik: gerenderter Hintergrund der Stempel
+        bottom = y
+        if frame is not None:
+            # Die Vorlage ist bereits auf den Zuschnitt begrenzt
+            template = frame['template']
+            size = template[0].rect
+            rect = pymupdf.Rect(self.MARGIN, y, self.MARGIN
+                                + self.GRAPHIC_WIDTH,
+                                y + self.GRAPHIC_WIDTH * size.height
+                                / size.width)
+            page.show_pdf_page(rect, template, 0)
+            bottom = rect.y1
+
+        failed = int((ranking['Note'] < stats.PASS_MARK).sum())
+        figures = [('Mittelwert', f'{stats.mean:.2f}'),
+                   ('Median', f'{stats.median:.2f}'),
+                   ('Quartile', f'{stats.q1:.2f} - {stats.q3:.2f}'),
+                   ('Minimum', f'{stats.minimum:.2f}'),
+                   ('Maximum', f'{stats.maximum:.2f}'),
+                   ('Ungenügend', f'{failed} von {stats.count}')]
+        x = self.MARGIN + self.GRAPHIC_WIDTH + 30
+        lineheight = self.ROW_HEIGHT / self.FONT_SIZE
+        page.insert_text((x, y + 12), [label for label, _ in figures],
+                         fontsize=self.FONT_SIZE, lineheight=lineheight)
+        page.insert_text((x + 80, y + 12), [value for _, value in figures],
+                         fontsize=self.FONT_SIZE, lineheight=lineheight)
+        bottom = max(bottom, y + 12 + len(figures) * self.ROW_HEIGHT)
+
+        # Anzahl pro Notenstufe als Balken
+        y = bottom + 25
+        page.insert_text((self.MARGIN, y), 'Notenverteilung',
+                         fontsize=self.FONT_SIZE + 2)
+        edges = stats.bin_edges
+        labels = [f'{low:g} - {high:g}' for low, high in zip(edges, edges[1:])]
+        counts = stats.histogram.tolist()
+        top = y + 8
+        scale = self.BAR_WIDTH / max(max(counts), 1)
+        shape = page.new_shape()
+        for row, count in enumerate(counts):
+            row_y = top + row * self.ROW_HEIGHT
+            if count:
+                shape.draw_rect(pymupdf.Rect(
+                    self.MARGIN + 70, row_y + 2,
+                    self.MARGIN + 70 + count * scale,
+                    row_y + self.ROW_HEIGHT - 2))
+        shape.finish(color=None, fill=(0.55, 0.7, 0.85))
+        shape.commit()
+        page.insert_text((self.MARGIN, top + 9), labels,
+                         fontsize=self.FONT_SIZE, lineheight=lineheight)
+        page.insert_text((self.MARGIN + 80 + self.BAR_WIDTH, top + 9),
+                         [str(count) for count in counts],
+                         fontsize=self.FONT_SIZE, lineheight=lineheight)
+
+        return top + len(counts) * self.ROW_HEIGHT + 25
+
+    def _table_writer(self, doc: pymupdf.Document, page: pymupdf.Page,
+                      ranking, y: float) -> None:
+        """
+        Setzt die Rangliste, bei Bedarf über mehrere Seiten.
+
+        Args:
+            doc: Bericht.
+            page: Seite, auf der die Rangliste beginnt.
+            ranking: Rangliste aus ``ranking``.
+            y: Y-Koordinate des Tabellenkopfs.
+        """
+        cells = {
+            'Rang': ranking['Rang'].astype(str).tolist(),
+            'Name': ranking['Name'].astype(str).tolist(),
+            'Vorname': ranking['Vorname'].astype(str).tolist(),
+            'Total': ranking['Total'].astype(str).tolist(),
+            'Note': [f'{note:.2f}' for note in ranking['Note']],
+            'Perzentil': [f'{rank:.1f}' for rank in ranking['Perzentil']],
+        }
+        lineheight = self.ROW_HEIGHT / self.FONT_SIZE
+        start = 0
+        while True:
+            rows = int((self.PAGE_SIZE[1] - self.MARGIN - y)
+                       // self.ROW_HEIGHT) - 1
+            end = start + rows
+            for column, x in self.TABLE:
+                page.insert_text((x, y), column, fontsize=self.FONT_SIZE,
+                                 fontname='hebo')
+                page.insert_text((x, y + self.ROW_HEIGHT),
+                                 cells[column][start:end],
+                                 fontsize=self.FONT_SIZE,
+                                 lineheight=lineheight)
+            page.draw_line((self.MARGIN, y + 3),
+                           (self.PAGE_SIZE[0] - self.MARGIN, y + 3),
+                           width=0.5)
+            if end >= len(ranking):
+                break
+            start = end
+            page = doc.new_page(width=self.PAGE_SIZE[0],
+                                height=self.PAGE_SIZE[1])
+            y = self.MARGIN + 10
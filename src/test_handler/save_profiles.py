@@ -0,0 +1,93 @@
+"""
+Speicherprofile für die gestempelte Gesamtfahne und die Schülerdateien.
+
+Ein Profil legt pro Stufe fest, wie gründlich PyMuPDF beim Speichern
+aufräumt und komprimiert. Die Gesamtfahne von ``printing_press`` wird
+direkt nach dem Aufteilen gelöscht und braucht daher keine teure
+Kompression; die Schülerdateien werden verschickt und archiviert.
+
+    fast      keine Kompression, kein Aufräumen: kürzeste Laufzeit
+              (PyMuPDF-Standard, so wurden die Schülerdateien
+              ursprünglich gespeichert)
+    balanced  komprimierte Inhaltsströme, Gesamtfahne nur mit einfachem
+              Aufräumen
+    archive   zusätzlich Bilder und Schriften komprimieren, doppelte
+              Objekte zusammenführen und Objektströme verwenden;
+              Schülerdateien werden linearisiert, sofern MuPDF es noch
+              unterstützt
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import NamedTuple
+
+from test_handler._lazy import LazyModule
+
+pymupdf = LazyModule('pymupdf')
+
+
+class SaveProfile(NamedTuple):
+    """
+    Einstellungen für ``Document.save`` bzw. ``Document.tobytes``.
+
+    Linearisierung wird nur angewendet, wenn die installierte
+    MuPDF-Version sie noch unterstützt.
+    """
+
+    garbage: int = 0
+    deflate: bool = False
+    deflate_images: bool = False
+    deflate_fonts: bool = False
+    use_objstms: bool = False
+    linear: bool = False
+
+    def options(self) -> dict:
+        """
+        Übersetzt das Profil in Argumente für PyMuPDF.
+
+        Returns:
+            Schlüsselwortargumente für ``save`` bzw. ``tobytes``.
+        """
+        options = self._asdict()
+        if options['linear'] and not linear_supported():
+            options['linear'] = False
+
+        return options
+
+
+# Stufen: 'stamped' ist die Gesamtfahne, 'output' jede Schülerdatei
+SAVE_PROFILES = {
+    'fast': {
+        'stamped': SaveProfile(),
+        'output': SaveProfile(),
+    },
+    'balanced': {
+        'stamped': SaveProfile(garbage=1, deflate=True),
+        'output': SaveProfile(deflate=True),
+    },
+    'archive': {
+        'stamped': SaveProfile(garbage=4, deflate=True),
+        'output': SaveProfile(garbage=4, deflate=True, deflate_images=True,
+                              deflate_fonts=True, use_objstms=True,
+                              linear=True),
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def linear_supported() -> bool:
+    """
+    Prüft einmal pro Prozess, ob MuPDF linearisierte Dateien schreibt.
+
+    Returns:
+        True, wenn ``linear=True`` beim Speichern funktioniert.
+    """
+    with pymupdf.open() as doc:
+        doc.new_page()
+        try:
+            doc.tobytes(linear=True)
+        except Exception:  # ab MuPDF 1.26 ein FzErrorArgument
+            return False
+
+    return True
@@ -5,11 +5,41 @@ Dieses Modul ermöglicht das Hinzufügen von individuellen Notenstempeln zu
 PDF-Dokumenten und die Organisation der gestempelten Dateien nach Schülernamen.
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import pymupdf
+from __future__ import annotations
+
+import csv
 import io
+import json
+import os
+import sys
 from pathlib import Path
+from typing import NamedTuple
+
+from test_handler._lazy import LazyModule
+from test_handler.cache import StampCache
+from test_handler.config import Config, ConfigError, DataError
+from test_handler.engine import STAGE_ORDERS, stage_creator, student_runner
+from test_handler.extract import PageRangeExtractor
+from test_handler.incremental import OutputManifest, page_range_hasher
+from test_handler.indexer import ProofIndex
+from test_handler.instrumentation import Instrumentation
+from test_handler.journal import RunJournal
+from test_handler.layout import LayoutIndex, StampLayout, StampPlacer
+from test_handler.memory import MemoryCeiling
+from test_handler.protection import Protection
+from test_handler.report import ClassReport
+from test_handler.save_profiles import SAVE_PROFILES
+from test_handler.stats import ClassStatistics, horizontal_options
+from test_handler.writer import OutputWriter, atomic_writer
+
+# Schwere Abhängigkeiten erst in der Stufe laden, die sie braucht;
+# matplotlib zeichnet immer mit dem nicht-interaktiven Agg-Backend
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+plt = LazyModule('matplotlib.pyplot', backend='Agg')
+backend_agg = LazyModule('matplotlib.backends.backend_agg')
+transforms = LazyModule('matplotlib.transforms')
+pymupdf = LazyModule('pymupdf')
 
 
 class Pathfinder:
@@ -17,14 +47,25 @@ class Pathfinder:
     Verwaltet Dateipfade für Eingabe- und Ausgabedateien.
     
     Diese Klasse sammelt Pfade für das PDF-Dokument, die CSV-Datentabelle
-    und den Zielordner durch Benutzereingaben oder Standardwerte.
+    und den Zielordner durch Benutzereingaben oder Standardwerte. Bereits
+    bekannte Pfade werden übernommen; nur fehlende werden abgefragt.
     """
     
-    def __init__(self):
-        """Initialisiert Pathfinder und sammelt alle benötigten Pfade."""
-        self.doc = self._doc_path_collector()
-        self.data = self._data_path_collector()
-        self.destination_folder = self._destination_folder_path_collector()
+    def __init__(self, doc: str = None, data: str = None,
+                 destination_folder: str = None):
+        """
+        Initialisiert Pathfinder und sammelt alle fehlenden Pfade.
+        
+        Args:
+            doc: Optionaler Pfad zur Korrekturfahne.
+            data: Optionaler Pfad zur Notentabelle.
+            destination_folder: Optionaler Pfad zum Zielordner.
+        """
+        self.doc = doc if doc is not None else self._doc_path_collector()
+        self.data = data if data is not None else self._data_path_collector()
+        self.destination_folder = (
+            destination_folder if destination_folder is not None
+            else self._destination_folder_path_collector())
 
     def _path_collector(self, default: str, input_text: str) -> str:
         """
@@ -83,73 +124,375 @@ class Pathfinder:
         return self._path_collector(default, input_text)
 
 
+class StudentRecord(NamedTuple):
+    """
+    Unveränderlicher Datensatz eines Schülers aus der Notentabelle.
+    
+    Die Werte sind Python-Objekte (keine NumPy-Skalare) und werden beim
+    Laden einmal spaltenweise aus dem DataFrame übernommen.
+    """
+    
+    name: str
+    vorname: str
+    first: int
+    last: int
+    total: object
+    note: float
+    datum: str
+    titel: str
+    key: str
+    
+    
 class DataHandler:
     """
     Verarbeitet und bereinigt die Notendaten aus der CSV-Datei.
     
-    Diese Klasse lädt die CSV-Datei, entfernt fehlende Werte, normalisiert
-    Umlaute und bereitet die Daten für die weitere Verarbeitung vor.
+    Diese Klasse lädt nur die benötigten Spalten der CSV-Datei mit festen
+    Datentypen, entfernt fehlende Werte, normalisiert Umlaute und prüft
+    vor dem Stempeln, dass jeder Schüler einen eindeutigen Schlüssel hat
+    und die Seitenbereiche sich nicht überschneiden und in der
+    Korrekturfahne liegen. Mit einem Seitenindex der Fahne dürfen die
+    Spalten ``First``/``Last`` fehlen; sind sie vorhanden, werden sie
+    mit dem Index abgeglichen. Die Notenstatistik der Klasse wird einmal
+    berechnet und steht als ``statistics`` allen Stufen zur Verfügung.
     """
     
-    def __init__(self, paths: Pathfinder):
+    RANGE_COLUMNS = ('First', 'Last')
+    
+    COLUMNS = ('Vorname', 'Total', 'Note', 'First', 'Last', 'Datum', 'Titel')
+    UMLAUTE = {
+        'ä': 'ae', 'ö': 'oe', 'ü': 'ue',
+        'Ä': 'Ae', 'Ö': 'Oe', 'Ü': 'Ue',
+    }
+    
+    def __init__(self, paths: Pathfinder,
+                 instrumentation: Instrumentation = None, engine: str = 'c',
+                 columns: tuple = (), page_index: ProofIndex = None):
         """
-        Initialisiert DataHandler und lädt die Daten.
+        Initialisiert DataHandler, lädt und prüft die Daten.
         
         Args:
             paths: Ein Pathfinder-Objekt mit den Dateipfaden.
+            instrumentation: Optionale Messung der Ladeschritte (wird nicht
+                gespeichert, damit der DataHandler an Worker gehen kann).
+            engine: Parser von pandas ('c', 'python' oder 'pyarrow').
+            columns: Zusätzliche Spalten, die als Text geladen werden,
+                z. B. für Passwörter; fehlende Werte darin entfernen
+                keine Zeilen.
+            page_index: Optionaler Seitenindex der Korrekturfahne; ergänzt
+                fehlende Seitenbereiche und prüft vorhandene.
         """
-        self.df = self._df_fetcher(paths)
-        self.df = self._df_cleaner()
+        if instrumentation is None:
+            instrumentation = Instrumentation()
+        if engine not in Config.CSV_ENGINES:
+            raise ConfigError(f'Unbekannter CSV-Parser: {engine!r}')
         
-    def _df_fetcher(self, paths: Pathfinder) -> pd.DataFrame:
+        with instrumentation.timer('csv_read'):
+            self.df = self._df_fetcher(paths, engine, columns,
+                                       optional=(self.RANGE_COLUMNS
+                                                 if page_index else ()))
+        if page_index is not None:
+            with instrumentation.timer('page_index'):
+                self.df = self._range_indexer(page_index)
+        with instrumentation.timer('csv_clean'):
+            self.df = self._df_cleaner()
+        with instrumentation.timer('validate'):
+            self._range_validator(self._page_counter(paths))
+            self.df = self._key_indexer()
+        with instrumentation.timer('records'):
+            self.records = self._record_creator()
+        # Klassenstatistik einmal für alle Stufen und Worker
+        with instrumentation.timer('statistics'):
+            self.statistics = (ClassStatistics.from_frame(self.df)
+                               if self.records else None)
+        instrumentation.counter('students', len(self.records))
+        
+    def _df_fetcher(self, paths: Pathfinder, engine: str = 'c',
+                    columns: tuple = (), optional: tuple = ()) -> pd.DataFrame:
         """
-        Lädt die CSV-Datei in einen pandas DataFrame.
+        Lädt die benötigten Spalten der CSV-Datei in einen pandas DataFrame.
+        
+        Die Kopfzeile wird vorab gelesen, um die Nachnamenspalte zu finden
+        und fehlende Spalten klar zu melden. Danach liest pandas nur diese
+        Spalten mit festen Datentypen statt mit Typinferenz.
         
         Args:
             paths: Ein Pathfinder-Objekt mit dem Pfad zur CSV-Datei.
+            engine: Parser von pandas ('c', 'python' oder 'pyarrow').
+            columns: Zusätzliche Textspalten.
+            optional: Pflichtspalten, die fehlen dürfen.
             
         Returns:
-            DataFrame mit den rohen Notendaten.
+            DataFrame mit den rohen Notendaten; die Nachnamenspalte heißt
+            bereits ``Name``.
         """
-        df = pd.read_csv(paths.data,
-                         sep=';',
-                         encoding='utf-8')
+        with open(paths.data, newline='', encoding='utf-8-sig') as file:
+            header = next(csv.reader(file, delimiter=';'), [])
         
-        return df
+        # Standardisiere Spaltennamen (Nachname -> Name)
+        name_column = next((column for column in header
+                            if column.startswith('Nach') or column == 'Name'),
+                           None)
+        # Die Nachnamenspalte ist immer dabei, auch unter anderem Namen
+        extra = [column for column in columns
+                 if column not in self.COLUMNS
+                 and column not in ('Name', 'Nachname', name_column)]
+        missing = [column for column in (*self.COLUMNS, *extra)
+                   if column not in header and column not in optional]
+        if name_column is None:
+            missing.insert(0, 'Nachname')
+        if missing:
+            raise DataError(f'{paths.data}: es fehlen die Spalten '
+                            f'{", ".join(missing)}')
+        
+        dtype = {name_column: str, 'Vorname': str, 'Datum': str, 'Titel': str,
+                 'Total': 'float64', 'Note': 'float64',
+                 'First': 'float64', 'Last': 'float64'}
+        dtype.update(dict.fromkeys(extra, str))
+        dtype = {column: kind for column, kind in dtype.items()
+                 if column in header}
+        try:
+            df = pd.read_csv(paths.data,
+                             sep=';',
+                             encoding='utf-8',
+                             usecols=list(dtype),
+                             dtype=dtype,
+                             engine=engine)
+        except ImportError as error:
+            raise ConfigError(f'CSV-Parser {engine!r} ist nicht verfügbar: '
+                              f'{error}') from None
+        except ValueError as error:
+            raise DataError(f'{paths.data}: {error}') from None
+        
+        return df.rename(columns={name_column: 'Name'})
+        
+    def _range_indexer(self, page_index: ProofIndex) -> pd.DataFrame:
+        """
+        Ergänzt oder prüft die Seitenbereiche mit dem Seitenindex.
+        
+        Fehlen die Spalten ``First``/``Last`` oder einzelne Werte darin,
+        werden sie aus dem Index übernommen. Weichen vorhandene Werte vom
+        Index ab oder findet der Index einen Schüler nicht, bricht der
+        Lauf ab, bevor ein Stempel gerendert wird.
+        
+        Args:
+            page_index: Seitenindex der Korrekturfahne.
+            
+        Returns:
+            DataFrame mit vollständigen Spalten ``First`` und ``Last``.
+        """
+        df = self.df
+        named = df['Name'].notna() & df['Vorname'].notna()
+        rows = np.flatnonzero(named.to_numpy())
+        found = page_index.range_finder(
+            list(zip(df['Name'][named].tolist(),
+                     df['Vorname'][named].tolist())))
+        
+        first = (df['First'].to_numpy(dtype=float, copy=True)
+                 if 'First' in df else np.full(len(df), np.nan))
+        last = (df['Last'].to_numpy(dtype=float, copy=True)
+                if 'Last' in df else np.full(len(df), np.nan))
+        problems = []
+        for row, pages in zip(rows.tolist(), found):
+            if pages is None:
+                problems.append(f'{self._row_describer(df, row)}: nicht in '
+                                f'der Korrekturfahne gefunden')
+                continue
+            given = (first[row], last[row])
+            if not np.isnan(given).any() and given != pages:
+                problems.append(f'{self._row_describer(df, row)}: Seiten '
+                                f'{given[0]:g}-{given[1]:g} laut Tabelle, '
+                                f'{pages[0]}-{pages[1]} laut Fahne')
+                continue
+            first[row], last[row] = pages
+        if problems:
+            more = (f'\n... und {len(problems) - 10} weitere'
+                    if len(problems) > 10 else '')
+            raise DataError('Seitenindex und Notentabelle stimmen nicht '
+                            'überein:\n' + '\n'.join(problems[:10]) + more)
+        
+        return df.assign(First=first, Last=last)
         
     def _df_cleaner(self) -> pd.DataFrame:
         """
         Bereinigt und normalisiert den DataFrame.
         
-        Entfernt fehlende Werte, standardisiert Spaltennamen,
-        ersetzt Umlaute durch ASCII-Äquivalente und setzt den
-        Nachnamen als Index.
+        Entfernt Zeilen mit fehlenden Werten in den benötigten Spalten,
+        ersetzt Umlaute im Nachnamen durch ASCII-Äquivalente und wandelt
+        ganzzahlige Spalten in Ganzzahlen um.
         
         Returns:
             Bereinigter und normalisierter DataFrame.
         """
+        # Entferne Zeilen mit fehlenden Werten in den Pflichtspalten
+        df = self.df.dropna(subset=['Name', *self.COLUMNS])
+        
+        # Umlaute in allen Nachnamen auf einmal ersetzen statt Zeile für Zeile
+        names = '\n'.join(df['Name'].tolist())
+        if any(umlaut in names for umlaut in self.UMLAUTE):
+            for umlaut, ascii_text in self.UMLAUTE.items():
+                names = names.replace(umlaut, ascii_text)
+            df = df.assign(Name=pd.Series(names.split('\n'), index=df.index,
+                                          dtype=df['Name'].dtype))
+        
+        for column in ('First', 'Last'):
+            values = df[column].to_numpy()
+            fractional = values != np.floor(values)
+            if fractional.any():
+                row = int(np.flatnonzero(fractional)[0])
+                raise DataError(f'{self._row_describer(df, row)}: {column} '
+                                f'ist keine ganze Seitenzahl')
+            df[column] = values.astype('int64')
+        
+        # Punkte und Noten wie bisher als Ganzzahl, wenn alle ganzzahlig sind
+        for column in ('Total', 'Note'):
+            values = df[column].to_numpy()
+            if (values == np.floor(values)).all():
+                df[column] = values.astype('int64')
+        
+        return df
+    
+    def _row_describer(self, df: pd.DataFrame, row: int) -> str:
+        """
+        Beschreibt eine Zeile für Fehlermeldungen.
+        
+        Args:
+            df: DataFrame mit dem ursprünglichen Zeilenindex der CSV-Datei.
+            row: Position der Zeile im DataFrame.
+            
+        Returns:
+            Zeilennummer in der CSV-Datei und Name des Schülers.
+        """
+        # Zeile 1 ist die Kopfzeile
+        return f'Zeile {df.index[row] + 2} ({df["Name"].iat[row]})'
+    
+    def _page_counter(self, paths: Pathfinder) -> int:
+        """
+        Liest die Seitenzahl der Korrekturfahne.
+        
+        Args:
+            paths: Ein Pathfinder-Objekt mit dem Pfad zur Korrekturfahne.
+            
+        Returns:
+            Anzahl Seiten oder None, wenn keine Korrekturfahne angegeben ist.
+        """
+        if not paths.doc:
+            return None
+        
+        with pymupdf.open(paths.doc) as doc:
+            return doc.page_count
+    
+    def _range_validator(self, page_count: int = None) -> None:
+        """
+        Prüft die Seitenbereiche aller Schüler vor dem Stempeln.
+        
+        Jeder Bereich muss mit Seite 1 oder später beginnen, darf nicht
+        vor seinem Anfang enden und muss in der Korrekturfahne liegen;
+        zwei Schüler dürfen keine Seite teilen.
+        
+        Args:
+            page_count: Seitenzahl der Korrekturfahne oder None, um nur
+                Reihenfolge und Überschneidungen zu prüfen.
+        """
         df = self.df
+        firsts = df['First'].to_numpy()
+        lasts = df['Last'].to_numpy()
         
-        # Entferne Zeilen mit fehlenden Werten
-        df = df.dropna()
+        invalid = (firsts < 1) | (lasts < firsts)
+        if page_count is not None:
+            invalid |= lasts > page_count
+        if invalid.any():
+            row = int(np.flatnonzero(invalid)[0])
+            limit = '' if page_count is None else f' (Fahne: {page_count} Seiten)'
+            raise DataError(f'{self._row_describer(df, row)}: ungültiger '
+                            f'Seitenbereich {firsts[row]}-{lasts[row]}{limit}')
         
-        # Standardisiere Spaltennamen (Nachname -> Name)
-        df = df.rename(columns=lambda x: x.replace('Nachname', 'Name') 
-                       if x.startswith('Nach') else x)
+        # Nach Anfang sortiert darf kein Bereich vor dem Ende des vorigen beginnen
+        order = np.argsort(firsts, kind='stable')
+        overlaps = firsts[order][1:] <= lasts[order][:-1]
+        if overlaps.any():
+            position = int(np.flatnonzero(overlaps)[0])
+            row, previous = int(order[position + 1]), int(order[position])
+            raise DataError(f'{self._row_describer(df, row)}: Seiten '
+                            f'{firsts[row]}-{lasts[row]} überschneiden sich '
+                            f'mit {self._row_describer(df, previous)}: Seiten '
+                            f'{firsts[previous]}-{lasts[previous]}')
+    
+    def _key_indexer(self) -> pd.DataFrame:
+        """
+        Setzt den eindeutigen Schüler-Schlüssel als Index.
+        
+        Der Schlüssel benennt Ordner und Dateien; er ist der Nachname oder,
+        falls dieser mehrfach vorkommt, Nachname und Vorname (bei gleichem
+        Namen zusätzlich die erste Seite).
+        
+        Returns:
+            DataFrame mit eindeutigem Index ``Schluessel``.
+        """
+        df = self.df
+        keys = df['Name'].rename('Schluessel')
+        # Zusätze nur für mehrfach vorkommende Schlüssel bilden
+        for suffix in (df['Vorname'], df['First']):
+            repeated = keys.duplicated(keep=False)
+            if repeated.any():
+                keys = keys.copy()
+                keys[repeated] = (keys[repeated] + '_'
+                                  + suffix[repeated].astype(str))
+        
+        df = df.set_index(keys)
+        if not df.index.is_unique:
+            duplicates = df.index[df.index.duplicated()].unique().tolist()
+            raise DataError('Schüler-Schlüssel nicht eindeutig: '
+                            f'{", ".join(map(str, duplicates[:5]))}')
+        
+        return df
 
-        # Erstelle Mapping für Umlaute zu ASCII-Zeichen
-        umlaute_map = str.maketrans({
-            'ä': 'ae', 'ö': 'oe', 'ü': 'ue',
-            'Ä': 'Ae', 'Ö': 'Oe', 'Ü': 'Ue',
-        })
+    def _record_creator(self) -> tuple:
+        """
+        Erstellt die Schülerdatensätze in einem Durchgang über die Spalten.
+        
+        Statt einzelner ``df.loc``-Zugriffe pro Schüler und Spalte wird jede
+        Spalte einmal als Liste gelesen. Der Schlüssel ``key`` ist der Index
+        des DataFrames.
         
-        # Ersetze Umlaute in Nachnamen
-        df['Name'] = df['Name'].str.translate(umlaute_map)
+        Returns:
+            Tupel von StudentRecord in Reihenfolge der Notentabelle.
+        """
+        df = self.df
+        columns = zip(df['Name'].tolist(),
+                      df['Vorname'].tolist(),
+                      df['First'].tolist(),
+                      df['Last'].tolist(),
+                      df['Total'].tolist(),
+                      df['Note'].tolist(),
+                      df['Datum'].tolist(),
+                      df['Titel'].tolist(),
+                      df.index.tolist())
+        
+        return tuple(map(StudentRecord._make, columns))
 
-        # Setze Nachname als Index für schnellen Zugriff
-        df = df.set_index('Name')
 
-        return df
+def class_fingerprint(df: pd.DataFrame, statistics: ClassStatistics,
+                      renderer: str) -> list:
+    """
+    Erfasst alles, was den Stempel über den einzelnen Schüler hinaus bestimmt.
+    
+    Dazu gehören die Notenverteilung (Boxplot), alle Vornamen (der
+    breiteste Titel bestimmt den Zuschnitt) und der Renderer.
+    
+    Args:
+        df: Bereinigte Notendaten.
+        statistics: Notenstatistik der Klasse.
+        renderer: Darstellung des Stempels.
+        
+    Returns:
+        JSON-fähige Liste für Cache-Schlüssel und Fingerabdrücke.
+    """
+    # Leere Notentabelle: keine Statistik, nichts zu stempeln
+    notes = statistics.fingerprint() if statistics is not None else []
+    return [notes,
+            sorted(df['Vorname'].unique().tolist()),
+            renderer]
 
 
 class Stamper:
@@ -157,25 +500,89 @@ class Stamper:
     Erstellt und platziert Notenstempel auf PDF-Seiten.
     
     Diese Klasse generiert Boxplot-Visualisierungen mit individuellen Noten
-    und fügt sie als Stempel in das PDF-Dokument ein.
+    und fügt sie als Stempel in das PDF-Dokument ein. Der Stempel wird
+    als Rasterbild ('raster'), als PDF-Zeichenbefehle aus matplotlib
+    ('vector') oder direkt mit PyMuPDF ohne matplotlib ('native')
+    eingebettet.
     """
     
-    def __init__(self, paths: Pathfinder, data: DataHandler):
+    RENDERERS = ('raster', 'vector', 'native')
+    
+    # Layout des nativen Stempels in Punkten, wie matplotlibs Standard-Figure
+    NATIVE_FIGSIZE = (6.4 * 72, 4.8 * 72)
+    NATIVE_AXES = (0.125, 0.11, 0.9, 0.88)
+    BOX_COLORS = {
+        'green': (0, 0.5, 0),
+        'red': (1, 0, 0),
+        'orange': (1, 0.647, 0),
+    }
+    # Notenstempel: Breite und Wunschposition auf der Seite in Punkten
+    STAMP_WIDTH = 200
+    STAMP_ORIGIN = (400, 100)
+    # Aufgabenstempel: Schriftgröße und Höhe in Punkten
+    TASK_FONT_SIZE = 9
+    TASK_HEIGHT = 14
+    
+    def __init__(self, paths: Pathfinder, data: DataHandler,
+                 renderer: str = 'raster',
+                 instrumentation: Instrumentation = None,
+                 cache: StampCache = None, save_profile: str = 'balanced',
+                 layout: StampLayout = None,
+                 layout_index: LayoutIndex = None):
         """
         Initialisiert Stamper mit Pfaden und Notendaten.
         
         Args:
             paths: Ein Pathfinder-Objekt mit Dateipfaden.
             data: Ein DataHandler-Objekt mit den Notendaten.
+            renderer: Darstellung des Stempels ('raster', 'vector'
+                oder 'native').
+            instrumentation: Optionale Messung von Hintergrund, Rendern
+                und Einfügen.
+            cache: Optionaler Stempel-Cache; unveränderte Stempel und
+                Hintergründe werden daraus übernommen statt gerendert.
+            save_profile: Speicherprofil der gestempelten Gesamtfahne
+                ('fast', 'balanced' oder 'archive').
+            layout: Seiten und Platzierung der Stempel (Standard: nur der
+                Notenstempel an fester Stelle der ersten Seite).
+            layout_index: Raster belegter Zellen für die automatische
+                Platzierung; fehlt es, wird es beim ersten Stempel erstellt.
         """
+        if renderer not in self.RENDERERS:
+            raise ValueError(f'Unbekannter Renderer: {renderer!r} '
+                             f'(erlaubt: {", ".join(self.RENDERERS)})')
+        if save_profile not in SAVE_PROFILES:
+            raise ValueError(f'Unbekanntes Speicherprofil: {save_profile!r} '
+                             f'(erlaubt: {", ".join(SAVE_PROFILES)})')
+        
         self.df = data.df
-        self.doc = pymupdf.open(paths.doc)
+        self.records = data.records
+        self.statistics = data.statistics
+        self.doc_path = paths.doc
+        self.doc = pymupdf.open(self.doc_path)
+        self.renderer = renderer
+        self.instrumentation = instrumentation or Instrumentation()
+        self.cache = cache
+        self.save_profile = SAVE_PROFILES[save_profile]['stamped']
+        self.layout = layout or StampLayout()
+        self.layout.validate()
+        self.layout_index = layout_index
+        # Aufgabenstempel pro Schüler, einmal für alle berechnet
+        self._task_labels = self.layout.task_labels(self.df)
+        # Zwischenspeicher für den einmal gerenderten Klassenhintergrund
+        self._background = None
+        # Zuschnitt, Seitenverhältnis und Vorlage für das Einfügen
+        self._frame = None
+        self._fingerprint = None
+        # Seitenauszug mit einmal analysierten Ressourcen der Fahne
+        self._extractor = None
         
     def _stamp_background_creator(self) -> plt.Figure:
         """
         Erstellt den Hintergrund des Stempels mit einem Boxplot.
         
-        Erzeugt einen Boxplot der Klassenleistung mit farblicher Kodierung:
+        Erzeugt einen Boxplot der Klassenleistung mit farblicher Kodierung
+        nach ``ClassStatistics.box_color``:
         - Grün: Q1 > 4 (gute Leistung)
         - Rot: Q3 < 4 (schwache Leistung)
         - Orange: gemischte Leistung
@@ -186,27 +593,18 @@ class Stamper:
         # Erstelle Figure und Axes
         fig, ax = plt.subplots()
 
-        # Berechne Quartile für Farbauswahl
-        q1 = self.df['Note'].quantile(0.25)
-        q3 = self.df['Note'].quantile(0.75)
-
-        # Bestimme Farbe basierend auf Klassenleistung
-        if q1 > 4:
-            box_color = 'green'  # Sehr gute Klassenleistung
-        elif q3 < 4:
-            box_color = 'red'  # Schwache Klassenleistung
-        else:
-            box_color = 'orange'  # Durchschnittliche Leistung
+        # Farbe und Kennzahlen aus der einmal berechneten Klassenstatistik
+        box_color = self.statistics.box_color()
 
         # Erstelle horizontalen Boxplot
-        bplot = ax.boxplot(self.df['Note'], 
-                           vert=False, 
-                           patch_artist=True,
-                           medianprops={
-                               'color': 'red',
-                               'linewidth': 3,
-                               'linestyle': '-',
-                           })
+        bplot = ax.bxp([self.statistics.boxplot_stats()], 
+                       patch_artist=True,
+                       **horizontal_options(ax),
+                       medianprops={
+                           'color': 'red',
+                           'linewidth': 3,
+                           'linestyle': '-',
+                       })
         
         # Setze Farbe und Transparenz der Box
         bplot['boxes'][0].set_facecolor(box_color)
@@ -218,7 +616,12 @@ class Stamper:
         
         return fig
     
-    def _create_stamp(self, name: str, fig: plt.Figure) -> plt.Figure:
+    def _title_creator(self, vorname: str) -> str:
+        """Erstellt den personalisierten Titel des Stempels."""
+        return f'{vorname}s Note vor dem Hintergrund der Klassenleistung'
+    
+    def _create_stamp(self, student: StudentRecord,
+                      fig: plt.Figure) -> plt.Figure:
         """
         Erstellt einen individualisierten Stempel für einen Schüler.
         
@@ -226,20 +629,38 @@ class Stamper:
         und Note sowie einen personalisierten Titel hinzu.
         
         Args:
-            name: Nachname des Schülers.
+            student: Datensatz des Schülers.
             fig: Figure-Objekt mit dem Boxplot-Hintergrund.
             
         Returns:
             Vollständiges Figure-Objekt mit individualisiertem Stempel.
         """
+        self._stamp_overlay_creator(student, fig.axes[0])
+        
+        return fig
+    
+    def _stamp_overlay_creator(self, student: StudentRecord,
+                               ax: plt.Axes) -> list:
+        """
+        Zeichnet die schülerspezifischen Elemente des Stempels.
+        
+        Fügt die individuelle Note als Punkt, eine Tabelle mit Punkten
+        und Note sowie einen personalisierten Titel hinzu.
+        
+        Args:
+            student: Datensatz des Schülers.
+            ax: Axes-Objekt mit dem Boxplot-Hintergrund.
+            
+        Returns:
+            Liste der hinzugefügten Artists (Tabelle, Punkt, Titel).
+        """
         # Hole individuelle Notendaten
-        individuelle_note = self.df.loc[name, 'Note']
-        vorname = self.df.loc[name, 'Vorname']
-        ax = fig.axes[0]
+        individuelle_note = student.note
+        vorname = student.vorname
         
         # Extrahiere Werte für Tabelle
-        val_total = self.df.loc[name, 'Total']
-        val_note = self.df.loc[name, 'Note']
+        val_total = student.total
+        val_note = student.note
 
         # Definiere Tabelleninhalt
         cell_text = [
@@ -262,7 +683,7 @@ class Stamper:
         table.set_fontsize(12)
         
         # Markiere individuelle Note mit blauem Punkt
-        ax.scatter(
+        dot = ax.scatter(
             x=individuelle_note,
             y=1,
             color='blue',
@@ -272,67 +693,807 @@ class Stamper:
         )
         
         # Setze personalisierten Titel
-        ax.set_title(f'{vorname}s Note vor dem Hintergrund der Klassenleistung')
+        title = ax.set_title(self._title_creator(vorname))
         
-        return fig
+        return [table, dot, title]
+    
+    def _background_renderer(self, dpi: int = 300) -> dict:
+        """
+        Rendert den Klassenhintergrund einmalig und hält ihn im Speicher.
+        
+        Der Boxplot ist für alle Schüler identisch. Er wird deshalb nur
+        beim ersten Aufruf gezeichnet; danach werden Figure, Rasterbild
+        und Zuschnitt wiederverwendet. Der Zuschnitt entspricht
+        ``savefig(bbox_inches='tight')`` und berücksichtigt den breitesten
+        Titel der Klasse, damit alle Stempel denselben Rahmen haben.
+        
+        Args:
+            dpi: Auflösung des Rasterbildes.
+            
+        Returns:
+            Dictionary mit Figure, gespeicherter Hintergrundregion,
+            Zuschnitt, Seitenverhältnis der Figure und einer PDF-Vorlage
+            des Hintergrunds (Rasterbild oder Vektorgrafik je nach
+            Renderer). Der Zuschnitt liegt als ``Bbox`` in Pixeln
+            (Ursprung unten links, 'bbox') und als ``pymupdf.Rect``
+            (Ursprung oben links, 'clip') vor.
+        """
+        if self._background is None and self.renderer == 'native':
+            self._background = self._native_background_renderer()
+            
+        if self._background is None:
+            fig = self._stamp_background_creator()
+            fig.set_dpi(dpi)
+            ax = fig.axes[0]
+            # Rendere immer mit Agg, unabhängig vom aktiven Backend
+            canvas = backend_agg.FigureCanvasAgg(fig)
+            canvas.draw()
+            region = canvas.copy_from_bbox(fig.bbox)
+            renderer = canvas.get_renderer()
+            
+            # Bestimme Zuschnitt aus Hintergrund, Tabelle und allen Titeln
+            extents = [fig.get_tightbbox(renderer).transformed(
+                fig.dpi_scale_trans)]
+            table, dot, title = self._stamp_overlay_creator(
+                self.records[0], ax)
+            extents.append(table.get_window_extent(renderer))
+            for vorname in self.df['Vorname'].unique():
+                title.set_text(self._title_creator(vorname))
+                extents.append(title.get_window_extent(renderer))
+            table.remove()
+            dot.remove()
+            title.set_text('')
+            
+            # Polsterung wie pad_inches=0.1, begrenzt auf die Figure
+            clip = transforms.Bbox.union(extents).padded(0.1 * dpi)
+            clip = transforms.Bbox.intersection(clip, fig.bbox)
+            clip = transforms.Bbox.from_extents(
+                np.floor(clip.x0), np.floor(clip.y0),
+                np.ceil(clip.x1), np.ceil(clip.y1))
+            
+            if self.renderer == 'vector':
+                template = self._vector_template_creator(fig, clip)
+            else:
+                template = self._template_creator(
+                    self._pixmap_cutter(canvas, clip))
+            
+            width_in, height_in = fig.get_size_inches()
+            self._background = {
+                'fig': fig,
+                'region': region,
+                'bbox': clip,
+                'clip': self._rect_converter(clip, fig.bbox.height),
+                'aspect': height_in / width_in,
+                'template': template,
+            }
+            
+        return self._background
+    
+    def _rect_converter(self, bbox: transforms.Bbox,
+                        height: float) -> pymupdf.Rect:
+        """
+        Wandelt eine matplotlib-Bbox in ein Rechteck mit Ursprung oben links.
+        
+        Args:
+            bbox: Bereich in Pixeln (Ursprung unten links).
+            height: Höhe der Figure in Pixeln.
+            
+        Returns:
+            Derselbe Bereich als ``pymupdf.Rect``.
+        """
+        return pymupdf.Rect(bbox.x0, height - bbox.y1, bbox.x1, height - bbox.y0)
+    
+    def _template_creator(self, pixmap: pymupdf.Pixmap) -> pymupdf.Document:
+        """
+        Legt das Hintergrundbild als einseitige PDF-Vorlage im Speicher ab.
+        
+        PyMuPDF bettet Bilder unkomprimiert ein. Das Bild wird deshalb
+        einmal komprimiert; ``show_pdf_page`` übernimmt den komprimierten
+        Datenstrom danach unverändert in jedes Zieldokument.
+        
+        Args:
+            pixmap: Zugeschnittenes Hintergrundbild.
+            
+        Returns:
+            PDF-Dokument mit einer Seite in der Größe des Bildes.
+        """
+        template = pymupdf.open()
+        page = template.new_page(width=pixmap.width, height=pixmap.height)
+        xref = page.insert_image(page.rect, pixmap=pixmap)
+        template.update_stream(xref, template.xref_stream(xref), compress=True)
+        
+        return template
+    
+    def _vector_template_creator(self, fig: plt.Figure,
+                                 clip: transforms.Bbox) -> pymupdf.Document:
+        """
+        Speichert den Hintergrund als Vektor-PDF und blendet ihn danach aus.
+        
+        Anschließend bleiben in der Figure nur die schülerspezifischen
+        Elemente sichtbar, sodass jeder Stempel ein reines Overlay ist.
+        
+        Args:
+            fig: Figure mit dem gezeichneten Boxplot-Hintergrund.
+            clip: Zuschnitt in Pixeln.
+            
+        Returns:
+            PDF-Dokument mit einer Seite in der Größe des Zuschnitts.
+        """
+        template = self._vector_saver(fig, clip, transparent=False)
+        
+        # Blende alle Hintergrundelemente für die Overlays aus
+        ax = fig.axes[0]
+        for artist in [fig.patch, ax.patch, ax.xaxis, ax.yaxis,
+                       *ax.spines.values(), *ax.lines, *ax.patches]:
+            artist.set_visible(False)
+        
+        return template
+    
+    def _vector_saver(self, fig: plt.Figure, clip: transforms.Bbox,
+                      transparent: bool = True) -> pymupdf.Document:
+        """
+        Speichert den Zuschnitt der Figure als einseitiges PDF im Speicher.
+        
+        Args:
+            fig: Zu speichernde Figure.
+            clip: Zuschnitt in Pixeln.
+            transparent: Ohne weiße Hintergrundfläche speichern.
+            
+        Returns:
+            PDF-Dokument mit einer Seite in der Größe des Zuschnitts.
+        """
+        buf = io.BytesIO()
+        fig.savefig(buf, format='pdf', transparent=transparent,
+                    bbox_inches=clip.transformed(
+                        fig.dpi_scale_trans.inverted()))
+        
+        return pymupdf.open('pdf', buf.getvalue())
+    
+    def _pixmap_cutter(self, canvas: backend_agg.FigureCanvasAgg,
+                       bbox: transforms.Bbox) -> pymupdf.Pixmap:
+        """
+        Schneidet einen Bereich aus dem gerenderten Canvas aus.
+        
+        Args:
+            canvas: Agg-Canvas mit dem aktuellen Bild.
+            bbox: Auszuschneidender Bereich in Pixeln (Ursprung unten links).
+            
+        Returns:
+            Deckende RGB-Pixmap des Bereichs.
+        """
+        pixels = np.asarray(canvas.buffer_rgba())
+        height = pixels.shape[0]
+        
+        # Rechne in Bildzeilen um (Ursprung oben links)
+        x0, x1 = int(bbox.x0), int(bbox.x1)
+        y0, y1 = height - int(bbox.y1), height - int(bbox.y0)
+        rgb = np.ascontiguousarray(pixels[y0:y1, x0:x1, :3])
+        
+        return pymupdf.Pixmap(pymupdf.csRGB, x1 - x0, y1 - y0, rgb.tobytes(), 0)
+    
+    def _render_stamp(self, student: StudentRecord) -> list:
+        """
+        Rendert die schülerspezifischen Teile des Stempels.
+        
+        Auf den gecachten Hintergrund werden nur Tabelle, Punkt und Titel
+        gezeichnet. Statt des ganzen Bildes werden nur die Bereiche dieser
+        drei Elemente ausgeschnitten; sie enthalten den darunterliegenden
+        Hintergrund und ergeben zusammen mit ihm den vollständigen Stempel.
+        
+        Args:
+            student: Datensatz des Schülers.
+            
+        Returns:
+            Liste von Tupeln aus Bereich (Ursprung oben links) und Pixmap
+            bzw. einseitigem PDF-Dokument (Renderer 'vector' und 'native').
+        """
+        if self.renderer == 'vector':
+            return self._render_vector_stamp(student)
+        if self.renderer == 'native':
+            return self._render_native_stamp(student)
+        
+        background = self._background_renderer()
+        fig = background['fig']
+        clip = background['bbox']
+        canvas = fig.canvas
+        renderer = canvas.get_renderer()
+        ax = fig.axes[0]
+        
+        # Stelle den unveränderten Hintergrund wieder her
+        canvas.restore_region(background['region'])
+        
+        # Zeichne nur die schülerspezifischen Elemente
+        table, dot, title = self._stamp_overlay_creator(student, ax)
+        for artist in (table, dot, title):
+            fig.draw_artist(artist)
+        
+        # Scatter liefert keine Ausdehnung; berechne sie aus der Markergröße
+        center_x, center_y = ax.transData.transform(dot.get_offsets()[0])
+        radius = (np.sqrt(dot.get_sizes()[0]) / 2
+                  + dot.get_linewidths()[0]) * fig.dpi / 72
+        dot_bbox = transforms.Bbox.from_extents(
+            center_x - radius, center_y - radius,
+            center_x + radius, center_y + radius)
+        
+        # Schneide die Bereiche (mit Rand für Kantenglättung) aus
+        patches = []
+        for bbox in (table.get_window_extent(renderer),
+                     dot_bbox,
+                     title.get_window_extent(renderer)):
+            bbox = transforms.Bbox.intersection(bbox.padded(2), clip)
+            if bbox is None:
+                continue
+            bbox = transforms.Bbox.from_extents(
+                np.floor(bbox.x0), np.floor(bbox.y0),
+                np.ceil(bbox.x1), np.ceil(bbox.y1))
+            patches.append((self._rect_converter(bbox, fig.bbox.height),
+                            self._pixmap_cutter(canvas, bbox)))
+        
+        # Entferne Tabelle und Punkt, setze Titel zurück
+        table.remove()
+        dot.remove()
+        title.set_text('')
+        
+        return patches
+    
+    def _render_vector_stamp(self, student: StudentRecord) -> list:
+        """
+        Rendert die schülerspezifischen Teile des Stempels als Vektor-PDF.
+        
+        Die Hintergrundelemente sind ausgeblendet; das Ergebnis ist ein
+        transparentes Overlay mit demselben Zuschnitt wie der Hintergrund.
+        
+        Args:
+            student: Datensatz des Schülers.
+            
+        Returns:
+            Liste mit einem Tupel aus Zuschnitt und PDF-Dokument.
+        """
+        background = self._background_renderer()
+        fig = background['fig']
+        
+        table, dot, title = self._stamp_overlay_creator(student, fig.axes[0])
+        overlay = self._vector_saver(fig, background['bbox'])
+        
+        # Entferne Tabelle und Punkt, setze Titel zurück
+        table.remove()
+        dot.remove()
+        title.set_text('')
+        
+        return [(background['clip'], overlay)]
+    
+    def _tick_creator(self, low: float, high: float,
+                      max_ticks: int = 9) -> tuple:
+        """
+        Wählt runde Achsenmarken wie matplotlibs automatischer Locator.
+        
+        Args:
+            low: Untere Achsengrenze.
+            high: Obere Achsengrenze.
+            max_ticks: Höchstzahl Marken.
+            
+        Returns:
+            Tupel aus Markenwerten und Anzahl Nachkommastellen.
+        """
+        magnitude = 10 ** np.floor(np.log10((high - low) / max_ticks))
+        for factor in (1, 2, 2.5, 5, 10):
+            step = factor * magnitude
+            ticks = np.arange(np.ceil(low / step), np.floor(high / step) + 1) * step
+            if len(ticks) <= max_ticks:
+                break
+        decimals = len(f'{step:g}'.partition('.')[2])
+        
+        return ticks, decimals
+    
+    def _native_background_renderer(self) -> dict:
+        """
+        Zeichnet den Klassenhintergrund einmalig mit PyMuPDF.
+        
+        Achsen, Boxplot, Achsenmarken und Beschriftung werden mit
+        ``Shape``-Befehlen auf eine Vorlagenseite gezeichnet, die dasselbe
+        Layout wie matplotlibs Standard-Figure hat. Der Zuschnitt umfasst
+        auch den breitesten Titel der Klasse.
+        
+        Returns:
+            Dictionary wie ``_background_renderer`` (ohne Figure), ergänzt
+            um die Koordinatenabbildung 'to_x'/'to_y' und das Achsenrechteck.
+        """
+        stats = self.statistics
+        width, height = self.NATIVE_FIGSIZE
+        left, bottom, right, top = self.NATIVE_AXES
+        axes = pymupdf.Rect(left * width, (1 - top) * height,
+                            right * width, (1 - bottom) * height)
+        
+        # Datenbereich mit 5 % Rand wie bei matplotlib
+        low, high = stats.minimum, stats.maximum
+        if high == low:
+            low, high = low - 0.5, high + 0.5
+        margin = 0.05 * (high - low)
+        low, high = low - margin, high + margin
+        
+        def to_x(value: float) -> float:
+            return axes.x0 + (value - low) / (high - low) * axes.width
+        
+        def to_y(value: float) -> float:
+            # Boxplot an Position 1, y-Achse von 0.5 bis 1.5
+            return axes.y1 - (value - 0.5) * axes.height
+        
+        template = pymupdf.open()
+        page = template.new_page(width=width, height=height)
+        shape = page.new_shape()
+        
+        # Weiße Hintergrundfläche
+        shape.draw_rect(page.rect)
+        shape.finish(color=None, fill=(1, 1, 1), width=0)
+        
+        # Box (Breite 0.15) mit Transparenz wie im matplotlib-Stempel
+        box_color = self.BOX_COLORS[stats.box_color()]
+        shape.draw_rect(pymupdf.Rect(to_x(stats.q1), to_y(1.075),
+                                     to_x(stats.q3), to_y(0.925)))
+        shape.finish(color=(0, 0, 0), fill=box_color, width=1,
+                     fill_opacity=0.6, stroke_opacity=0.6)
+        
+        # Whisker und Endkappen
+        for start, end in ((stats.whisker_low, stats.q1),
+                           (stats.q3, stats.whisker_high)):
+            shape.draw_line((to_x(start), to_y(1)), (to_x(end), to_y(1)))
+        for value in (stats.whisker_low, stats.whisker_high):
+            shape.draw_line((to_x(value), to_y(0.9625)),
+                            (to_x(value), to_y(1.0375)))
+        shape.finish(color=(0, 0, 0), width=1)
+        
+        # Ausreißer als leere Kreise
+        for value in stats.fliers:
+            shape.draw_circle((to_x(value), to_y(1)), 3)
+        if len(stats.fliers):
+            shape.finish(color=(0, 0, 0), width=1)
+        
+        # Median
+        shape.draw_line((to_x(stats.median), to_y(1.075)),
+                        (to_x(stats.median), to_y(0.925)))
+        shape.finish(color=(1, 0, 0), width=3)
+        
+        # Achsenrahmen und Achsenmarken
+        shape.draw_rect(axes)
+        ticks, decimals = self._tick_creator(low, high)
+        for tick in ticks:
+            shape.draw_line((to_x(tick), axes.y1), (to_x(tick), axes.y1 + 3.5))
+        shape.finish(color=(0, 0, 0), width=0.8)
+        shape.commit()
+        
+        # Beschriftung der Achsenmarken und der Achse
+        for tick in ticks:
+            self._native_text_writer(page, f'{tick:.{decimals}f}',
+                                     to_x(tick), axes.y1 + 7 + 10, 10)
+        self._native_text_writer(page, 'Note', axes.x0 + axes.width / 2,
+                                 axes.y1 + 7 + 10 + 4 + 10, 10)
+        
+        # Zuschnitt aus Achsen, Beschriftung und breitestem Titel
+        title_width = max(pymupdf.get_text_length(self._title_creator(vorname),
+                                                  fontsize=12)
+                          for vorname in self.df['Vorname'].unique())
+        center = axes.x0 + axes.width / 2
+        clip = pymupdf.Rect(min(axes.x0 - 10, center - title_width / 2),
+                            axes.y0 - 6 - 12 * 1.2,
+                            max(axes.x1 + 10, center + title_width / 2),
+                            axes.y1 + 7 + 10 + 4 + 10 + 3) + (-7.2, -7.2, 7.2, 7.2)
+        clip &= page.rect
+        page.set_cropbox(clip)
+        
+        return {
+            'clip': clip,
+            'aspect': height / width,
+            'template': template,
+            'axes': axes,
+            'to_x': to_x,
+            'to_y': to_y,
+        }
+    
+    def _native_text_writer(self, page: pymupdf.Page, text: str, x: float,
+                            baseline: float, fontsize: float,
+                            align: str = 'center') -> None:
+        """
+        Schreibt Text mit Helvetica an eine Grundlinie.
+        
+        Args:
+            page: Zielseite.
+            text: Zu schreibender Text.
+            x: Horizontale Position (Mitte oder linker Rand).
+            baseline: Vertikale Position der Grundlinie.
+            fontsize: Schriftgröße in Punkten.
+            align: 'center' oder 'left'.
+        """
+        if align == 'center':
+            x -= pymupdf.get_text_length(text, fontsize=fontsize) / 2
+        page.insert_text((x, baseline), text, fontsize=fontsize,
+                         fontname='helv', color=(0, 0, 0))
+    
+    def _render_native_stamp(self, student: StudentRecord) -> list:
+        """
+        Zeichnet die schülerspezifischen Teile des Stempels mit PyMuPDF.
+        
+        Tabelle, Punkt und Titel werden auf eine transparente Seite mit
+        demselben Zuschnitt wie die Hintergrundvorlage gezeichnet.
+        
+        Args:
+            student: Datensatz des Schülers.
+            
+        Returns:
+            Liste mit einem Tupel aus Zuschnitt und PDF-Dokument.
+        """
+        background = self._background_renderer()
+        axes = background['axes']
+        width, height = self.NATIVE_FIGSIZE
+        
+        # Hole individuelle Notendaten
+        note = student.note
+        vorname = student.vorname
+        total = student.total
+        
+        overlay = pymupdf.open()
+        page = overlay.new_page(width=width, height=height)
+        
+        # Markiere individuelle Note mit blauem Punkt (s=75 -> Ø 8.7 pt)
+        shape = page.new_shape()
+        shape.draw_circle((background['to_x'](note), background['to_y'](1)),
+                          np.sqrt(75) / 2)
+        shape.finish(color=(0, 0, 1), fill=(0, 0, 1), width=0)
+        shape.commit()
+        
+        # Tabelle oben in der Mitte: zwei Spalten à 20 % der Achsenbreite
+        cell_width = 0.2 * axes.width
+        table_x = axes.x0 + axes.width / 2 - cell_width
+        row_top = axes.y0 + 0.02 * axes.height
+        for label, value in (('Punkte', total), ('Note', note)):
+            baseline = row_top + 12 + 12 * 0.35
+            for column, text in enumerate((label, f'{value}')):
+                self._native_text_writer(
+                    page, text, table_x + (column + 0.1) * cell_width,
+                    baseline, 12, align='left')
+            row_top += 2 * 12
+        
+        # Setze personalisierten Titel
+        self._native_text_writer(page, self._title_creator(vorname),
+                                 axes.x0 + axes.width / 2, axes.y0 - 6 - 3, 12)
+        
+        page.set_cropbox(background['clip'])
+        
+        return [(background['clip'], overlay)]
     
-    def _apply_stamp(self, page_number: int, fig: plt.Figure) -> None:
+    def _apply_stamp(self, page_number: int, patches: list,
+                     doc: pymupdf.Document = None,
+                     origin: tuple = None) -> None:
         """
         Fügt den Stempel auf einer bestimmten PDF-Seite ein.
         
+        Der Hintergrund wird aus der PDF-Vorlage übernommen; PyMuPDF
+        bettet ihn pro Zieldokument nur einmal ein. Darüber werden die
+        schülerspezifischen Bildausschnitte oder Vektor-Overlays gelegt.
+        
         Args:
             page_number: Seitennummer (0-basiert) für den Stempel.
-            fig: Figure-Objekt mit dem vollständigen Stempel.
+            patches: Bildausschnitte bzw. Overlays aus ``_render_stamp``.
+            doc: Zieldokument (Standard: die geöffnete Korrekturfahne).
+            origin: Linke obere Ecke des Stempels in Punkten (Standard:
+                ``STAMP_ORIGIN``).
         """
-        doc = self.doc
-        buf = io.BytesIO()
+        if doc is None:
+            doc = self.doc
+        background = self._frame_loader()
+        clip = background['clip']
         
-        # Berechne Seitenverhältnis für korrekte Skalierung
-        width_in, height_in = fig.get_size_inches()
-        aspect_ratio = height_in / width_in
+        # Seitenverhältnis der ganzen Figure für korrekte Skalierung
+        aspect_ratio = background['aspect']
         
         # Definiere Stempelgröße und Position
-        stamp_width = 200 
+        stamp_width = self.STAMP_WIDTH
         stamp_height = stamp_width * aspect_ratio
         
-        x_start = 400
-        y_start = 100
-        position_rect = pymupdf.Rect(x_start, y_start, 
-                                     x_start + stamp_width, 
-                                     y_start + stamp_height)
+        x_start, y_start = origin or self.STAMP_ORIGIN
+        
+        # Zentriere das zugeschnittene Bild im Stempelbereich
+        scale = min(stamp_width / clip.width, stamp_height / clip.height)
+        x_origin = x_start + (stamp_width - clip.width * scale) / 2
+        y_origin = y_start + (stamp_height - clip.height * scale) / 2
         
-        # Speichere Figure als PNG in Buffer
-        fig.savefig(buf, format="png", bbox_inches='tight', dpi=300)
-        buf.seek(0)
+        def to_page(rect: pymupdf.Rect) -> pymupdf.Rect:
+            # Stempelkoordinaten -> PDF-Punkte auf der Seite
+            return pymupdf.Rect(x_origin + (rect.x0 - clip.x0) * scale,
+                                y_origin + (rect.y0 - clip.y0) * scale,
+                                x_origin + (rect.x1 - clip.x0) * scale,
+                                y_origin + (rect.y1 - clip.y0) * scale)
         
-        # Füge Bild auf PDF-Seite ein
+        # Füge Hintergrund aus der Vorlage ein
         page = doc[page_number]
-        page.insert_image(position_rect, stream=buf)
+        page.show_pdf_page(to_page(clip), background['template'], 0)
+        
+        # Lege schülerspezifische Ausschnitte darüber
+        for bbox, layer in patches:
+            if isinstance(layer, pymupdf.Document):
+                page.show_pdf_page(to_page(bbox), layer, 0)
+            else:
+                page.insert_image(to_page(bbox), pixmap=layer)
         
-        buf.close()
+    def _stamp_loader(self, student: StudentRecord) -> list:
+        """
+        Rendert den Stempel eines Schülers oder holt ihn aus dem Cache.
+        
+        Beim ersten Schüler wird zuerst der Klassenhintergrund gerendert
+        bzw. geladen.
+        
+        Args:
+            student: Datensatz des Schülers.
+        
+        Returns:
+            Bildausschnitte bzw. Overlays für ``_stamp_applier``.
+        """
+        timer = self.instrumentation.timer
+        # Rendere bzw. lade den Klassenhintergrund beim ersten Schüler
+        if self._frame is None:
+            with timer('background'):
+                self._frame_loader()
+        # Rendere individualisierten Stempel auf gecachten Hintergrund
+        if self.cache is None:
+            with timer('render', student.key):
+                return self._render_stamp(student)
+        
+        return self._cached_stamp_loader(student)
+    
+    def _stamp_applier(self, student: StudentRecord, stamp: list,
+                       doc: pymupdf.Document = None,
+                       page_number: int = None) -> None:
+        """
+        Stempelt die Seiten eines Schülers nach dem Layout.
+        
+        Der Notenstempel steht auf der ersten oder letzten Seite, die
+        Aufgabenstempel auf ihren Seiten. Die Positionen stammen aus dem
+        ``StampPlacer`` des Schülers.
+        
+        Args:
+            student: Datensatz des Schülers.
+            stamp: Stempel aus ``_stamp_loader``.
+            doc: Zieldokument (Standard: die geöffnete Korrekturfahne).
+            page_number: Seitennummer (0-basiert) der ersten Seite des
+                Schülers im Zieldokument (Standard: erste Seite des
+                Schülers in der Korrekturfahne).
+        """
+        # Hole Seitennummer (1-basiert -> 0-basiert)
+        if page_number is None:
+            page_number = student.first - 1
+        if doc is None:
+            doc = self.doc
+        # Füge Stempel ein
+        with self.instrumentation.timer('apply', student.key):
+            placer = self._placer_creator(student)
+            offset = self.layout.summary_offset(student)
+            page = doc[page_number + offset]
+            size = (self.STAMP_WIDTH, self.STAMP_WIDTH * self._frame['aspect'])
+            origin = placer.place(offset, size, self.STAMP_ORIGIN,
+                                  (page.rect.width, page.rect.height))
+            self._apply_stamp(page_number + offset, stamp, doc, origin)
+            for offset, text in self._task_labels.get(student.key, ()):
+                self._task_writer(doc[page_number + offset], offset, text,
+                                  placer)
+        self.instrumentation.counter('stamps')
+        if placer.overlaps:
+            self.instrumentation.counter('layout_overlaps', placer.overlaps)
+        # Schließe Vektor-Overlays, sie werden nicht wiederverwendet
+        for _, layer in stamp:
+            if isinstance(layer, pymupdf.Document):
+                layer.close()
         
-    def printing_press(self) -> None:
+    def _placer_creator(self, student: StudentRecord) -> StampPlacer:
+        """
+        Erstellt die Platzierung der Stempel eines Schülers.
+        
+        Bei automatischer Platzierung stammen die belegten Zellen aus dem
+        Layout-Index der Korrekturfahne; er wird bei Bedarf einmal für
+        alle Stempelseiten der Klasse erstellt.
+        
+        Args:
+            student: Datensatz des Schülers.
+            
+        Returns:
+            StampPlacer des Schülers.
+        """
+        if self.layout.placement == 'fixed':
+            return StampPlacer()
+        if self.layout_index is None:
+            pages = self.layout.pages(self.records, self._task_labels)
+            self.layout_index = LayoutIndex(self.doc_path, pages,
+                                            instrumentation=self.instrumentation)
+        
+        return StampPlacer(lambda offset: self.layout_index.grid(
+            student.first - 1 + offset))
+    
+    def _task_writer(self, page: pymupdf.Page, offset: int, text: str,
+                     placer: StampPlacer) -> None:
+        """
+        Schreibt einen Aufgabenstempel, z. B. ``'A1: 4'``.
+        
+        Args:
+            page: Seite im Zieldokument.
+            offset: Seite des Schülers (0-basiert).
+            text: Beschriftung.
+            placer: Platzierung der Stempel des Schülers.
+        """
+        width = pymupdf.get_text_length(text, fontname='helv',
+                                        fontsize=self.TASK_FONT_SIZE) + 8
+        height = self.TASK_HEIGHT
+        page_size = (page.rect.width, page.rect.height)
+        x, y = placer.place(offset, (width, height),
+                            (page_size[0] - width - 18, 18), page_size)
+        
+        shape = page.new_shape()
+        shape.draw_rect(pymupdf.Rect(x, y, x + width, y + height))
+        shape.finish(color=(0.4, 0.4, 0.4), fill=(1, 1, 1), width=0.5)
+        shape.insert_text((x + 4, y + height - 4), text, fontname='helv',
+                          fontsize=self.TASK_FONT_SIZE, color=(0.8, 0, 0))
+        shape.commit()
+        
+    def _class_fingerprint(self) -> list:
+        """Fingerabdruck der Klasse, einmal pro Stamper berechnet."""
+        if self._fingerprint is None:
+            self._fingerprint = class_fingerprint(self.df, self.statistics,
+                                                  self.renderer)
+        
+        return self._fingerprint
+    
+    def _frame_loader(self) -> dict:
+        """
+        Liefert Zuschnitt, Seitenverhältnis und Vorlage des Hintergrunds.
+        
+        Ohne Cache ist das der gerenderte Hintergrund. Mit Cache wird die
+        Vorlage immer aus dem Cache-Eintrag geöffnet, beim ersten Lauf
+        nach dem Rendern; so sind die Ausgaben mit und ohne Treffer
+        identisch.
+        
+        Returns:
+            Dictionary mit 'clip', 'aspect' und 'template'.
+        """
+        if self._frame is None and self.cache is None:
+            self._frame = self._background_renderer()
+            
+        if self._frame is None:
+            key = self.cache.key_creator('background',
+                                         self._class_fingerprint())
+            data = self.cache.load(key)
+            if data is None:
+                data = self._frame_serializer(self._background_renderer())
+                self.cache.store(key, data)
+            
+            template = pymupdf.open('pdf', data)
+            frame = json.loads(template.metadata['keywords'])
+            self._frame = {
+                'clip': pymupdf.Rect(frame['clip']),
+                'aspect': frame['aspect'],
+                'template': template,
+            }
+            
+        return self._frame
+    
+    def _frame_serializer(self, background: dict) -> bytes:
+        """
+        Speichert die Hintergrundvorlage samt Zuschnitt als PDF.
+        
+        Args:
+            background: Hintergrund aus ``_background_renderer``.
+            
+        Returns:
+            PDF-Inhalt; Zuschnitt und Seitenverhältnis stehen als JSON
+            in den Schlüsselwörtern der Metadaten.
+        """
+        template = background['template']
+        template.set_metadata({'keywords': json.dumps({
+            'clip': list(background['clip']),
+            'aspect': background['aspect'],
+        })})
+        
+        return template.tobytes(deflate=True, no_new_id=True)
+    
+    def _cached_stamp_loader(self, student: StudentRecord) -> list:
+        """
+        Holt den Stempel eines Schülers aus dem Cache oder rendert ihn.
+        
+        Beim Fehlschlag werden die Ebenen aus ``_render_stamp`` auf eine
+        Seite in der Größe des Zuschnitts gelegt und so gespeichert.
+        
+        Args:
+            student: Datensatz des Schülers.
+            
+        Returns:
+            Liste mit einem Tupel aus Zuschnitt und PDF-Dokument.
+        """
+        clip = self._frame_loader()['clip']
+        key = self.cache.key_creator('stamp', self._class_fingerprint(),
+                                     student.note, student.total,
+                                     student.vorname)
+        data = self.cache.load(key)
+        
+        if data is None:
+            self.instrumentation.counter('cache_misses')
+            with self.instrumentation.timer('render', student.key):
+                layers = self._render_stamp(student)
+                stamp = pymupdf.open()
+                page = stamp.new_page(width=clip.width, height=clip.height)
+                for rect, layer in layers:
+                    target = rect - (clip.x0, clip.y0, clip.x0, clip.y0)
+                    if isinstance(layer, pymupdf.Document):
+                        page.show_pdf_page(target, layer, 0)
+                        layer.close()
+                    else:
+                        page.insert_image(target, pixmap=layer)
+                data = stamp.tobytes(garbage=3, deflate=True, no_new_id=True)
+                stamp.close()
+            self.cache.store(key, data)
+        else:
+            self.instrumentation.counter('cache_hits')
+        
+        return [(clip, pymupdf.open('pdf', data))]
+    
+    def _background_closer(self) -> None:
+        """Schließt die gecachte Hintergrund-Figure und gibt Speicher frei."""
+        if self._frame is not None and self._frame is not self._background:
+            self._frame['template'].close()
+        self._frame = None
+        if self._background is not None:
+            if 'fig' in self._background:
+                plt.close(self._background['fig'])
+            self._background['template'].close()
+            self._background = None
+        
+    def _extractor_loader(self) -> PageRangeExtractor:
+        """Liefert den Seitenauszug der geöffneten Korrekturfahne."""
+        if self._extractor is None:
+            self._extractor = PageRangeExtractor(self.doc)
+        
+        return self._extractor
+    
+    def _source_releaser(self) -> None:
+        """
+        Gibt die zwischengespeicherten Objekte der Korrekturfahne frei.
+        
+        PyMuPDF behält jedes einmal gelesene Objekt bis zum Schließen des
+        Dokuments. Die Fahne wird deshalb geschlossen, der globale
+        Ressourcen-Speicher geleert und die Fahne neu geöffnet; dabei
+        wird nur die Querverweistabelle erneut gelesen.
+        """
+        with self.instrumentation.timer('release'):
+            self.doc.close()
+            pymupdf.TOOLS.store_shrink(100)
+            self.doc = pymupdf.open(self.doc_path)
+            self._extractor = None
+        self.instrumentation.counter('source_releases')
+        
+    def printing_press(self, report: ClassReport = None) -> None:
         """
         Verarbeitet alle Schüler und fügt Stempel in das PDF ein.
         
-        Iteriert durch alle Schüler im DataFrame, erstellt individuelle
-        Stempel und speichert das gestempelte PDF.
+        Führt für alle Schüler die Stufen 'render' und 'compose' in der
+        Fahne aus und speichert das gestempelte PDF als Zwischenstand auf
+        der Festplatte; ``FileManager.file_distributor`` teilt es danach
+        auf. Der Klassenhintergrund wird dabei nur einmal gerendert.
+        
+        Args:
+            report: Optionaler Klassenbericht; er übernimmt den bereits
+                gerenderten Hintergrund als Verteilungsgrafik.
         """
+        stages = stage_creator(('render', 'compose'), self)
+        
         # Iteriere durch alle Schüler
-        for name in self.df.index:
-            # Erstelle frischen Hintergrund für jeden Stempel
-            fresh_fig = self._stamp_background_creator()
-            # Erstelle individualisierten Stempel
-            stamp = self._create_stamp(name, fresh_fig)
-            # Hole Seitennummer (1-basiert -> 0-basiert)
-            page_number = int(self.df.loc[name, 'First']) - 1
-            # Füge Stempel ein
-            self._apply_stamp(page_number, stamp)
-            # Schließe Figure um Speicher freizugeben
-            plt.close(stamp)
-        
-        # Speichere gestempeltes PDF mit Kompression
-        self.doc.save('./data/fahne_gestempelt.pdf', garbage=4, deflate=True)
+        for student in self.records:
+            student_runner(stages, student, self._extractor_loader())
+        
+        if report is not None:
+            report.writer(self._frame_loader())
+        
+        # Schließe Figure um Speicher freizugeben
+        self._background_closer()
+        
+        # Speichere gestempeltes PDF; es wird nach dem Aufteilen gelöscht
+        with self.instrumentation.timer('save_stamped'):
+            self.doc.save('./data/fahne_gestempelt.pdf',
+                          **self.save_profile.options())
 
 
 class FileManager:
@@ -343,27 +1504,51 @@ class FileManager:
     extrahiert die entsprechenden Seiten aus dem gestempelten PDF.
     """
     
-    def __init__(self, paths: Pathfinder, df: DataHandler) -> None:
+    def __init__(self, paths: Pathfinder, df: DataHandler,
+                 instrumentation: Instrumentation = None,
+                 writer: OutputWriter = None,
+                 save_profile: str = 'balanced',
+                 protection: Protection = None,
+                 journal: RunJournal = None) -> None:
         """
         Initialisiert FileManager mit Pfaden und Daten.
         
         Args:
             paths: Ein Pathfinder-Objekt mit Dateipfaden.
             df: Ein DataHandler-Objekt mit den Notendaten.
+            instrumentation: Optionale Messung von Aufteilen und Speichern.
+            writer: Optionaler Hintergrund-Schreiber; ohne ihn wird jede
+                Datei sofort geschrieben.
+            save_profile: Speicherprofil der Schülerdateien ('fast',
+                'balanced' oder 'archive').
+            protection: Optionale Passwörter und Metadaten der
+                Schülerdateien; die Vorlagen werden hier für alle Schüler
+                ausgefüllt und geprüft.
+            journal: Optionales Journal, in dem jede fertig geschriebene
+                Datei festgehalten wird.
         """
         self.path = paths.destination_folder
         self.df = df.df
+        self.records = df.records
+        self.instrumentation = instrumentation or Instrumentation()
+        self.writer = writer
+        self.save_profile = SAVE_PROFILES[save_profile]['output']
+        # Metadaten und Verschlüsselung pro Schüler-Schlüssel
+        self.protection = ({} if protection is None
+                           else protection.student_options(self.df))
+        self.journal = journal
         
     def folder_creator(self) -> None:
         """
         Erstellt für jeden Schüler einen eigenen Ordner.
         
-        Die Ordner werden nach dem Nachnamen des Schülers benannt.
-        Existierende Ordner werden nicht überschrieben.
+        Die Ordner werden nach dem Nachnamen des Schülers benannt (bei
+        gleichen Nachnamen ergänzt um den Vornamen). Existierende Ordner
+        werden nicht überschrieben.
         """
-        for name in self.df.index:
+        for student in self.records:
             # Erstelle Pfad mit Schülername
-            path = Path(self.path) / name
+            path = Path(self.path) / student.key
             # Erstelle Ordner (inkl. übergeordnete Ordner falls nötig)
             Path(path).mkdir(parents=True, exist_ok=True)
             
@@ -371,34 +1556,19 @@ class FileManager:
         """
         Verteilt gestempelte Seiten in individuelle PDF-Dateien.
         
-        Extrahiert für jeden Schüler die entsprechenden Seiten aus dem
-        gestempelten PDF und speichert sie mit aussagekräftigem Dateinamen
-        im jeweiligen Schülerordner. Löscht anschließend das temporäre
-        gestempelte PDF.
+        Führt für jeden Schüler die Stufen 'split' und 'write' auf dem
+        gestempelten PDF von ``Stamper.printing_press`` aus und speichert
+        die Seiten mit aussagekräftigem Dateinamen im jeweiligen
+        Schülerordner. Löscht anschließend das temporäre gestempelte PDF.
         """
         # Öffne gestempeltes Quelldokument
         src_doc = pymupdf.open('./data/fahne_gestempelt.pdf')
+        extractor = PageRangeExtractor(src_doc)
+        stages = stage_creator(('split', 'write'), file_manager=self)
         
         # Iteriere durch alle Schüler
-        for name in self.df.index:
-            # Extrahiere Metadaten für Dateinamen
-            date = str(self.df.loc[name, 'Datum'])
-            title = str(self.df.loc[name, 'Titel'])
-            file_title = f'{date}_{name}_{title}.pdf'
-            
-            # Bestimme Seitenbereich (1-basiert -> 0-basiert)
-            start_page = int(self.df.loc[name, 'First']) - 1
-            end_page = int(self.df.loc[name, 'Last']) - 1
-            
-            # Erstelle Zielpfad
-            path = Path(self.path) / name / file_title
-            
-            # Erstelle neues PDF-Dokument
-            new_doc = pymupdf.open()
-            # Füge relevante Seiten ein
-            new_doc.insert_pdf(src_doc, from_page=start_page, to_page=end_page)
-            # Speichere individuelles PDF
-            new_doc.save(path)
+        for student in self.records:
+            student_runner(stages, student, extractor)
         
         # Schließe Quelldokument
         src_doc.close()
@@ -406,6 +1576,532 @@ class FileManager:
         # Lösche temporäres gestempeltes PDF
         pdf_path = Path('./data/fahne_gestempelt.pdf')
         pdf_path.unlink(missing_ok=True)
+        
+    def stamp_distributor(self, stamper: Stamper) -> None:
+        """
+        Stempelt und verteilt alle Schüler in einem Durchgang.
+        
+        Jede Ausgabedatei wird mit den Stufen von 'split_first' direkt
+        aus den Originalseiten der Korrekturfahne und dem Stempel des
+        Schülers aufgebaut. Das gestempelte Gesamtdokument wird nie
+        geschrieben; Speicher- und Plattenbedarf sind durch die größte
+        einzelne Prüfung begrenzt.
+        
+        Args:
+            stamper: Ein Stamper-Objekt mit geöffneter Korrekturfahne.
+        """
+        stages = stage_creator(STAGE_ORDERS['split_first'], stamper, self)
+        for student in self.records:
+            student_runner(stages, student, stamper._extractor_loader())
+        
+        # Schließe Figure um Speicher freizugeben
+        stamper._background_closer()
+        
+    def _path_creator(self, student: StudentRecord) -> Path:
+        """
+        Bestimmt den Pfad der Ausgabedatei eines Schülers.
+        
+        Args:
+            student: Datensatz des Schülers.
+            
+        Returns:
+            ``<Ziel>/<Schlüssel>/<Datum>_<Schlüssel>_<Titel>.pdf``.
+        """
+        # Extrahiere Metadaten für Dateinamen
+        file_title = f'{student.datum}_{student.key}_{student.titel}.pdf'
+        
+        return Path(self.path) / student.key / file_title
+    
+    def _page_extractor(self, extractor: PageRangeExtractor,
+                        student: StudentRecord) -> pymupdf.Document:
+        """
+        Übernimmt die Seiten eines Schülers in ein neues Dokument.
+        
+        Args:
+            extractor: Seitenauszug des Quelldokuments.
+            student: Datensatz des Schülers.
+        
+        Returns:
+            Neues Dokument mit nur den verwendeten Ressourcen.
+        """
+        with self.instrumentation.timer('split', student.key):
+            return extractor.extract(student.first, student.last)
+    
+    def _doc_writer(self, doc: pymupdf.Document,
+                    student: StudentRecord) -> Path:
+        """
+        Schreibt das Dokument eines Schülers in seine PDF-Datei.
+        
+        Die Datei wird nach dem Speicherprofil und ohne neue Dokument-ID
+        gespeichert, damit gleiche Eingaben unabhängig von der Reihenfolge
+        byte-identische Dateien ergeben. Metadaten und Verschlüsselung
+        werden beim selben Speichern angewendet. Geschrieben wird atomar,
+        mit Hintergrund-Schreiber erst nach dessen ``flush`` vollständig.
+        Das Dokument wird danach geschlossen.
+        
+        Args:
+            doc: Fertig gestempeltes Dokument des Schülers.
+            student: Datensatz des Schülers.
+        
+        Returns:
+            Pfad der geschriebenen Datei.
+        """
+        # Erstelle Zielpfad
+        path = self._path_creator(student)
+        
+        timer = self.instrumentation.timer
+        # Erzeuge individuelles PDF im Speicher, ggf. verschlüsselt
+        metadata, protection = self.protection.get(student.key, ({}, {}))
+        with timer('save', student.key):
+            if metadata:
+                doc.set_metadata(metadata)
+            data = doc.tobytes(no_new_id=True,
+                               **self.save_profile.options(),
+                               **protection)
+        self.instrumentation.counter('pages', len(doc))
+        doc.close()
+        
+        # Schreibe sofort oder überlasse es dem Hintergrund-Schreiber;
+        # ins Journal kommt die Datei erst unter ihrem endgültigen Namen
+        done = self.journal.record if self.journal is not None else None
+        if self.writer is None:
+            with timer('write', student.key):
+                atomic_writer(path, data)
+                if done is not None:
+                    done(path, student.key)
+        else:
+            self.writer.submit(path, data, student.key, done)
+        
+        self.instrumentation.counter('files')
+        self.instrumentation.counter('bytes_written', len(data))
+        
+        return path
+
+
+# Zustand eines Worker-Prozesses (wird einmal pro Prozess aufgebaut)
+_worker_state = {}
+
+
+def _press_initializer(paths: Pathfinder, data: DataHandler,
+                       renderer: str = 'raster',
+                       instrumentation: Instrumentation = None,
+                       cache: StampCache = None,
+                       ceiling: MemoryCeiling = None,
+                       write_concurrency: int = 1,
+                       save_profile: str = 'balanced',
+                       protection: Protection = None,
+                       layout: StampLayout = None,
+                       layout_index: LayoutIndex = None,
+                       journal: RunJournal = None,
+                       order: str = 'split_first',
+                       stages: dict = None) -> None:
+    """
+    Bereitet einen Worker-Prozess vor.
+    
+    Jeder Worker öffnet die Korrekturfahne selbst und behält seinen
+    Stamper über alle Arbeitspakete, damit der Klassenhintergrund pro
+    Prozess nur einmal gerendert wird. Die Stufen pro Schüler werden
+    einmal in der Reihenfolge des Plans aufgebaut.
+    
+    Args:
+        paths: Ein Pathfinder-Objekt mit Dateipfaden.
+        data: Ein DataHandler-Objekt mit den Notendaten.
+        renderer: Darstellung des Stempels ('raster', 'vector' oder 'native').
+        instrumentation: Messung des Workers (Standard: eine neue).
+        cache: Optionaler Stempel-Cache.
+        ceiling: Optionale Speicherobergrenze für den Streaming-Modus.
+        write_concurrency: Anzahl Schreib-Threads; 0 schreibt jede Datei
+            sofort im Worker.
+        save_profile: Speicherprofil der Schülerdateien.
+        protection: Optionale Passwörter und Metadaten der Schülerdateien.
+        layout: Seiten und Platzierung der Stempel.
+        layout_index: Raster belegter Zellen für die automatische
+            Platzierung.
+        journal: Optionales Journal der fertig geschriebenen Dateien.
+        order: 'split_first' stempelt in der neuen Datei, 'stamp_first'
+            in der Fahne vor dem Aufteilen.
+        stages: Optionale Stufen, die die Standardstufen gleichen Namens
+            ersetzen (siehe ``engine.STUDENT_STAGES``).
+    """
+    instrumentation = instrumentation or Instrumentation()
+    _worker_state['instrumentation'] = instrumentation
+    _worker_state['ceiling'] = ceiling
+    stamper = Stamper(paths, data, renderer, instrumentation, cache,
+                      save_profile, layout, layout_index)
+    _worker_state['stamper'] = stamper
+    writer = None
+    if write_concurrency:
+        writer = OutputWriter(write_concurrency, instrumentation)
+    _worker_state['writer'] = writer
+    file_manager = FileManager(paths, data, instrumentation, writer,
+                               save_profile, protection, journal)
+    _worker_state['file_manager'] = file_manager
+    _worker_state['stages'] = stage_creator(STAGE_ORDERS[order], stamper,
+                                            file_manager, stages)
+
+
+def _press_worker(students: list) -> list:
+    """
+    Stempelt und verteilt ein Arbeitspaket im aktuellen Worker-Prozess.
+    
+    Jeder Schüler durchläuft die Stufen des Workers; die PDF-Datei wird
+    in einem Durchgang aus den Originalseiten und dem Stempel des
+    Schülers aufgebaut, ohne gemeinsames Zwischendokument. Bei
+    'stamp_first' wird vorher in der geöffneten Fahne gestempelt.
+    Mit Speicherobergrenze wird die Korrekturfahne nach jeder Datei
+    freigegeben, sobald der Worker die Grenze überschreitet.
+    
+    Args:
+        students: Datensätze der Schüler dieses Arbeitspakets.
+        
+    Returns:
+        Pfade der geschriebenen Dateien als Strings.
+    """
+    stamper = _worker_state['stamper']
+    file_manager = _worker_state['file_manager']
+    ceiling = _worker_state['ceiling']
+    stages = _worker_state['stages']
+    written = []
+    
+    for student in students:
+        work = student_runner(stages, student, stamper._extractor_loader())
+        written.append(str(work.path))
+        if ceiling is not None and ceiling.exceeded():
+            stamper._source_releaser()
+    
+    # Arbeitspaket erst abgeben, wenn alle Dateien geschrieben sind
+    if file_manager.writer is not None:
+        file_manager.writer.flush()
+    
+    return written
+
+
+def _press_pool_worker(students: list) -> tuple:
+    """
+    Wie ``_press_worker``, liefert aber zusätzlich die Messungen.
+    
+    Args:
+        students: Datensätze der Schüler dieses Arbeitspakets.
+        
+    Returns:
+        Tupel aus den geschriebenen Pfaden und dem Bericht der Messungen
+        dieses Arbeitspakets.
+    """
+    written = _press_worker(students)
+    
+    return written, _worker_state['instrumentation'].drain()
+
+
+class ParallelPress:
+    """
+    Stempelt und verteilt die Prüfungen parallel auf mehrere Prozesse.
+    
+    Der Schülerindex wird in zusammenhängende Arbeitspakete aufgeteilt,
+    die von einem Prozesspool abgearbeitet werden. Jeder Worker schreibt
+    die PDF-Dateien seiner Schüler selbst; das Ergebnis ist unabhängig
+    von der Anzahl Worker identisch.
+    
+    Mit einer Speicherobergrenze (Streaming-Modus) werden die Schüler in
+    Seitenreihenfolge verarbeitet, sodass jeder Worker die Fahne von
+    vorne nach hinten liest und bereits verarbeitete Seiten freigeben kann.
+    """
+    
+    def __init__(self, paths: Pathfinder, data: DataHandler,
+                 workers: int = None, renderer: str = 'raster',
+                 instrumentation: Instrumentation = None,
+                 cache: StampCache = None, incremental: bool = False,
+                 ceiling: MemoryCeiling = None,
+                 write_concurrency: int = 1,
+                 save_profile: str = 'balanced',
+                 protection: Protection = None,
+                 layout: StampLayout = None,
+                 layout_index: LayoutIndex = None,
+                 report: ClassReport = None,
+                 journal: RunJournal = None,
+                 order: str = 'split_first',
+                 stages: dict = None) -> None:
+        """
+        Initialisiert ParallelPress mit Pfaden, Daten und Worker-Anzahl.
+        
+        Args:
+            paths: Ein Pathfinder-Objekt mit Dateipfaden.
+            data: Ein DataHandler-Objekt mit den Notendaten.
+            workers: Anzahl Prozesse (Standard: Anzahl CPU-Kerne).
+            renderer: Darstellung des Stempels ('raster', 'vector' oder
+                'native').
+            instrumentation: Optionale Messung; die Zeiten und Zähler der
+                Worker werden darin zusammengeführt.
+            cache: Optionaler Stempel-Cache, den alle Worker teilen.
+            incremental: Nur Ausgabedateien schreiben, deren Eingaben
+                sich seit dem letzten Lauf geändert haben.
+            ceiling: Optionale Speicherobergrenze pro Worker; schaltet
+                den Streaming-Modus ein.
+            write_concurrency: Anzahl Schreib-Threads pro Worker; 0
+                schreibt jede Datei sofort.
+            save_profile: Speicherprofil der Schülerdateien ('fast',
+                'balanced' oder 'archive').
+            protection: Optionale Passwörter und Metadaten der
+                Schülerdateien.
+            layout: Seiten und Platzierung der Stempel.
+            layout_index: Raster belegter Zellen für die automatische
+                Platzierung; wird sonst von jedem Worker selbst erstellt.
+            report: Optionaler Klassenbericht, der im selben Lauf
+                geschrieben wird.
+            journal: Optionales Journal; Dateien, die ein abgebrochener
+                Lauf bereits fertig geschrieben hat, werden übersprungen.
+            order: Reihenfolge von Stempeln und Aufteilen
+                ('split_first' oder 'stamp_first').
+            stages: Optionale Stufen, die die Standardstufen gleichen
+                Namens ersetzen; mit mehreren Workern müssen sie sich
+                importieren lassen.
+        """
+        self.paths = paths
+        self.data = data
+        self.workers = workers or os.cpu_count() or 1
+        self.renderer = renderer
+        self.instrumentation = instrumentation or Instrumentation()
+        self.cache = cache
+        self.incremental = incremental
+        self.ceiling = ceiling
+        self.write_concurrency = write_concurrency
+        self.save_profile = save_profile
+        self.protection = protection
+        self.layout = layout or StampLayout()
+        self.layout_index = layout_index
+        self.report = report
+        self.journal = journal
+        self.order = order
+        self.stages = stages
+        
+    def _chunk_creator(self, students: list,
+                       chunks_per_worker: int = 4) -> list:
+        """
+        Teilt die Schülerdatensätze in zusammenhängende Arbeitspakete auf.
+        
+        Mehrere Pakete pro Worker gleichen unterschiedlich lange
+        Prüfungen aus; zusammenhängende Pakete halten die Seitenzugriffe
+        innerhalb eines Workers lokal.
+        
+        Args:
+            students: Zu verarbeitende Schülerdatensätze.
+            chunks_per_worker: Anzahl Pakete pro Worker.
+            
+        Returns:
+            Liste von Listen mit Schülerdatensätzen.
+        """
+        n_chunks = min(len(students), self.workers * chunks_per_worker) or 1
+        size = -(-len(students) // n_chunks)
+        
+        return [students[i:i + size] for i in range(0, len(students), size)]
+        
+    def _fingerprint_collector(self, file_manager: FileManager) -> dict:
+        """
+        Berechnet die Fingerabdrücke aller Ausgabedateien.
+        
+        Args:
+            file_manager: FileManager für die Ausgabepfade.
+            
+        Returns:
+            Dictionary von Ausgabepfad auf Fingerabdruck, in Reihenfolge
+            der Notentabelle.
+        """
+        # Ein anderes Speicherprofil ergibt andere Dateien
+        fingerprint = [*class_fingerprint(self.data.df, self.data.statistics,
+                                         self.renderer),
+                       self.save_profile]
+        # Ebenso ein anderes Layout samt Aufgabenpunkten
+        labels = {}
+        if self.layout != StampLayout():
+            fingerprint.append(list(self.layout))
+            labels = self.layout.task_labels(self.data.df)
+        # Die andere Reihenfolge ordnet die Objekte der Dateien anders
+        if self.order != 'split_first':
+            fingerprint.append(self.order)
+        fingerprints = {}
+        
+        with pymupdf.open(self.paths.doc) as doc:
+            for student in self.data.records:
+                page_hash = page_range_hasher(doc, student.first, student.last)
+                # Neues Passwort oder neue Metadaten ergeben andere Dateien
+                protection = file_manager.protection.get(student.key)
+                student_fingerprint = fingerprint
+                if protection is not None:
+                    student_fingerprint = [*student_fingerprint, protection]
+                if student.key in labels:
+                    student_fingerprint = [*student_fingerprint,
+                                           labels[student.key]]
+                fingerprints[file_manager._path_creator(student)] = (
+                    OutputManifest.fingerprint_creator(page_hash, student,
+                                                       student_fingerprint))
+        
+        return fingerprints
+        
+    def run(self) -> list:
+        """
+        Stempelt und verteilt alle Schüler.
+        
+        Im inkrementellen Modus werden nur Schüler verarbeitet, deren
+        Ausgabedatei fehlt, verändert wurde oder andere Eingaben hat. Mit
+        Journal werden zudem die Schüler übersprungen, deren Datei ein
+        abgebrochener Lauf bereits fertig geschrieben hat; erst nach
+        einem vollständigen Lauf wird das Journal gelöscht.
+        
+        Returns:
+            Pfade der in diesem Lauf geschriebenen Dateien in Reihenfolge
+            des Index.
+        """
+        students = list(self.data.records)
+        if not self.incremental:
+            written = self._press(self._journal_filter(students))
+        else:
+            written = self._incremental_press(students)
+        
+        self._report_writer()
+        if self.journal is not None:
+            self.journal.finish()
+        
+        return written
+        
+    def _journal_filter(self, students: list) -> list:
+        """
+        Entfernt Schüler, deren Datei laut Journal schon fertig ist.
+        
+        Args:
+            students: Zu verarbeitende Schülerdatensätze.
+            
+        Returns:
+            Schülerdatensätze, die noch geschrieben werden müssen.
+        """
+        if self.journal is None:
+            return students
+        
+        file_manager = FileManager(self.paths, self.data)
+        pending = [student for student in students
+                   if not self.journal.is_done(
+                       file_manager._path_creator(student))]
+        self.instrumentation.counter('resumed', len(students) - len(pending))
+        
+        return pending
+        
+    def _incremental_press(self, students: list) -> list:
+        """
+        Stempelt und verteilt nur Schüler mit geänderten Eingaben.
+        
+        Args:
+            students: Alle Schülerdatensätze.
+            
+        Returns:
+            Pfade der geschriebenen Dateien in Reihenfolge des Index.
+        """
+        with self.instrumentation.timer('fingerprint'):
+            manifest = OutputManifest(self.paths.destination_folder)
+            file_manager = FileManager(self.paths, self.data,
+                                       protection=self.protection)
+            fingerprints = self._fingerprint_collector(file_manager)
+            stale = [student for student, (path, fingerprint)
+                     in zip(students, fingerprints.items())
+                     if not manifest.is_current(path, fingerprint)]
+        self.instrumentation.counter('skipped', len(students) - len(stale))
+        
+        written = self._press(self._journal_filter(stale))
+        
+        # Halte die neuen Fingerabdrücke fest, mit Journal auch die der
+        # Dateien, die ein abgebrochener Lauf schon geschrieben hat
+        finished = {Path(path) for path in written}
+        if self.journal is not None:
+            finished.update(path for path in fingerprints
+                            if self.journal.is_done(path))
+        for path in finished:
+            manifest.update(path, fingerprints[path])
+        manifest.save(keep=set(fingerprints))
+        
+        return written
+        
+    def _report_writer(self) -> None:
+        """
+        Schreibt den Klassenbericht, falls das Stempeln es nicht tat.
+        
+        Mit einem Worker schreibt ``_press`` den Bericht mit dem schon
+        gerenderten Hintergrund. Sonst lädt ein eigener Stamper den
+        Hintergrund aus dem Cache oder rendert ihn einmal im Hauptprozess.
+        """
+        if self.report is None or self.report.written is not None:
+            return
+        
+        stamper = Stamper(self.paths, self.data, self.renderer,
+                          self.instrumentation, self.cache)
+        try:
+            frame = None
+            if self.data.records:
+                with self.instrumentation.timer('background'):
+                    frame = stamper._frame_loader()
+            self.report.writer(frame)
+        finally:
+            stamper._background_closer()
+            stamper.doc.close()
+        
+    def _press(self, students: list) -> list:
+        """
+        Stempelt und verteilt die übergebenen Schüler.
+        
+        Bei einem Worker wird ohne Prozesspool im aktuellen Prozess
+        gearbeitet.
+        
+        Args:
+            students: Zu verarbeitende Schülerdatensätze.
+            
+        Returns:
+            Pfade der geschriebenen Dateien in Reihenfolge der Datensätze,
+            im Streaming-Modus in Seitenreihenfolge.
+        """
+        if not students:
+            return []
+        if self.ceiling is not None:
+            students = sorted(students, key=lambda student: student.first)
+        
+        if self.workers == 1:
+            _press_initializer(self.paths, self.data, self.renderer,
+                               self.instrumentation, self.cache,
+                               self.ceiling, self.write_concurrency,
+                               self.save_profile, self.protection,
+                               self.layout, self.layout_index,
+                               self.journal, self.order, self.stages)
+            try:
+                written = _press_worker(students)
+            finally:
+                if _worker_state['writer'] is not None:
+                    _worker_state['writer'].close()
+            stamper = _worker_state.pop('stamper')
+            if self.report is not None:
+                self.report.writer(stamper._frame_loader())
+            stamper._background_closer()
+            stamper.doc.close()
+            _worker_state.clear()
+            return written
+        
+        # Prozesspool (multiprocessing) nur bei mehreren Workern laden
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=_press_initializer,
+                                 initargs=(self.paths, self.data,
+                                           self.renderer, None,
+                                           self.cache, self.ceiling,
+                                           self.write_concurrency,
+                                           self.save_profile,
+                                           self.protection, self.layout,
+                                           self.layout_index,
+                                           self.journal,
+                                           self.order,
+                                           self.stages)) as pool:
+            results = list(pool.map(_press_pool_worker,
+                                    self._chunk_creator(students)))
+        
+        # Führe die Messungen der Worker zusammen
+        for _, report in results:
+            self.instrumentation.merge(report)
+        
+        return [path for chunk, _ in results for path in chunk]
 
 
 if __name__ == '__main__':
@@ -419,17 +2115,15 @@ if __name__ == '__main__':
     # Erstelle Stempel-Engine
     stamp = Stamper(paths, data)
     
-    # Führe Stempelprozess aus
-    stamp.printing_press()
-    
     # Erstelle Dateimanager für Organisation
     file_manager = FileManager(paths, data)
     
     # Erstelle individuelle Ordner
     file_manager.folder_creator()
     
-    # Verteile gestempelte Dateien
-    file_manager.file_distributor()
+    # Stemple und verteile in einem Durchgang
+    file_manager.stamp_distributor(stamp)
     
-    # Warte auf Benutzerbestätigung vor Programmende
-    input('Zum Beenden des Programms ENTER drücken.')
+    # Warte auf Benutzerbestätigung, wenn das Fenster sonst zuginge
+    if sys.stdin.isatty():
+        input('Zum Beenden des Programms ENTER drücken.')
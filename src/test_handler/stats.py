@@ -0,0 +1,232 @@
+"""
+Notenstatistik einer Klasse, einmal berechnet und von allen Stufen genutzt.
+
+Quartile, Whisker, Ausreißer, Mittelwert, Histogramm und die Perzentilränge
+aller Schüler entstehen in einem vektorisierten Durchgang über die sortierten
+Noten. Renderer, Berichte, Cache und inkrementeller Modus lesen nur noch
+aus ``ClassStatistics``; die Farbschwelle des Boxplots steht ebenfalls hier.
+Mehrere Prüfungen oder Klassen lassen sich mit ``grouped`` nebeneinander
+auswerten.
+"""
+
+from __future__ import annotations
+
+import inspect
+
+from test_handler._lazy import LazyModule
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+
+class ClassStatistics:
+    """
+    Verteilung der Noten einer Klasse oder Prüfung.
+
+    Die Kennzahlen des Boxplots folgen matplotlib: lineare Quartile und
+    Whisker bis zum extremsten Wert innerhalb des 1.5-fachen
+    Interquartilsabstands.
+    """
+
+    # Genügend: Schwelle für die Farbe der Box
+    PASS_MARK = 4
+    WHISKER_RANGE = 1.5
+    # Histogramm in halben Noten von 1 bis 6
+    GRADE_BINS = tuple(1 + 0.5 * step for step in range(11))
+
+    def __init__(self, notes, keys=None, label: str = None):
+        """
+        Berechnet alle Kennzahlen.
+
+        Args:
+            notes: Noten der Schüler.
+            keys: Optionale Schlüssel der Schüler in derselben Reihenfolge
+                (für ``percentile_rank``).
+            label: Optionale Bezeichnung, z. B. Titel der Prüfung.
+        """
+        self.label = label
+        self.notes = np.asarray(notes, dtype=float)
+        if not len(self.notes):
+            raise ValueError('Keine Noten für die Statistik')
+        self.keys = list(keys) if keys is not None else []
+        self._positions = {key: i for i, key in enumerate(self.keys)}
+        self.count = len(self.notes)
+
+        sorted_notes = np.sort(self.notes)
+        self.minimum, self.q1, self.median, self.q3, self.maximum = (
+            float(value) for value in np.percentile(sorted_notes,
+                                                    [0, 25, 50, 75, 100]))
+        self.mean = float(sorted_notes.mean())
+
+        # Whisker: extremste Werte innerhalb von 1.5 * IQR, wie bei
+        # matplotlib höchstens bis an die Box heran
+        iqr = self.q3 - self.q1
+        low = np.searchsorted(sorted_notes, self.q1 - self.WHISKER_RANGE * iqr,
+                              side='left')
+        high = np.searchsorted(sorted_notes, self.q3 + self.WHISKER_RANGE * iqr,
+                               side='right')
+        self.whisker_low = min(float(sorted_notes[low]), self.q1)
+        self.whisker_high = max(float(sorted_notes[high - 1]), self.q3)
+        # Ausreißer in Reihenfolge der Tabelle, wie matplotlib sie zeichnet
+        self.fliers = self.notes[(self.notes < self.whisker_low)
+                                 | (self.notes > self.whisker_high)]
+
+        # Perzentilrang: Anteil schlechterer Noten plus halber Anteil gleicher
+        below = np.searchsorted(sorted_notes, self.notes, side='left')
+        equal = np.searchsorted(sorted_notes, self.notes, side='right') - below
+        self.percentile_ranks = 100 * (below + equal / 2) / self.count
+
+        bins = self.GRADE_BINS
+        if self.minimum < bins[0] or self.maximum > bins[-1]:
+            bins = 'auto'
+        self.histogram, self.bin_edges = np.histogram(sorted_notes, bins=bins)
+
+    def __repr__(self) -> str:
+        label = f'{self.label!r}, ' if self.label is not None else ''
+        return (f'ClassStatistics({label}n={self.count}, '
+                f'median={self.median:g})')
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, column: str = 'Note',
+                   label: str = None) -> 'ClassStatistics':
+        """
+        Berechnet die Statistik aus einem DataFrame.
+
+        Args:
+            df: Bereinigte Notendaten; der Index enthält die Schlüssel.
+            column: Spalte mit den Noten.
+            label: Optionale Bezeichnung.
+
+        Returns:
+            Statistik der Spalte.
+        """
+        return cls(df[column].to_numpy(dtype=float), df.index.tolist(), label)
+
+    @classmethod
+    def grouped(cls, df: pd.DataFrame, by: str = 'Titel',
+                column: str = 'Note') -> dict:
+        """
+        Berechnet die Statistik mehrerer Prüfungen oder Klassen.
+
+        Args:
+            df: Notendaten mehrerer Prüfungen, z. B. aneinandergehängte
+                Notentabellen.
+            by: Spalte, nach der gruppiert wird.
+            column: Spalte mit den Noten.
+
+        Returns:
+            Dictionary von Gruppenwert auf ``ClassStatistics`` in
+            Reihenfolge des ersten Auftretens.
+        """
+        return {label: cls.from_frame(group, column, label)
+                for label, group in df.groupby(by, sort=False)}
+
+    def box_color(self) -> str:
+        """
+        Bestimmt die Farbe der Box aus den Quartilen.
+
+        Returns:
+            'green', wenn Q1 über der Schwelle liegt (sehr gute Klasse),
+            'red', wenn Q3 darunter liegt (schwache Klasse), sonst
+            'orange'.
+        """
+        if self.q1 > self.PASS_MARK:
+            return 'green'
+        if self.q3 < self.PASS_MARK:
+            return 'red'
+        return 'orange'
+
+    def percentile_rank(self, key: str) -> float:
+        """
+        Perzentilrang eines Schülers in der Klasse.
+
+        Args:
+            key: Schlüssel des Schülers.
+
+        Returns:
+            Rang zwischen 0 und 100; 50 entspricht dem Median.
+        """
+        return float(self.percentile_ranks[self._positions[key]])
+
+    def boxplot_stats(self) -> dict:
+        """
+        Kennzahlen im Format von ``matplotlib.axes.Axes.bxp``.
+
+        Returns:
+            Dictionary mit 'med', 'q1', 'q3', 'whislo', 'whishi',
+            'fliers' und 'mean'.
+        """
+        return {'med': self.median, 'q1': self.q1, 'q3': self.q3,
+                'whislo': self.whisker_low, 'whishi': self.whisker_high,
+                'fliers': self.fliers, 'mean': self.mean}
+
+    def fingerprint(self) -> list:
+        """
+        Alles, was die Verteilung bestimmt, für Cache und Fingerabdrücke.
+
+        Returns:
+            Sortierte Noten als JSON-fähige Liste.
+        """
+        return np.sort(self.notes).tolist()
+
+    def summary(self) -> dict:
+        """
+        Erstellt eine JSON-fähige Zusammenfassung für Berichte.
+
+        Returns:
+            Dictionary mit Anzahl, Kennzahlen, Ausreißern und Histogramm.
+        """
+        return {
+            'label': self.label,
+            'count': self.count,
+            'mean': self.mean,
+            'min': self.minimum,
+            'q1': self.q1,
+            'median': self.median,
+            'q3': self.q3,
+            'max': self.maximum,
+            'whisker_low': self.whisker_low,
+            'whisker_high': self.whisker_high,
+            'fliers': self.fliers.tolist(),
+            'box_color': self.box_color(),
+            'histogram': {'counts': self.histogram.tolist(),
+                          'edges': self.bin_edges.tolist()},
+        }
+
+
+def horizontal_options(ax) -> dict:
+    """
+    Argumente für einen liegenden Boxplot mit ``Axes.bxp``.
+
+    matplotlib 3.10 ersetzt ``vert`` durch ``orientation``; ``vert``
+    entfällt mit 3.13 und warnt bis dahin.
+
+    Args:
+        ax: Achsen, in die gezeichnet wird.
+
+    Returns:
+        ``{'orientation': 'horizontal'}`` bzw. ``{'vert': False}`` für
+        ältere Versionen.
+    """
+    if 'orientation' in inspect.signature(ax.bxp).parameters:
+        return {'orientation': 'horizontal'}
+
+    return {'vert': False}
+
+
+def statistics_table(statistics: dict) -> pd.DataFrame:
+    """
+    Stellt mehrere Statistiken nebeneinander.
+
+    Args:
+        statistics: Dictionary von Bezeichnung auf ``ClassStatistics``,
+            z. B. aus ``ClassStatistics.grouped``.
+
+    Returns:
+        DataFrame mit einer Spalte pro Prüfung bzw. Klasse und einer
+        Zeile pro Kennzahl.
+    """
+    rows = ('count', 'mean', 'min', 'q1', 'median', 'q3', 'max',
+            'whisker_low', 'whisker_high', 'box_color')
+    return pd.DataFrame({label: {row: stats.summary()[row] for row in rows}
+                         for label, stats in statistics.items()})
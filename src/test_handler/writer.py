@@ -0,0 +1,153 @@
+"""
+Schreiben der Ausgabedateien im Hintergrund.
+
+Liegt der Zielordner auf einem Netzlaufwerk, blockiert jedes Speichern
+die Stempelung für die Dauer der Netzwerklatenz. Der ``OutputWriter``
+nimmt fertige PDF-Inhalte über eine begrenzte Warteschlange entgegen
+und schreibt sie mit mehreren Threads, während der Worker bereits den
+nächsten Schüler stempelt. Jede Datei wird zuerst als temporäre Datei im
+Zielordner geschrieben und dann umbenannt, sodass nie eine halb
+geschriebene PDF-Datei unter dem endgültigen Namen liegt.
+"""
+
+import os
+import queue
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from test_handler.instrumentation import Instrumentation
+
+
+def atomic_writer(path: str, data: bytes) -> None:
+    """
+    Schreibt eine Datei atomar.
+
+    Args:
+        path: Zielpfad.
+        data: Inhalt der Datei.
+    """
+    path = Path(path)
+    handle, temp_path = tempfile.mkstemp(dir=path.parent,
+                                         prefix=f'.{path.stem}.',
+                                         suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+class OutputWriter:
+    """
+    Schreibt Ausgabedateien mit begrenzter Parallelität im Hintergrund.
+
+    Ist die Warteschlange voll, wartet ``submit``, bis ein Platz frei
+    wird; der Speicherbedarf bleibt so auf wenige Dateien begrenzt.
+    Fehler der Schreib-Threads werden beim nächsten ``submit`` oder
+    spätestens bei ``flush`` im aufrufenden Thread ausgelöst.
+    """
+
+    def __init__(self, concurrency: int = 1,
+                 instrumentation: Instrumentation = None,
+                 queue_size: int = None):
+        """
+        Startet die Schreib-Threads.
+
+        Args:
+            concurrency: Anzahl gleichzeitiger Schreibvorgänge.
+            instrumentation: Optionale Messung der Schreib- und
+                Wartezeiten.
+            queue_size: Höchstzahl wartender Dateien (Standard: doppelte
+                Anzahl Threads).
+        """
+        if concurrency < 1:
+            raise ValueError(f'Ungültige Anzahl Schreib-Threads: {concurrency!r}')
+
+        self.concurrency = concurrency
+        self.instrumentation = instrumentation or Instrumentation()
+        self._queue = queue.Queue(maxsize=queue_size or 2 * concurrency)
+        self._lock = threading.Lock()
+        self._errors = []
+        self._times = []
+        self._threads = [threading.Thread(target=self._worker, daemon=True,
+                                          name=f'test-handler-writer-{i}')
+                         for i in range(concurrency)]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self) -> 'OutputWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _worker(self) -> None:
+        """Schreibt Dateien aus der Warteschlange bis zum Endsignal."""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                path, data, student, done = item
+                start = time.perf_counter()
+                try:
+                    atomic_writer(path, data)
+                    if done is not None:
+                        done(path, student)
+                except Exception as error:
+                    with self._lock:
+                        self._errors.append(error)
+                else:
+                    with self._lock:
+                        self._times.append((student,
+                                            time.perf_counter() - start))
+            finally:
+                self._queue.task_done()
+
+    def _error_raiser(self) -> None:
+        """Löst den ersten Fehler der Schreib-Threads erneut aus."""
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+
+    def submit(self, path: str, data: bytes, student: str = None,
+               done=None) -> None:
+        """
+        Übergibt eine fertige Datei zum Schreiben.
+
+        Args:
+            path: Zielpfad.
+            data: Inhalt der Datei.
+            student: Optionaler Schlüssel des Schülers für die Messung.
+            done: Optionale Funktion ``(path, student)``, die im
+                Schreib-Thread aufgerufen wird, sobald die Datei unter
+                ihrem endgültigen Namen liegt.
+        """
+        self._error_raiser()
+        with self.instrumentation.timer('write_wait'):
+            self._queue.put((path, data, student, done))
+
+    def flush(self) -> None:
+        """Wartet, bis alle übergebenen Dateien geschrieben sind."""
+        self._queue.join()
+
+        with self._lock:
+            times, self._times = self._times, []
+        for student, seconds in times:
+            self.instrumentation._time_recorder('write', seconds, student)
+        self._error_raiser()
+
+    def close(self) -> None:
+        """Schreibt alle wartenden Dateien und beendet die Threads."""
+        try:
+            self.flush()
+        finally:
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
@@ -0,0 +1,43 @@
+"""
+Shared fixtures for the test suite.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def class_files(tmp_path):
+    """Writes a small synthetic control file and correction proof."""
+    pymupdf = pytest.importorskip('pymupdf')
+
+    rows = ['Nachname;Vorname;Total;Note;First;Last;Datum;Titel']
+    notes = [5.5, 4.0, 3.25, 6.0, 4.75]
+    doc = pymupdf.open()
+    for i, note in enumerate(notes):
+        first = 2 * i + 1
+        rows.append(f'Müller{i};Anna{i};{int(note * 10)};{note};'
+                    f'{first};{first + 1};2024-05-01;Pruefung')
+        for k in range(2):
+            page = doc.new_page()
+            page.insert_text((72, 72), f'Müller{i} Seite {k + 1}')
+
+    data = tmp_path / 'steuerung.csv'
+    data.write_text('\n'.join(rows) + '\n', encoding='utf-8')
+    proof = tmp_path / 'fahne.pdf'
+    doc.save(proof)
+    doc.close()
+
+    return {'data': str(data), 'doc': str(proof),
+            'destination_folder': str(tmp_path / 'output')}
+
+
+@pytest.fixture
+def paths(class_files, monkeypatch):
+    """A Pathfinder whose prompts are answered with the synthetic files."""
+    from test_handler.stamper import Pathfinder
+
+    answers = iter([class_files['doc'], class_files['data'],
+                    class_files['destination_folder']])
+    monkeypatch.setattr('builtins.input', lambda _: next(answers))
+
+    return Pathfinder()
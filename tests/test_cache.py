@@ -0,0 +1,66 @@
+"""
+Tests for the on-disk stamp cache.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from test_handler.cache import StampCache
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = StampCache(tmp_path / 'cache', max_bytes=250)
+    keys = [StampCache.key_creator('stamp', i) for i in range(3)]
+    for age, key in enumerate(keys[:2]):
+        cache.store(key, b'x' * 100)
+        path = cache._path_creator(key)
+        os.utime(path, (1000 + age, 1000 + age))
+
+    # Treffer macht den ältesten Eintrag zum jüngsten
+    assert cache.load(keys[0]) == b'x' * 100
+    cache.store(keys[2], b'y' * 100)
+
+    assert cache.load(keys[1]) is None
+    assert cache.load(keys[0]) is not None
+    assert cache.load(keys[2]) is not None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_key_depends_on_every_part():
+    assert StampCache.key_creator([4.0, 5.5], 5.5, 55, 'Anna') != \
+        StampCache.key_creator([4.0, 5.5], 5.5, 56, 'Anna')
+
+
+@pytest.mark.parametrize('renderer', ['raster', 'native'])
+def test_rerun_reuses_unchanged_stamps(paths, class_files, tmp_path, renderer):
+    pytest.importorskip('pymupdf')
+    from test_handler.instrumentation import Instrumentation
+    from test_handler.stamper import DataHandler, FileManager, ParallelPress
+
+    def press(destination):
+        paths.destination_folder = str(tmp_path / destination)
+        data = DataHandler(paths)
+        FileManager(paths, data).folder_creator()
+        instrumentation = Instrumentation()
+        written = ParallelPress(paths, data, workers=1, renderer=renderer,
+                                instrumentation=instrumentation,
+                                cache=StampCache(tmp_path / 'cache')).run()
+        return ([Path(path).read_bytes() for path in written],
+                instrumentation.report()['counters'])
+
+    cold, cold_counters = press('cold')
+    warm, warm_counters = press('warm')
+
+    # Punktekorrektur eines Schülers bei gleicher Note
+    data_file = Path(class_files['data'])
+    rows = data_file.read_text(encoding='utf-8').replace(';32;3.25;', ';33;3.25;')
+    data_file.write_text(rows, encoding='utf-8')
+    _, corrected_counters = press('corrected')
+
+    assert cold_counters['cache_misses'] == 5
+    assert warm_counters.get('cache_misses', 0) == 0
+    assert warm == cold
+    assert corrected_counters['cache_misses'] == 1
+    assert corrected_counters['cache_hits'] == 4
@@ -0,0 +1,100 @@
+"""
+Tests for the configuration and the command line interface.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from test_handler.cli import main, run
+from test_handler.config import Config, ConfigError
+
+
+def test_config_sources_are_layered(tmp_path):
+    toml = tmp_path / 'klasse.toml'
+    toml.write_text('[test_handler]\n'
+                    'doc = "fahne.pdf"\n'
+                    'data = "steuerung.csv"\n'
+                    'renderer = "vector"\n', encoding='utf-8')
+    environ = {'TEST_HANDLER_CONFIG': str(toml),
+               'TEST_HANDLER_RENDERER': 'native',
+               'TEST_HANDLER_WORKERS': '3'}
+
+    config = Config.load(environ=environ, workers=2, data=None)
+
+    assert config.doc == str(tmp_path / 'fahne.pdf')
+    assert config.data == str(tmp_path / 'steuerung.csv')
+    assert config.destination_folder == Config.DEFAULTS['destination_folder']
+    assert config.renderer == 'native'
+    assert config.workers == 2
+
+
+def test_config_rejects_unknown_keys(tmp_path):
+    toml = tmp_path / 'klasse.toml'
+    toml.write_text('dokument = "fahne.pdf"\n', encoding='utf-8')
+
+    with pytest.raises(ConfigError):
+        Config.load(file=str(toml), environ={})
+
+
+def test_run_processes_classes_back_to_back(class_files, tmp_path, monkeypatch):
+    pytest.importorskip('pymupdf')
+    monkeypatch.setattr('builtins.input', pytest.fail)
+
+    for klasse in ('a', 'b'):
+        destination = tmp_path / klasse
+        written = run(Config(doc=class_files['doc'], data=class_files['data'],
+                             destination_folder=str(destination)))
+
+        assert len(written) == 5
+        assert all(Path(path).parent.parent == destination for path in written)
+
+
+def test_main_reports_invalid_renderer(class_files, capsys):
+    pytest.importorskip('pymupdf')
+
+    code = main(['--doc', class_files['doc'], '--data', class_files['data'],
+                 '--destination-folder', class_files['destination_folder'],
+                 '--renderer', 'svg'])
+
+    assert code == 2
+    assert 'svg' in capsys.readouterr().err
+
+
+def test_batch_manifest_runs_all_jobs(class_files, tmp_path):
+    pytest.importorskip('pymupdf')
+    from test_handler.batch import BatchRunner, Manifest
+
+    manifest = tmp_path / 'stapel.csv'
+    manifest.write_text(
+        'name;doc;data;destination_folder\n'
+        f"4a;{class_files['doc']};{class_files['data']};out_a\n"
+        f"4b;fehlt.pdf;{class_files['data']};out_b\n"
+        f"4c;{class_files['doc']};{class_files['data']};out_c\n",
+        encoding='utf-8')
+
+    summary = BatchRunner(Manifest(str(manifest), renderer='native'),
+                          workers=2).run()
+
+    assert [result['name'] for result in summary['results']] == ['4a', '4b', '4c']
+    assert [result['status'] for result in summary['results']] == ['ok', 'error', 'ok']
+    assert summary['files'] == 10
+    assert len(list((tmp_path / 'out_c').rglob('*.pdf'))) == 5
+
+
+def test_main_writes_batch_summary(class_files, tmp_path):
+    pytest.importorskip('pymupdf')
+    import json
+
+    manifest = tmp_path / 'stapel.toml'
+    manifest.write_text(
+        '[[jobs]]\n'
+        f"doc = '{class_files['doc']}'\n"
+        f"data = '{class_files['data']}'\n"
+        "destination_folder = 'out'\n", encoding='utf-8')
+
+    code = main(['--manifest', str(manifest), '--quiet'])
+
+    summary = json.loads((tmp_path / 'stapel.summary.json').read_text('utf-8'))
+    assert code == 0
+    assert summary['results'][0]['files'] == 5
@@ -0,0 +1,96 @@
+"""
+Tests for the interactive pipeline in core.py.
+"""
+
+import runpy
+from pathlib import Path
+
+import pytest
+
+pymupdf = pytest.importorskip('pymupdf')
+pytest.importorskip('matplotlib')
+
+from test_handler.core import Importer, Resampler, StampCreator, Stamper
+
+
+@pytest.fixture
+def importer(tmp_path):
+    rows = ['Nachname;Vorname;Total;Note;First;Last;Datum;Titel',
+            'Meier;Anna;50;5.5;1;1;2024-05-01;Pruefung',
+            'Meier;Ben;30;3.5;2;3;2024-05-01;Pruefung',
+            'Huber;Cleo;40;4.5;4;4;2024-05-01;Pruefung']
+    data = tmp_path / 'steuerung.csv'
+    data.write_text('\n'.join(rows) + '\n', encoding='utf-8')
+    doc = pymupdf.open()
+    for page in range(4):
+        doc.new_page().insert_text((72, 72), f'Seite {page + 1}')
+    doc.save(tmp_path / 'fahne.pdf')
+    doc.close()
+
+    importer = Importer(str(data), str(tmp_path / 'fahne.pdf'),
+                        str(tmp_path))
+    yield importer
+    importer.doc.close()
+
+
+def test_repeated_surnames_get_their_own_files(importer, tmp_path):
+    sampler = Resampler(importer)
+    sampler.folder_creator()
+    sampler.spliter()
+    for student in importer.records:
+        stamp = StampCreator(student, importer).boxplot()
+        Stamper(student, importer, stamp).stamp_and_save()
+
+    assert [student.key for student in importer.records] == [
+        'Meier_Anna', 'Meier_Ben', 'Huber']
+    files = sorted(Path(tmp_path, 'tmp').glob('*/*.pdf'))
+    assert [path.parent.name for path in files] == [
+        'Huber', 'Meier_Anna', 'Meier_Ben']
+    pages = {}
+    for path in files:
+        with pymupdf.open(path) as doc:
+            pages[path.parent.name] = [page.get_text().strip() for page in doc]
+            assert doc[0].get_images()
+    assert pages['Meier_Ben'] == ['Seite 2', 'Seite 3']
+
+
+def test_stamp_shows_the_students_own_values(importer, monkeypatch):
+    plt = pytest.importorskip('matplotlib.pyplot')
+    titles = []
+    monkeypatch.setattr(plt.Axes, 'set_title',
+                        lambda ax, title: titles.append(title))
+
+    for student in importer.records[:2]:
+        StampCreator(student, importer).boxplot()
+
+    assert titles == ['Individuelle Note von Anna und Notenverteilung',
+                      'Individuelle Note von Ben und Notenverteilung']
+
+
+def test_stamps_stay_in_memory_and_are_reused(importer, tmp_path):
+    student = importer.records[0]
+    stamp = StampCreator(student, importer).boxplot()
+
+    assert stamp.startswith(b'\x89PNG')
+    assert not list(Path(tmp_path, 'tmp').iterdir())
+    assert StampCreator(student, importer).boxplot() == stamp
+    assert importer.cache.hits == 1
+    # Ein neuer Lauf übernimmt den Stempel aus dem Cache
+    rerun = Importer(importer.path_steuerdatei, importer.path_fahne,
+                     str(tmp_path))
+    assert StampCreator(rerun.records[0], rerun).boxplot() == stamp
+    assert rerun.cache.hits == 1
+    rerun.doc.close()
+
+
+def test_main_runs_through_the_engine(importer, tmp_path, monkeypatch):
+    answers = iter([importer.path_steuerdatei, importer.path_fahne,
+                    str(tmp_path)])
+    monkeypatch.setattr('builtins.input', lambda _: next(answers))
+
+    runpy.run_module('test_handler.core', run_name='__main__')
+
+    files = sorted(Path(tmp_path, 'output').glob('*/*.pdf'))
+    assert [path.parent.name for path in files] == [
+        'Huber', 'Meier_Anna', 'Meier_Ben']
+    assert list(Path(tmp_path, 'cache').rglob('*.pdf'))
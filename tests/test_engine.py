@@ -0,0 +1,152 @@
+"""
+Tests for the pipeline engine and its choice of stage order.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from test_handler import engine
+from test_handler.config import Config, ConfigError
+from test_handler.engine import (HELD_KB, STAMP_MEMORY_MB, PipelineEngine,
+                                 PipelinePlan, WriteStage, held_memory,
+                                 order_costs, plan_chooser)
+
+
+class KeyRecorder(WriteStage):
+    """Write stage that also records the order of the students."""
+
+    keys = []
+
+    def __call__(self, work):
+        self.keys.append((work.student.key, work.page, len(work.doc)))
+        super().__call__(work)
+
+
+@pytest.mark.parametrize('students, pages, proof_mb, renderer, expected', [
+    # Kleine Klassen sparen das eigene Dokument pro Schüler
+    (100, 200, 0.2, 'native', 'stamp_first'),
+    (100, 800, 1, 'vector', 'stamp_first'),
+    # Große Klassen bremst der Speicher, den die Fahne hält
+    (1500, 3000, 2, 'native', 'split_first'),
+    (1000, 2000, 2, 'raster', 'split_first'),
+    # Gescannte Fahnen mit viel Seiteninhalt pro Schüler
+    (50, 400, 400, 'native', 'split_first'),
+    (50, 400, 5, 'native', 'stamp_first'),
+])
+def test_auto_picks_the_measured_faster_order(students, pages, proof_mb,
+                                              renderer, expected):
+    plan = plan_chooser(students, pages, proof_mb, renderer)
+
+    assert plan.order == expected
+    for order in ('split_first', 'stamp_first'):
+        assert plan_chooser(students, pages, proof_mb, renderer,
+                            order=order).order == order
+
+
+def test_workers_and_memory_limits_change_the_choice():
+    assert plan_chooser(1000, 2000, 2, 'native').order == 'split_first'
+    # Auf zwei Prozesse verteilt hält jede Fahne nur die Hälfte
+    assert plan_chooser(1000, 2000, 2, 'native', workers=2).order == (
+        'stamp_first')
+
+    assert plan_chooser(3000, 6000, 3, 'native').order == 'split_first'
+    # Im Streaming-Modus gibt die freigegebene Fahne den Speicher wieder
+    # frei; die Freigaben sind billiger als der gehaltene Speicher
+    costs = order_costs(3000, 6000, 3, 'native', memory_limit=256)
+    assert costs['stamp_first'] < costs['split_first']
+    assert plan_chooser(3000, 6000, 3, 'native',
+                        memory_limit=256).order == 'stamp_first'
+
+
+def test_auto_is_the_default():
+    assert Config().order == 'auto'
+    assert Config.load(environ={}).order == 'auto'
+    environ = {'TEST_HANDLER_ORDER': 'split_first'}
+    assert Config.load(environ=environ).order == 'split_first'
+
+
+def test_held_memory_beyond_the_cap_forces_split_first(monkeypatch):
+    # Ohne die Verlangsamung wäre stamp_first immer günstiger; die
+    # Obergrenze schützt dann trotzdem den Speicher
+    monkeypatch.setattr(engine, 'HELD_MS_PER_MB', 0)
+    below = int(STAMP_MEMORY_MB * 1024 / HELD_KB['vector'])
+    above = below + 10
+    assert held_memory(below, 0, 'vector') < STAMP_MEMORY_MB
+    assert held_memory(above, 0, 'vector') > STAMP_MEMORY_MB
+
+    assert plan_chooser(below, 2 * below, 0, 'vector').order == (
+        'stamp_first')
+    assert plan_chooser(above, 2 * above, 0, 'vector').order == (
+        'split_first')
+    assert plan_chooser(above, 2 * above, 0, 'vector',
+                        workers=2).order == 'stamp_first'
+    assert plan_chooser(above, 2 * above, 0, 'vector',
+                        memory_limit=1024).order == 'stamp_first'
+
+
+def test_plans_list_their_stages():
+    assert PipelinePlan('split_first').stages() == (
+        'load', 'stats', 'split', 'render', 'compose', 'write')
+    assert PipelinePlan('stamp_first').stages() == (
+        'load', 'stats', 'render', 'compose', 'split', 'write')
+
+
+@pytest.mark.parametrize('order', ['split_first', 'stamp_first'])
+def test_student_stages_can_be_swapped(class_files, monkeypatch, order):
+    pytest.importorskip('pymupdf')
+    monkeypatch.setattr(KeyRecorder, 'keys', [])
+
+    config = Config(**class_files, renderer='native', order=order)
+    written = PipelineEngine(config, stages={'write': KeyRecorder}).run()
+
+    assert KeyRecorder.keys == [(f'Müller{i}'.replace('ü', 'ue'), 0, 2)
+                                for i in range(5)]
+    assert all(Path(path).exists() for path in written)
+    with pytest.raises(ConfigError):
+        PipelineEngine(config, stages={'print': KeyRecorder})
+
+
+def test_unknown_orders_are_rejected():
+    with pytest.raises(ConfigError):
+        Config(order='compose_first')
+
+
+@pytest.mark.parametrize('renderer', ['raster', 'native'])
+def test_both_orders_write_the_same_pages(class_files, tmp_path, renderer):
+    pymupdf = pytest.importorskip('pymupdf')
+    from test_handler.cli import run
+
+    texts = {}
+    for order in ('split_first', 'stamp_first'):
+        config = Config(**{**class_files,
+                           'destination_folder': str(tmp_path / order)},
+                        renderer=renderer, order=order)
+        texts[order] = []
+        for path in run(config):
+            with pymupdf.open(path) as doc:
+                texts[order].append([(page.get_text(), len(page.get_images()),
+                                      len(page.get_xobjects()))
+                                     for page in doc])
+
+    assert texts['split_first'] == texts['stamp_first']
+    assert len(texts['stamp_first']) == 5
+    # Die Fahne selbst bleibt unverändert
+    with pymupdf.open(class_files['doc']) as doc:
+        assert not doc[0].get_xobjects()
+
+
+def test_changed_order_rewrites_incremental_outputs(class_files):
+    pytest.importorskip('pymupdf')
+    from test_handler.cli import run
+
+    config = Config(**class_files, renderer='native', incremental=True,
+                    order='split_first')
+    assert len(run(config)) == 5
+    assert run(config) == []
+
+    config.order = 'stamp_first'
+    written = run(config)
+
+    assert len(written) == 5
+    assert all(Path(path).exists() for path in written)
@@ -0,0 +1,77 @@
+"""
+Tests for page-range extraction with shared resources.
+"""
+
+import pytest
+
+pymupdf = pytest.importorskip('pymupdf')
+
+from test_handler.extract import PageRangeExtractor
+
+
+def _scan(shade: int) -> pymupdf.Pixmap:
+    return pymupdf.Pixmap(pymupdf.csGRAY, 40, 40,
+                          bytes((shade + n) % 256 for n in range(1600)), 0)
+
+
+def _image_xrefs(doc: pymupdf.Document) -> set:
+    return {image[0] for page in doc for image in page.get_images(full=True)}
+
+
+def _pixels(doc: pymupdf.Document) -> list:
+    return [page.get_pixmap(dpi=36).samples for page in doc]
+
+
+@pytest.fixture
+def shared_proof():
+    """Four pages sharing one resource dictionary with every scan."""
+    doc = pymupdf.open()
+    for shade in range(4):
+        page = doc.new_page()
+        page.insert_image(pymupdf.Rect(0, 0, 200, 200), pixmap=_scan(shade))
+        page.insert_text((72, 300), f'Seite {shade + 1}')
+
+    entries = []
+    for number, page in enumerate(doc):
+        xref = page.get_images(full=True)[0][0]
+        name = page.get_images(full=True)[0][7]
+        for contents in page.get_contents():
+            doc.update_stream(contents, doc.xref_stream(contents).replace(
+                f'/{name} '.encode(), f'/Im{number} '.encode()))
+        entries.append(f'/Im{number} {xref} 0 R')
+    font = doc.xref_get_key(doc[0].xref, 'Resources/Font')[1]
+    shared = doc.get_new_xref()
+    doc.update_object(shared, f'<</XObject <<{"".join(entries)}>> '
+                              f'/Font {font}>>')
+    for page in doc:
+        doc.xref_set_key(page.xref, 'Resources', f'{shared} 0 R')
+
+    yield pymupdf.open('pdf', doc.tobytes())
+    doc.close()
+
+
+def test_output_keeps_only_used_scans(shared_proof):
+    reference = pymupdf.open()
+    reference.insert_pdf(shared_proof, from_page=1, to_page=2)
+
+    output = PageRangeExtractor(shared_proof).extract(2, 3)
+
+    assert len(_image_xrefs(reference)) == 4
+    assert len(_image_xrefs(output)) == 2
+    assert _pixels(output) == _pixels(reference)
+
+
+def test_duplicate_objects_are_embedded_once():
+    doc = pymupdf.open()
+    for _ in range(2):
+        single = pymupdf.open()
+        single.new_page().insert_image(pymupdf.Rect(0, 0, 100, 100),
+                                       pixmap=_scan(7))
+        doc.insert_pdf(single)
+        single.close()
+    assert len(_image_xrefs(doc)) == 2
+
+    output = PageRangeExtractor(doc).extract(1, 2)
+
+    assert len(_image_xrefs(output)) == 1
+    assert _pixels(output) == _pixels(doc)
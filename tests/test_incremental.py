@@ -0,0 +1,50 @@
+"""
+Tests for incremental re-runs.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from test_handler.config import Config, ConfigError
+
+
+def test_incremental_flag_is_parsed_from_environment():
+    assert Config.load(environ={'TEST_HANDLER_INCREMENTAL': 'true'}).incremental
+    assert not Config.load(environ={'TEST_HANDLER_INCREMENTAL': '0'}).incremental
+    with pytest.raises(ConfigError):
+        Config(incremental='vielleicht')
+
+
+def test_rerun_writes_only_changed_outputs(class_files):
+    pytest.importorskip('pymupdf')
+    from test_handler.cli import run
+    from test_handler.instrumentation import Instrumentation
+
+    config = Config(**class_files, renderer='native', incremental=True)
+    data_file = Path(class_files['data'])
+
+    def press():
+        instrumentation = Instrumentation()
+        written = run(config, instrumentation)
+        return ([Path(path).parent.name for path in written],
+                instrumentation.report()['counters'].get('skipped', 0))
+
+    assert press() == ([f'Mueller{i}' for i in range(5)], 0)
+    assert press() == ([], 5)
+
+    # Punktekorrektur: nur die Zeile eines Schülers ändert sich
+    rows = data_file.read_text(encoding='utf-8')
+    data_file.write_text(rows.replace(';32;3.25;', ';33;3.25;'),
+                         encoding='utf-8')
+    assert press() == (['Mueller2'], 4)
+
+    # Gelöschte Ausgaben werden neu erzeugt
+    next(Path(class_files['destination_folder'], 'Mueller4').glob('*.pdf')).unlink()
+    assert press() == (['Mueller4'], 4)
+
+    # Eine neue Note verändert die Klassenstatistik und damit alle Stempel
+    rows = data_file.read_text(encoding='utf-8')
+    data_file.write_text(rows.replace(';33;3.25;', ';33;3.5;'),
+                         encoding='utf-8')
+    assert press() == ([f'Mueller{i}' for i in range(5)], 0)
@@ -0,0 +1,77 @@
+"""
+Tests for the page index that detects student page ranges in the proof.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from test_handler.config import Config, DataError
+from test_handler.instrumentation import Instrumentation
+
+pymupdf = pytest.importorskip('pymupdf')
+
+from test_handler.indexer import ProofIndex
+
+
+def _range_dropper(class_files) -> None:
+    data = Path(class_files['data'])
+    lines = [';'.join(line.split(';')[:4] + line.split(';')[6:])
+             for line in data.read_text(encoding='utf-8').splitlines()]
+    data.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def test_ranges_fill_missing_columns(class_files):
+    from test_handler.cli import run
+
+    _range_dropper(class_files)
+    config = Config(**class_files, renderer='native', page_index=True)
+    written = run(config)
+
+    assert len(written) == 5
+    with pymupdf.open(written[2]) as doc:
+        assert len(doc) == 2
+        assert 'Müller2 Seite 1' in doc[0].get_text()
+
+
+def test_index_is_reused_until_the_proof_changes(class_files):
+    instrumentation = Instrumentation()
+    ProofIndex(class_files['doc'], instrumentation=instrumentation)
+    ProofIndex(class_files['doc'], instrumentation=instrumentation)
+
+    report = instrumentation.report()
+    assert report['stages']['index_scan']['calls'] == 1
+    assert Path(class_files['doc'] + '.index.json').exists()
+
+    with pymupdf.open(class_files['doc']) as doc:
+        doc.new_page()
+        doc.saveIncr()
+    assert len(ProofIndex(class_files['doc']).pages) == 11
+
+
+def test_typo_in_ranges_is_reported(class_files):
+    from test_handler.cli import run
+
+    data = Path(class_files['data'])
+    data.write_text(data.read_text(encoding='utf-8').replace(';5;6;', ';5;7;'),
+                    encoding='utf-8')
+
+    with pytest.raises(DataError, match='Seiten 5-7 laut Tabelle, 5-6'):
+        run(Config(**class_files, page_index=True))
+
+
+def test_separator_pages_split_scans_without_text(tmp_path):
+    doc = pymupdf.open()
+    for student in range(3):
+        if student:
+            doc.new_page()  # leeres Trennblatt
+        for _ in range(student + 1):
+            page = doc.new_page()
+            page.draw_rect(pymupdf.Rect(50, 50, 500, 700), fill=(0, 0, 0))
+    path = tmp_path / 'scan.pdf'
+    doc.save(path)
+
+    index = ProofIndex(str(path), workers=2)
+    students = [('A', 'a'), ('B', 'b'), ('C', 'c')]
+
+    assert index.range_finder(students) == [(1, 1), (3, 4), (6, 8)]
@@ -0,0 +1,67 @@
+"""
+Tests for the timing and profiling instrumentation.
+"""
+
+import json
+
+import pytest
+
+from test_handler.cli import main
+from test_handler.instrumentation import Instrumentation
+
+
+def test_timers_and_counters_are_merged():
+    worker = Instrumentation()
+    with worker.timer('render', 'Mueller0'):
+        pass
+    worker.counter('pages', 2)
+    report = worker.drain()
+
+    instrumentation = Instrumentation()
+    instrumentation.merge(report)
+    instrumentation.merge(report)
+
+    result = instrumentation.report()
+    assert result['stages']['render']['calls'] == 2
+    assert result['counters'] == {'pages': 4}
+    assert set(result['students']) == {'Mueller0'}
+    assert worker.report()['stages'] == {}
+
+
+def test_main_writes_report(class_files, tmp_path):
+    pytest.importorskip('pymupdf')
+    report_path = tmp_path / 'bericht.json'
+
+    code = main(['--doc', class_files['doc'], '--data', class_files['data'],
+                 '--destination-folder', class_files['destination_folder'],
+                 '--renderer', 'native', '--report', str(report_path),
+                 '--profile', '--trace-memory', '--quiet'])
+
+    report = json.loads(report_path.read_text(encoding='utf-8'))
+    assert code == 0
+    assert {'csv_read', 'background', 'render', 'apply', 'split',
+            'save'} <= set(report['stages'])
+    assert report['stages']['background']['calls'] == 1
+    assert report['counters']['files'] == 5
+    assert report['counters']['pages'] == 10
+    assert report['counters']['bytes_written'] > 0
+    assert len(report['students']) == 5
+    assert report['profile']
+    assert report['memory_peak_bytes'] > 0
+
+
+def test_parallel_press_merges_worker_measurements(paths):
+    pytest.importorskip('pymupdf')
+    from test_handler.stamper import DataHandler, FileManager, ParallelPress
+
+    data = DataHandler(paths)
+    FileManager(paths, data).folder_creator()
+    instrumentation = Instrumentation()
+
+    ParallelPress(paths, data, workers=2, renderer='native',
+                  instrumentation=instrumentation).run()
+
+    report = instrumentation.report()
+    assert report['counters']['files'] == 5
+    assert report['stages']['render']['calls'] == 5
+    assert 1 <= report['stages']['background']['calls'] <= 2
@@ -0,0 +1,91 @@
+"""
+Tests for resuming an interrupted run from its journal.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from test_handler.config import Config
+from test_handler.instrumentation import Instrumentation
+from test_handler.journal import RunJournal
+
+SRC = Path(__file__).resolve().parents[1] / 'src'
+
+# Bricht den Prozess hart ab, sobald die dritte Datei umbenannt ist
+CRASHING_RUN = '''
+import os, sys
+import test_handler.stamper as stamper
+from test_handler.cli import main
+
+original = stamper.atomic_writer
+written = []
+
+def crashing_writer(path, data):
+    original(path, data)
+    written.append(path)
+    if len(written) == 3:
+        os._exit(9)
+
+stamper.atomic_writer = crashing_writer
+sys.exit(main(sys.argv[1:]))
+'''
+
+
+def _contents(folder) -> dict:
+    return {path.relative_to(folder): path.read_bytes()
+            for path in sorted(Path(folder).rglob('*.pdf'))}
+
+
+def test_killed_run_resumes_with_identical_output(class_files, tmp_path):
+    pytest.importorskip('pymupdf')
+    from test_handler.cli import run
+
+    reference = Config(**{**class_files,
+                          'destination_folder': str(tmp_path / 'reference')},
+                       renderer='native')
+    run(reference)
+
+    arguments = ['--doc', class_files['doc'], '--data', class_files['data'],
+                 '--destination-folder', class_files['destination_folder'],
+                 '--renderer', 'native', '--write-concurrency', '0',
+                 '--journal', '--quiet']
+    result = subprocess.run([sys.executable, '-c', CRASHING_RUN, *arguments],
+                            env={**os.environ, 'PYTHONPATH': str(SRC)},
+                            capture_output=True, text=True)
+    assert result.returncode == 9
+    assert len(_contents(class_files['destination_folder'])) == 3
+
+    instrumentation = Instrumentation()
+    config = Config(**class_files, renderer='native', journal=True)
+    written = run(config, instrumentation)
+
+    # Die dritte Datei fehlte noch im Journal und wird neu geschrieben
+    assert len(written) == 3
+    assert instrumentation.report()['counters']['resumed'] == 2
+    assert (_contents(class_files['destination_folder'])
+            == _contents(tmp_path / 'reference'))
+    assert not list(Path(class_files['destination_folder']).glob(
+        f'{RunJournal.PREFIX}*'))
+
+
+def test_torn_lines_and_other_runs_are_ignored(tmp_path):
+    output = tmp_path / 'a' / 'datei.pdf'
+    output.parent.mkdir()
+    output.write_bytes(b'%PDF')
+
+    journal = RunJournal(tmp_path, 'lauf-1')
+    journal.record(output, 'a')
+    journal.close()
+    path = next(tmp_path.glob(f'{RunJournal.PREFIX}-*.jsonl'))
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('{"path": "b/dat')
+
+    assert RunJournal(tmp_path, 'lauf-1').is_done(output)
+    output.write_bytes(b'%PDF-1.7')
+    assert not RunJournal(tmp_path, 'lauf-1').is_done(output)
+    assert not RunJournal(tmp_path, 'lauf-2').entries
+    assert not path.exists()
@@ -0,0 +1,60 @@
+"""
+Tests for stamp layouts with automatic placement and per-task stamps.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from test_handler.config import Config, ConfigError
+from test_handler.instrumentation import Instrumentation
+from test_handler.layout import StampLayout, StampPlacer
+
+np = pytest.importorskip('numpy')
+
+
+def test_tasks_are_parsed_and_validated():
+    assert StampLayout.task_parser('A1, A2,A3@2') == (
+        ('A1', None), ('A2', None), ('A3', 2))
+    with pytest.raises(ConfigError):
+        Config(tasks='A1@0')
+    with pytest.raises(ConfigError):
+        Config(placement='overall')
+
+
+def test_placer_avoids_occupied_cells_and_earlier_stamps():
+    grid = np.zeros((66, 51), dtype=bool)
+    grid[5:25, 30:51] = True  # Text rechts oben
+    placer = StampPlacer(lambda offset: grid.copy())
+
+    first = placer.place(0, (100, 50), (400, 100), (612, 792))
+    second = placer.place(0, (100, 50), (400, 100), (612, 792))
+
+    for x, y in (first, second):
+        assert not grid[int(y // 12):int(np.ceil((y + 50) / 12)),
+                        int(x // 12):int(np.ceil((x + 100) / 12))].any()
+    assert abs(first[1] - second[1]) >= 50 or abs(first[0] - second[0]) >= 100
+    assert placer.overlaps == 0
+
+
+def test_auto_layout_stamps_free_space_on_every_task_page(class_files):
+    pymupdf = pytest.importorskip('pymupdf')
+    from test_handler.cli import run
+
+    data = Path(class_files['data'])
+    lines = data.read_text(encoding='utf-8').splitlines()
+    lines = [lines[0] + ';A1;A2'] + [line + ';3;2.5' for line in lines[1:]]
+    data.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    config = Config(**class_files, renderer='native', placement='auto',
+                    tasks='A1,A2')
+
+    written = run(config)
+    instrumentation = Instrumentation()
+    run(config, instrumentation)
+
+    assert 'layout_analysis' not in instrumentation.report()['stages']
+    with pymupdf.open(written[0]) as doc:
+        heading = doc[0].search_for('Müller0 Seite 1')[0]
+        stamp = doc[0].search_for('Punkte')[0]
+        assert not heading.intersects(stamp)
+        assert doc[0].search_for('A1: 3') and doc[1].search_for('A2: 2.5')
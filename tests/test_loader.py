@@ -0,0 +1,100 @@
+"""
+Tests for the validating control-file loader.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from test_handler.cli import main
+from test_handler.config import DataError
+from test_handler.stamper import DataHandler
+
+
+class TablePaths:
+    """Paths to a control file without a correction proof."""
+
+    def __init__(self, data, doc=''):
+        self.data = str(data)
+        self.doc = doc
+        self.destination_folder = ''
+
+
+def _table(tmp_path, rows, header='Nachname;Vorname;Total;Note;First;Last;'
+                                  'Datum;Titel'):
+    data = tmp_path / 'steuerung.csv'
+    data.write_text('\n'.join([header] + rows) + '\n', encoding='utf-8')
+    return TablePaths(data)
+
+
+def test_duplicate_surnames_get_unique_keys(tmp_path):
+    paths = _table(tmp_path, [
+        'Müller;Anna;50;5.0;1;2;2024-05-01;Pruefung',
+        'Müller;Ben;40;4.5;3;4;2024-05-01;Pruefung',
+        'Meier;Eva;30;4.0;5;6;2024-05-01;Pruefung',
+        'Meier;Eva;35;4.25;7;8;2024-05-01;Pruefung',
+    ])
+
+    data = DataHandler(paths)
+
+    assert [record.key for record in data.records] == [
+        'Mueller_Anna', 'Mueller_Ben', 'Meier_Eva_5', 'Meier_Eva_7']
+    assert data.df.index.is_unique
+    assert data.df.loc['Meier_Eva_7', 'Note'] == 4.25
+    assert data.records[0].name == 'Mueller'
+
+
+def test_only_needed_columns_with_fixed_types(tmp_path):
+    paths = _table(tmp_path, [
+        'Keller;Tim;48;5;1;1;2024-05-01;Pruefung;',
+        'Huber;Lea;36;4;2;3;2024-05-01;Pruefung;',
+    ], header='Nachname;Vorname;Total;Note;First;Last;Datum;Titel;Bemerkung')
+
+    data = DataHandler(paths)
+
+    # Eine leere, nicht benötigte Spalte entfernt keine Schüler mehr
+    assert len(data.records) == 2
+    assert list(data.df.columns) == ['Name', 'Vorname', 'Total', 'Note',
+                                     'First', 'Last', 'Datum', 'Titel']
+    assert data.records[1].total == 36
+    assert isinstance(data.records[1].note, int)
+
+
+@pytest.mark.parametrize('rows, message', [
+    (['A;a;1;1;1;3;d;t', 'B;b;1;1;3;4;d;t'], 'überschneiden sich'),
+    (['A;a;1;1;2;1;d;t'], 'ungültiger Seitenbereich'),
+    (['A;a;1;1;0;1;d;t'], 'ungültiger Seitenbereich'),
+    (['A;a;1;1;1.5;2;d;t'], 'keine ganze Seitenzahl'),
+])
+def test_invalid_page_ranges_are_rejected(tmp_path, rows, message):
+    with pytest.raises(DataError, match=message):
+        DataHandler(_table(tmp_path, rows))
+
+
+def test_ranges_beyond_the_proof_are_rejected(class_files):
+    paths = TablePaths(class_files['data'], class_files['doc'])
+    with open(paths.data, 'a', encoding='utf-8') as file:
+        file.write('Zuletzt;Zoe;40;4.0;11;12;2024-05-01;Pruefung\n')
+
+    with pytest.raises(DataError, match=r'Zeile 7 \(Zuletzt\).*10 Seiten'):
+        DataHandler(paths)
+
+
+def test_missing_columns_are_named(tmp_path):
+    paths = _table(tmp_path, ['A;a;1;1;1;d;t'],
+                   header='Nachname;Vorname;Total;Note;First;Datum;Titel')
+
+    with pytest.raises(DataError, match='Last'):
+        DataHandler(paths)
+
+
+def test_main_rejects_overlaps_before_rendering(class_files, capsys):
+    with open(class_files['data'], 'a', encoding='utf-8') as file:
+        file.write('Doppelt;Dora;40;4.0;4;5;2024-05-01;Pruefung\n')
+
+    code = main(['--doc', class_files['doc'], '--data', class_files['data'],
+                 '--destination-folder', class_files['destination_folder']])
+
+    assert code == 2
+    assert 'überschneiden sich' in capsys.readouterr().err
+    assert not Path(class_files['destination_folder']).exists()
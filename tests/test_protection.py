@@ -0,0 +1,81 @@
+"""
+Tests for per-student encryption and metadata of the output files.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from test_handler.config import Config, DataError
+from test_handler.protection import Protection
+
+
+def _password_column_adder(class_files, empty_row: int = None) -> None:
+    data = Path(class_files['data'])
+    lines = data.read_text(encoding='utf-8').splitlines()
+    lines[0] += ';Kennung'
+    for number in range(1, len(lines)):
+        lines[number] += '' if number == empty_row else f';k{number}-geheim'
+    if empty_row is not None:
+        lines[empty_row] += ';'
+    data.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def test_templates_name_their_columns():
+    protection = Protection(password='{Kennung:.2}{First}',
+                            author='{Lehrer}')
+
+    assert protection.columns() == ('Kennung', 'First', 'Lehrer', 'Titel',
+                                    'Vorname', 'Name')
+    assert Protection.from_config(Config()) is None
+    assert 'geheim' not in repr(Config(password='geheim'))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_outputs_are_encrypted_in_the_same_save(class_files, workers):
+    pymupdf = pytest.importorskip('pymupdf')
+    from test_handler.cli import run
+
+    _password_column_adder(class_files)
+    config = Config(**class_files, renderer='native', workers=workers,
+                    password='{Kennung}', owner_password='lehrer',
+                    author='Frau Keller')
+    written = sorted(run(config))
+
+    with pymupdf.open(written[0]) as doc:
+        assert doc.needs_pass
+        assert doc.authenticate('k1-geheim')
+        assert doc.metadata['author'] == 'Frau Keller'
+        assert doc.metadata['title'] == 'Pruefung'
+        assert doc.metadata['subject'] == 'Anna0 Mueller0'
+        assert doc.metadata['encryption'].startswith('Standard V5')
+        assert 'Punkte' in doc[0].get_text()
+    with pymupdf.open(written[1]) as doc:
+        assert not doc.authenticate('k1-geheim')
+        assert doc.authenticate('lehrer')
+
+
+def test_missing_password_is_rejected_before_stamping(class_files):
+    pytest.importorskip('pymupdf')
+    from test_handler.cli import run
+
+    _password_column_adder(class_files, empty_row=3)
+    config = Config(**class_files, password='{Kennung}')
+
+    with pytest.raises(DataError, match='Kein Passwort'):
+        run(config)
+    assert not list(Path(class_files['destination_folder']).rglob('*.pdf'))
+
+
+def test_changed_password_rewrites_incremental_outputs(class_files):
+    pytest.importorskip('pymupdf')
+    from test_handler.cli import run
+
+    _password_column_adder(class_files)
+    config = Config(**class_files, renderer='native', incremental=True,
+                    password='{Kennung}')
+    assert len(run(config)) == 5
+    assert run(config) == []
+
+    config.password = '{Kennung}{First}'
+    assert len(run(config)) == 5
@@ -0,0 +1,70 @@
+"""
+Tests for the class report written alongside the stamped outputs.
+"""
+
+import pytest
+
+from test_handler.config import Config, ConfigError
+from test_handler.instrumentation import Instrumentation
+
+pymupdf = pytest.importorskip('pymupdf')
+
+from test_handler.report import ClassReport, parquet_engine_finder
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_report_and_export_are_written_in_the_same_run(class_files, workers):
+    from test_handler.cli import run
+
+    config = Config(**class_files, renderer='native', workers=workers,
+                    class_report=True)
+    instrumentation = Instrumentation()
+    written = run(config, instrumentation)
+
+    assert len(written) == 5
+    folder = config.destination_folder
+    lines = open(f'{folder}/class_report.csv', encoding='utf-8').readlines()
+    assert lines[0].startswith('Rang;Name;Vorname;Total;Note;Perzentil')
+    assert lines[1].startswith('1;Mueller3;Anna3;60;6.0;90.0')
+    with pymupdf.open(f'{folder}/class_report.pdf') as doc:
+        text = doc[0].get_text()
+        assert 'Klassenbericht Pruefung' in text
+        assert 'Mittelwert' in text and '4.70' in text
+        # Verteilungsgrafik aus dem Hintergrund der Stempel
+        assert doc[0].get_xobjects()
+    report = instrumentation.report()
+    assert report['stages']['class_report']['calls'] == 1
+    if workers == 1:
+        # Der Hintergrund wird für den Bericht nicht erneut gerendert
+        assert report['stages']['background']['calls'] == 1
+
+
+def test_printing_press_writes_the_report(class_files, tmp_path,
+                                          monkeypatch):
+    from test_handler.stamper import DataHandler, Stamper
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    config = Config(**class_files, renderer='native')
+    data = DataHandler(config)
+    stamper = Stamper(config, data, 'native')
+    report = ClassReport(data, tmp_path / 'bericht')
+    stamper.printing_press(report)
+    stamper.doc.close()
+
+    assert [path.name for path in report.written] == ['class_report.pdf',
+                                                      'class_report.csv']
+
+
+def test_parquet_needs_an_engine(class_files):
+    from test_handler.cli import run
+
+    config = Config(**class_files, class_report=True,
+                    report_format='parquet')
+    if parquet_engine_finder() is None:
+        with pytest.raises(ConfigError, match='Parquet'):
+            run(config)
+    else:
+        run(config)
+    with pytest.raises(ConfigError):
+        Config(report_format='xlsx')
@@ -0,0 +1,65 @@
+"""
+Tests for the save profiles of the stamped proof and the output files.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from test_handler.config import Config, ConfigError
+from test_handler.save_profiles import SAVE_PROFILES, SaveProfile
+
+
+def test_unknown_profiles_are_rejected():
+    assert Config.load(environ={}).save_profile == 'balanced'
+    assert Config.load(environ={'TEST_HANDLER_SAVE_PROFILE': 'archive'}
+                       ).save_profile == 'archive'
+    with pytest.raises(ConfigError):
+        Config(save_profile='maximal')
+
+
+def test_unsupported_linearization_is_dropped():
+    pytest.importorskip('pymupdf')
+    from test_handler.save_profiles import linear_supported
+
+    options = SaveProfile(linear=True, deflate=True).options()
+
+    assert options['linear'] == linear_supported()
+    assert options['deflate']
+    # Das Archivprofil linearisiert die Schülerdateien, wo möglich
+    assert SAVE_PROFILES['archive']['output'].linear
+    assert (SAVE_PROFILES['archive']['output'].options()['linear']
+            == linear_supported())
+
+
+def test_profiles_trade_size_for_speed(class_files):
+    pymupdf = pytest.importorskip('pymupdf')
+    from test_handler.cli import run
+
+    texts, sizes = {}, {}
+    for profile in SAVE_PROFILES:
+        folder = Path(class_files['destination_folder']) / profile
+        # Der Raster-Stempel ist groß genug, dass Kompression sich lohnt
+        config = Config(**{**class_files, 'destination_folder': str(folder)},
+                        save_profile=profile)
+        written = run(config)
+        sizes[profile] = sum(Path(path).stat().st_size for path in written)
+        texts[profile] = []
+        for path in written:
+            with pymupdf.open(path) as doc:
+                texts[profile].append([page.get_text() for page in doc])
+
+    assert texts['fast'] == texts['balanced'] == texts['archive']
+    assert sizes['fast'] > sizes['balanced'] >= sizes['archive']
+
+
+def test_changed_profile_rewrites_incremental_outputs(class_files):
+    pytest.importorskip('pymupdf')
+    from test_handler.cli import run
+
+    config = Config(**class_files, renderer='native', incremental=True)
+    assert len(run(config)) == 5
+    assert run(config) == []
+
+    config.save_profile = 'archive'
+    assert len(run(config)) == 5
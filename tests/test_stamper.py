@@ -0,0 +1,144 @@
+"""
+Tests for the stamper module.
+"""
+
+import io
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pymupdf = pytest.importorskip('pymupdf')
+plt = pytest.importorskip('matplotlib.pyplot')
+
+from test_handler.stamper import DataHandler, FileManager, ParallelPress, Stamper
+
+STAMP_AREA = pymupdf.Rect(390, 90, 610, 260)
+
+
+def _render(page):
+    pixmap = page.get_pixmap(dpi=150, clip=STAMP_AREA)
+    return np.frombuffer(pixmap.samples, np.uint8).astype(int)
+
+
+def test_background_rendered_once(paths, monkeypatch):
+    stamper = Stamper(paths, DataHandler(paths))
+    calls = []
+    creator = stamper._stamp_background_creator
+    monkeypatch.setattr(stamper, '_stamp_background_creator',
+                        lambda: calls.append(1) or creator())
+
+    for student in stamper.records:
+        stamper._apply_stamp(student.first - 1, stamper._render_stamp(student))
+
+    assert len(calls) == 1
+
+
+def test_cached_stamp_matches_full_render(paths):
+    data = DataHandler(paths)
+    student = data.records[2]
+    page_number = student.first - 1
+
+    # Referenz: vollständiger Stempel wie vor dem Caching
+    reference = Stamper(paths, data)
+    fig = reference._create_stamp(student, reference._stamp_background_creator())
+    width_in, height_in = fig.get_size_inches()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight', dpi=300)
+    plt.close(fig)
+    reference.doc[page_number].insert_image(
+        pymupdf.Rect(400, 100, 600, 100 + 200 * height_in / width_in),
+        stream=buf.getvalue())
+
+    stamper = Stamper(paths, data)
+    stamper._apply_stamp(page_number, stamper._render_stamp(student))
+
+    diff = np.abs(_render(reference.doc[page_number])
+                  - _render(stamper.doc[page_number]))
+    assert diff.mean() < 5
+
+
+@pytest.mark.parametrize('renderer', ['vector', 'native'])
+def test_vector_renderer_embeds_no_images(paths, renderer):
+    data = DataHandler(paths)
+    file_manager = FileManager(paths, data)
+    file_manager.folder_creator()
+
+    file_manager.stamp_distributor(Stamper(paths, data, renderer=renderer))
+
+    path = sorted(Path(paths.destination_folder).rglob('*.pdf'))[0]
+    with pymupdf.open(path) as doc:
+        assert not doc[0].get_images(full=True)
+        assert 'Punkte' in doc[0].get_text()
+
+
+def test_native_statistics_match_matplotlib(paths):
+    from matplotlib import cbook
+
+    stamper = Stamper(paths, DataHandler(paths), renderer='native')
+    stats = stamper.statistics
+    reference = cbook.boxplot_stats(stamper.df['Note'].to_numpy())[0]
+
+    assert stats.q1 == stamper.df['Note'].quantile(0.25)
+    assert stats.median == stamper.df['Note'].median()
+    assert stats.q3 == stamper.df['Note'].quantile(0.75)
+    assert stats.whisker_low == reference['whislo']
+    assert stats.whisker_high == reference['whishi']
+    assert list(stats.fliers) == list(reference['fliers'])
+
+
+def test_duplicate_surnames_get_distinct_records(paths, class_files):
+    data_file = Path(class_files['data'])
+    rows = data_file.read_text(encoding='utf-8').replace('Müller1;', 'Müller0;')
+    data_file.write_text(rows, encoding='utf-8')
+    data = DataHandler(paths)
+    file_manager = FileManager(paths, data)
+    file_manager.folder_creator()
+
+    file_manager.stamp_distributor(Stamper(paths, data, renderer='native'))
+
+    assert [student.key for student in data.records[:3]] == [
+        'Mueller0_Anna0', 'Mueller0_Anna1', 'Mueller2']
+    assert data.records[1].first == 3
+    assert len(list(Path(paths.destination_folder).rglob('*.pdf'))) == 5
+
+
+def test_unknown_renderer_is_rejected(paths):
+    with pytest.raises(ValueError):
+        Stamper(paths, DataHandler(paths), renderer='svg')
+
+
+def _output_files(folder):
+    return {path.relative_to(folder).as_posix(): path.read_bytes()
+            for path in sorted(Path(folder).rglob('*.pdf'))}
+
+
+def test_single_pass_skips_intermediate_file(paths, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = DataHandler(paths)
+    file_manager = FileManager(paths, data)
+    file_manager.folder_creator()
+
+    file_manager.stamp_distributor(Stamper(paths, data))
+
+    assert not (tmp_path / 'data' / 'fahne_gestempelt.pdf').exists()
+    outputs = sorted(Path(paths.destination_folder).rglob('*.pdf'))
+    assert len(outputs) == len(data.df)
+    with pymupdf.open(outputs[0]) as doc:
+        assert doc.page_count == 2
+        assert doc[0].get_images() and not doc[1].get_images()
+
+
+def test_parallel_press_matches_serial_path(paths, tmp_path):
+    data = DataHandler(paths)
+    file_manager = FileManager(paths, data)
+    file_manager.folder_creator()
+    file_manager.stamp_distributor(Stamper(paths, data))
+    serial = _output_files(paths.destination_folder)
+
+    paths.destination_folder = str(tmp_path / 'parallel')
+    FileManager(paths, data).folder_creator()
+    written = ParallelPress(paths, data, workers=2).run()
+
+    assert len(written) == len(data.df)
+    assert _output_files(paths.destination_folder) == serial
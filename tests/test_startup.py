@@ -0,0 +1,35 @@
+"""
+Tests for the lazy loading of heavy dependencies.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parents[1] / 'src'
+HEAVY = ('pandas', 'numpy', 'matplotlib', 'pymupdf', 'PIL')
+
+
+@pytest.mark.parametrize('module', ['test_handler.stamper',
+                                    'test_handler.core',
+                                    'test_handler.cli'])
+def test_import_loads_no_heavy_dependency(module):
+    code = (f'import sys, {module}; '
+            f'print(*[m for m in {HEAVY!r} if m in sys.modules])')
+    result = subprocess.run([sys.executable, '-c', code], cwd=SRC,
+                            capture_output=True, text=True, check=True)
+
+    assert result.stdout.split() == []
+
+
+def test_stamping_uses_agg_backend(paths):
+    matplotlib = pytest.importorskip('matplotlib')
+    from test_handler.stamper import DataHandler, Stamper
+
+    stamper = Stamper(paths, DataHandler(paths))
+    stamper._render_stamp(stamper.records[0])
+    stamper._background_closer()
+
+    assert matplotlib.get_backend().lower() == 'agg'
@@ -0,0 +1,71 @@
+"""
+Tests for the class statistics shared by renderers, reports and caches.
+"""
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+cbook = pytest.importorskip('matplotlib.cbook')
+
+from test_handler.stats import ClassStatistics, statistics_table
+
+
+NOTES = [5.5, 4.0, 4.5, 3.0, 5.0, 4.5, 1.0, 6.0]
+
+
+def test_boxplot_stats_match_matplotlib():
+    stats = ClassStatistics(NOTES).boxplot_stats()
+    reference = cbook.boxplot_stats(NOTES)[0]
+
+    for key in ('med', 'q1', 'q3', 'whislo', 'whishi', 'mean'):
+        assert stats[key] == pytest.approx(reference[key])
+    assert list(stats['fliers']) == list(reference['fliers']) == [1.0]
+
+
+@pytest.mark.parametrize('notes', [[1, 6, 6, 6], [1, 1, 1, 6], [4, 4, 4, 4],
+                                   [2.5, 6, 6, 6, 6, 5.75, 1]])
+def test_whiskers_are_clamped_to_the_box(notes):
+    stats = ClassStatistics(notes).boxplot_stats()
+    reference = cbook.boxplot_stats(notes)[0]
+
+    for key in ('q1', 'q3', 'whislo', 'whishi'):
+        assert stats[key] == pytest.approx(reference[key])
+    assert list(stats['fliers']) == list(reference['fliers'])
+
+
+def test_percentile_ranks_use_mid_ranks():
+    stats = ClassStatistics(NOTES, keys='abcdefgh')
+
+    assert stats.percentile_rank('g') == pytest.approx(100 * 0.5 / 8)
+    assert stats.percentile_rank('h') == pytest.approx(100 * 7.5 / 8)
+    # Gleiche Noten teilen sich den Rang
+    assert stats.percentile_rank('c') == stats.percentile_rank('f') == 50
+    assert stats.histogram.sum() == len(NOTES)
+
+
+@pytest.mark.parametrize('notes, color', [
+    ([4.5, 5.0, 5.5, 6.0], 'green'),
+    ([2.0, 3.0, 3.5, 3.5], 'red'),
+    ([3.0, 4.0, 5.0, 6.0], 'orange'),
+])
+def test_box_color_uses_pass_mark(notes, color):
+    assert ClassStatistics(notes).box_color() == color
+
+
+def test_grouped_statistics_per_exam():
+    df = pd.DataFrame({'Titel': ['A', 'A', 'B', 'B', 'B'],
+                       'Note': [4.0, 5.0, 2.0, 3.0, 3.5]},
+                      index=['x', 'y', 'x', 'y', 'z'])
+
+    groups = ClassStatistics.grouped(df)
+    table = statistics_table(groups)
+
+    assert list(groups) == ['A', 'B']
+    assert groups['B'].percentile_rank('z') == pytest.approx(100 * 2.5 / 3)
+    assert table.loc['count', 'A'] == 2
+    assert table.loc['box_color', 'B'] == 'red'
+
+
+def test_empty_notes_are_rejected():
+    with pytest.raises(ValueError):
+        ClassStatistics([])
@@ -0,0 +1,147 @@
+"""
+Tests for the memory-bounded streaming mode.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from test_handler.config import Config, ConfigError
+from test_handler.memory import MemoryCeiling, rss_reader
+
+
+SRC = Path(__file__).resolve().parents[1] / 'src'
+
+# Läuft in einem eigenen Prozess und meldet dessen höchsten Speicherbedarf
+# in MB. tracemalloc sieht die Speicherbelegung von MuPDF nicht, und
+# ru_maxrss enthält nach fork den Höchstwert des Testprozesses.
+PEAK_RUN = '''
+import sys, threading
+from test_handler.cli import run
+from test_handler.config import Config
+from test_handler.memory import rss_reader
+
+peak, done = [rss_reader()], threading.Event()
+
+def sampler():
+    while not done.wait(0.005):
+        peak.append(rss_reader())
+
+thread = threading.Thread(target=sampler)
+thread.start()
+folder, limit, order = sys.argv[1:4]
+run(Config(doc=folder + '/fahne.pdf', data=folder + '/steuerung.csv',
+           destination_folder=folder + '/output', renderer='native',
+           order=order, workers=1, write_concurrency=0,
+           memory_limit=None if limit == 'none' else float(limit)))
+done.set()
+thread.join()
+print(max(peak) / 2 ** 20)
+'''
+
+
+def proof_writer(folder: Path, students: int, scan_side: int = None) -> Config:
+    """
+    Writes a proof with one scan per page and its control file.
+
+    Without ``scan_side`` the scans are small and compress well; with it
+    they are noise of that many pixels per side, as large as real scans
+    relative to the rest of the run.
+    """
+    pymupdf = pytest.importorskip('pymupdf')
+    if scan_side is not None:
+        np = pytest.importorskip('numpy')
+        noise = np.random.default_rng(1)
+
+    folder.mkdir()
+    rows = ['Nachname;Vorname;Total;Note;First;Last;Datum;Titel']
+    doc = pymupdf.open()
+    for i in range(students):
+        note = [5.5, 4.0, 3.25, 6.0, 4.75][i % 5]
+        rows.append(f'Muster{i};Eva{i % 3};{int(note * 10)};{note};'
+                    f'{2 * i + 1};{2 * i + 2};2024-05-01;Pruefung')
+        for k in range(2):
+            if scan_side is None:
+                scan = pymupdf.Pixmap(
+                    pymupdf.csGRAY, 120, 160,
+                    bytes((i + k + n) % 256 for n in range(19200)), False)
+            else:
+                scan = pymupdf.Pixmap(
+                    pymupdf.csGRAY, scan_side, scan_side,
+                    noise.integers(0, 256, scan_side ** 2,
+                                   dtype=np.uint8).tobytes(), False)
+            page = doc.new_page()
+            page.insert_image(page.rect, pixmap=scan)
+
+    (folder / 'steuerung.csv').write_text('\n'.join(rows) + '\n',
+                                          encoding='utf-8')
+    doc.save(folder / 'fahne.pdf')
+    doc.close()
+
+    return Config(doc=str(folder / 'fahne.pdf'),
+                  data=str(folder / 'steuerung.csv'),
+                  destination_folder=str(folder / 'output'),
+                  renderer='native')
+
+
+def test_memory_limit_must_be_positive():
+    assert Config(memory_limit='512').memory_limit == 512.0
+    with pytest.raises(ConfigError):
+        Config(memory_limit=0)
+
+
+def test_ceiling_is_exceeded_below_current_usage():
+    if rss_reader() is None:
+        pytest.skip('RSS nicht ermittelbar')
+    assert MemoryCeiling(1).exceeded()
+    assert not MemoryCeiling(2 ** 50).exceeded()
+
+
+def test_streaming_releases_the_proof_and_keeps_outputs(tmp_path):
+    from test_handler.cli import run
+    from test_handler.instrumentation import Instrumentation
+
+    config = proof_writer(tmp_path / 'klasse', 6)
+    regular = [Path(path).read_bytes() for path in run(config)]
+
+    config.memory_limit = 1e-6
+    instrumentation = Instrumentation()
+    streamed = [Path(path).read_bytes()
+                for path in run(config, instrumentation)]
+
+    assert instrumentation.report()['counters']['source_releases'] == 6
+    assert streamed == regular
+
+
+@pytest.mark.parametrize('order', ['split_first', 'stamp_first'])
+def test_streaming_peak_memory_does_not_grow_with_page_count(tmp_path, order):
+    if not Path('/proc/self/statm').exists():
+        pytest.skip('Aktueller Speicherbedarf nicht ermittelbar')
+
+    def peak(folder, limit):
+        result = subprocess.run(
+            [sys.executable, '-c', PEAK_RUN, str(folder), limit, order],
+            env={**os.environ, 'PYTHONPATH': str(SRC)},
+            capture_output=True, text=True, check=True)
+        return float(result.stdout)
+
+    small, large = tmp_path / 'klein', tmp_path / 'gross'
+    proof_writer(small, 10, scan_side=400)
+    proof_writer(large, 80, scan_side=400)
+    regular = peak(large, 'none') - peak(small, 'none')
+    streamed = peak(large, '1e-6') - peak(small, '1e-6')
+
+    if order == 'split_first':
+        # Jede Datei entsteht neu aus den unveränderten Seiten der Fahne
+        # und wird nach dem Schreiben geschlossen; schon ohne Obergrenze
+        # wächst nichts mit (140 Seiten mehr à 160 KB)
+        assert regular < 7
+        assert streamed < 7
+    else:
+        # Die gestempelten Seiten bleiben samt Scans in der Fahne; im
+        # Streaming-Modus nicht
+        assert regular > 10
+        assert streamed < regular / 3
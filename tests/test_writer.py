@@ -0,0 +1,76 @@
+"""
+Tests for the background output writer.
+"""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from test_handler import writer as writer_module
+from test_handler.writer import OutputWriter
+
+
+@pytest.fixture
+def slow_share(monkeypatch):
+    """Every write takes 50 ms, like a file on a distant network share."""
+    original = writer_module.atomic_writer
+    active = []
+    peak = []
+
+    def throttled_writer(path, data):
+        active.append(None)
+        peak.append(len(active))
+        time.sleep(0.05)
+        original(path, data)
+        active.pop()
+
+    monkeypatch.setattr(writer_module, 'atomic_writer', throttled_writer)
+    return peak
+
+
+def test_writes_overlap_and_stay_bounded(tmp_path, slow_share):
+    start = time.perf_counter()
+    with OutputWriter(concurrency=4) as writer:
+        for i in range(8):
+            writer.submit(tmp_path / f'{i}.pdf', b'%PDF-' + bytes([i]))
+        submitted = time.perf_counter() - start
+    elapsed = time.perf_counter() - start
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == \
+        [f'{i}.pdf' for i in range(8)]
+    assert (tmp_path / '5.pdf').read_bytes() == b'%PDF-\x05'
+    assert max(slow_share) <= 4
+    assert submitted < 8 * 0.05
+    assert elapsed < 8 * 0.05
+    assert not [thread for thread in threading.enumerate()
+                if thread.name.startswith('test-handler-writer')]
+
+
+def test_errors_surface_on_flush(tmp_path):
+    writer = OutputWriter(concurrency=2)
+    writer.submit(tmp_path / 'fehlt' / 'a.pdf', b'%PDF-')
+    with pytest.raises(FileNotFoundError):
+        writer.close()
+    assert not list(tmp_path.iterdir())
+
+
+def test_pipeline_overlaps_stamping_with_slow_writes(paths, tmp_path,
+                                                     slow_share):
+    pytest.importorskip('pymupdf')
+    from test_handler.instrumentation import Instrumentation
+    from test_handler.stamper import DataHandler, FileManager, ParallelPress
+
+    def press(destination, write_concurrency):
+        paths.destination_folder = str(tmp_path / destination)
+        data = DataHandler(paths)
+        FileManager(paths, data).folder_creator()
+        instrumentation = Instrumentation()
+        written = ParallelPress(paths, data, workers=1, renderer='native',
+                                instrumentation=instrumentation,
+                                write_concurrency=write_concurrency).run()
+        return [Path(path).read_bytes() for path in written]
+
+    assert press('sofort', 0) == press('hintergrund', 2)
+    assert not list((tmp_path / 'hintergrund').rglob('*.tmp'))